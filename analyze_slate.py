@@ -1,25 +1,34 @@
-import pandas as pd
+import os
 import argparse
 import datetime
+from data_cache import get_cache_settings
+from build_cache import compute_stage_fingerprint, is_stage_current, record_stage
+from goi_store import load_goi_for_date
 
-def main():
-    parser = argparse.ArgumentParser(description="Analyze GOI for specific DFS slate")
-    parser.add_argument('--date', type=str, default=datetime.date.today().strftime('%Y-%m-%d'),
-                        help="Date for the slate (YYYY-MM-DD). Defaults to today.")
-    parser.add_argument('--games', type=str, default=None,
-                        help="Comma-separated list of games as 'Home vs Away' (e.g., 'Dallas Stars vs Los Angeles Kings,Colorado Avalanche vs Carolina Hurricanes'). If omitted, uses all games on date.")
-    args = parser.parse_args()
+def build_slate(goi_df, schedule_df, date, games=None, matrix=None):
+    """
+    Selects the slate's games from the GOI rankings and adds DFS insights.
 
-    # Load data
-    goi_df = pd.read_csv('goi_rankings.csv')
-    schedule_df = pd.read_csv('schedule.csv')
+    Args:
+        goi_df (pd.DataFrame): GOI rankings for all games.
+        schedule_df (pd.DataFrame): The full schedule.
+        date (str): Slate date (YYYY-MM-DD).
+        games (str): Comma-separated games ('Away @ Home' or 'Home vs Away'),
+            or None for every game on the date.
+        matrix (MatchupMatrix): If given, selected games that are not on the
+            schedule are looked up as hypothetical matchups.
+
+    Returns:
+        pd.DataFrame: The ranked slate, or None if no games matched.
+    """
+    import pandas as pd
 
     # Filter by date first
-    slate_df = goi_df[goi_df['Date'] == args.date].copy()
+    slate_df = goi_df[goi_df['Date'] == date].copy()
 
-    if args.games:
+    if games:
         # Parse user games (normalize names)
-        selected_games = [g.strip() for g in args.games.split(',')]
+        selected_games = [g.strip() for g in games.split(',')]
         filtered_rows = []
         for game in selected_games:
             # Handle both 'Home vs Away' and 'Away @ Home' formats
@@ -44,25 +53,28 @@ def main():
                                  (slate_df['Home'].str.contains(away, case=False, na=False, regex=False))]
                 if not match.empty:
                     filtered_rows.append(match.iloc[0])
+                elif matrix is not None and matrix.lookup(home, away) is not None:
+                    print(f"  -> '{game}' is not scheduled on {date}; using the matchup matrix (hypothetical).")
+                    filtered_rows.append(pd.Series({'Date': date, **matrix.lookup(home, away)}))
                 else:
-                    print(f"WARNING: Game '{game}' not found in GOI for {args.date}. Try format: 'Away @ Home' (e.g., 'Los Angeles Kings @ Dallas Stars')")
+                    print(f"WARNING: Game '{game}' not found in GOI for {date}. Try format: 'Away @ Home' (e.g., 'Los Angeles Kings @ Dallas Stars')")
         
         if filtered_rows:
             slate_df = pd.DataFrame(filtered_rows)
         else:
             print(f"No games matched. Exiting.")
-            return
+            return None
     else:
         # Use all on date
-        today_schedule = schedule_df[schedule_df['Date'] == args.date]
+        today_schedule = schedule_df[schedule_df['Date'] == date]
         if len(today_schedule) == 0:
-            print(f"No games found on {args.date} in schedule.")
-            return
-        print(f"Found {len(today_schedule)} games on {args.date}. Analyzing all...\n")
+            print(f"No games found on {date} in schedule.")
+            return None
+        print(f"Found {len(today_schedule)} games on {date}. Analyzing all...\n")
 
     if slate_df.empty:
-        print(f"No games found for {args.date}. Run calculate_goi.py with fresh data?")
-        return
+        print(f"No games found for {date}. Run calculate_goi.py with fresh data?")
+        return None
 
     # Sort by Total_Opportunity descending (best games first)
     slate_df = slate_df.sort_values('Total_Opportunity', ascending=False).reset_index(drop=True)
@@ -102,10 +114,14 @@ def main():
     
     slate_df['Stack_Priority'] = slate_df.apply(get_stack_priority, axis=1)
     slate_df['DFS_Insight'] = slate_df.apply(get_dfs_insight, axis=1)
+    return slate_df
 
-    # Display
+def print_slate(slate_df, date):
+    """
+    Prints the ranked slate table and per-game DFS insights.
+    """
     print(f"\n{'='*150}")
-    print(f"DFS SLATE ANALYSIS: {args.date} ({len(slate_df)} Games)")
+    print(f"DFS SLATE ANALYSIS: {date} ({len(slate_df)} Games)")
     print(f"{'='*150}\n")
     
     display_cols = ['Slate_Rank', 'Away', 'Home', 'Away_GOI', 'Home_GOI', 'Game_Pace', 'Total_Opportunity', 'Stack_Priority']
@@ -119,10 +135,94 @@ def main():
         print(f"   {row['Stack_Priority']}")
         print(f"   {row['DFS_Insight']}\n")
 
+def run_slate_stage(config, date, games=None, goi_df=None, schedule_df=None, force=False, write=True, output_dir=None):
+    """
+    Runs Step 3 in-process: builds, prints and optionally saves the slate.
+
+    Args:
+        config (dict): The configuration dictionary.
+        date (str): Slate date (YYYY-MM-DD).
+        games (str): Comma-separated game selection, or None for all games on the date.
+        goi_df (pd.DataFrame): GOI rankings. The date's games are read from the
+            GOI store (or goi_rankings.csv) if omitted.
+        schedule_df (pd.DataFrame): The schedule. Read from schedule.csv if omitted.
+        force (bool): Re-analyze even if the build cache says the saved slate is current.
+        write (bool): Save slate_analysis_<date>.csv (and record the build cache).
+        output_dir (str): Data/output directory. Defaults to the script directory.
+
+    Returns:
+        pd.DataFrame: The ranked slate, or None if no games matched.
+    """
+    # Deferred so --help and argument errors return without loading pandas
+    import pandas as pd
+
+    output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    cache_settings = get_cache_settings(config)
+
+    goi_path = os.path.join(output_dir, 'goi_rankings.csv')
+    schedule_path = os.path.join(output_dir, 'schedule.csv')
+    output_file = os.path.join(output_dir, f'slate_analysis_{date}.csv')
+    stage_name = f"slate:{date}"
+    fingerprint = compute_stage_fingerprint(
+        stage_name, config, [goi_path, schedule_path, os.path.join(output_dir, 'tpi_rankings.csv')], {'date': date, 'games': games}
+    )
+
+    # Unchanged inputs: show the saved analysis instead of recomputing it
+    if write and not force and is_stage_current(stage_name, fingerprint, [output_file], cache_settings):
+        print(f"GOI, schedule and game selection unchanged. Showing saved analysis from {os.path.basename(output_file)}.")
+        slate_df = pd.read_csv(output_file)
+        print_slate(slate_df, date)
+        return slate_df
+
+    # Load data
+    if goi_df is None:
+        goi_df = load_goi_for_date(config, date, goi_path)
+    if schedule_df is None:
+        schedule_df = pd.read_csv(schedule_path)
+
+    # Hypothetical games (not on the schedule) come from the cached matchup matrix
+    matrix = None
+    if games:
+        # Deferred: the matrix module loads NumPy, which plain slates never need
+        from matchup_matrix import get_matchup_matrix
+
+        tpi_path = os.path.join(output_dir, 'tpi_rankings.csv')
+        if os.path.exists(tpi_path):
+            # Rebuilt when TPI or the GOI blend changed since the matrix was saved
+            matrix = get_matchup_matrix(config, pd.read_csv(tpi_path))
+        else:
+            print(f"WARNING: {os.path.basename(tpi_path)} not found; games off the schedule cannot be rated.")
+
+    slate_df = build_slate(goi_df, schedule_df, date, games, matrix)
+    if slate_df is None:
+        return None
+
+    print_slate(slate_df, date)
+
     # Save to CSV for records
-    output_file = f'slate_analysis_{args.date}.csv'
-    slate_df.to_csv(output_file, index=False)
-    print(f"Saved detailed analysis to {output_file}")
+    if write:
+        slate_df.to_csv(output_file, index=False)
+        print(f"Saved detailed analysis to {os.path.basename(output_file)}")
+        record_stage(stage_name, fingerprint, [output_file], cache_settings)
+    return slate_df
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze GOI for specific DFS slate")
+    parser.add_argument('--date', type=str, default=datetime.date.today().strftime('%Y-%m-%d'),
+                        help="Date for the slate (YYYY-MM-DD). Defaults to today.")
+    parser.add_argument('--games', type=str, default=None,
+                        help="Comma-separated list of games as 'Home vs Away' (e.g., 'Dallas Stars vs Los Angeles Kings,Colorado Avalanche vs Carolina Hurricanes'). If omitted, uses all games on date.")
+    parser.add_argument('--force', action='store_true', help="Re-analyze even if GOI, schedule and selection are unchanged.")
+    args = parser.parse_args()
+
+    config = {}
+    config_path = os.path.join(os.path.dirname(__file__), 'config_v2.yaml')
+    if os.path.exists(config_path):
+        import yaml
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+
+    run_slate_stage(config, args.date, args.games, force=args.force)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import csv
+import time
+import argparse
+import subprocess
+import statistics
+from datetime import datetime
+
+# (label, argv, stdin) for each entry point; every run uses a fresh interpreter
+COMMANDS = [
+    ("main.py menu + exit", ["main.py"], "6\n"),
+    ("analyze_slate.py --help", ["analyze_slate.py", "--help"], None),
+    ("filter_goi_by_date.py --help", ["filter_goi_by_date.py", "--help"], None),
+    ("calculate_goi.py --help", ["calculate_goi.py", "--help"], None),
+    ("calc_zscores_v2.py --help", ["calc_zscores_v2.py", "--help"], None),
+    ("snapshot_store.py --help", ["snapshot_store.py", "--help"], None),
+    ("import pipeline", ["-c", "import pipeline"], None),
+]
+
+def time_command(argv, stdin_text, repeats):
+    """
+    Runs a command in fresh interpreters and returns wall times in milliseconds.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + argv,
+            cwd=base_dir,
+            input=stdin_text,
+            text=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def interpreter_baseline_ms(repeats):
+    """
+    Median startup time of a bare interpreter, subtracted to isolate import cost.
+    """
+    return statistics.median(time_command(["-c", "pass"], None, repeats))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start time of each command-line entry point")
+    parser.add_argument('--repeats', type=int, default=5, help="Runs per command (median is reported).")
+    parser.add_argument('--history', type=str, default=None,
+                        help="CSV file to append results to, for tracking startup time across changes.")
+    args = parser.parse_args()
+
+    baseline = interpreter_baseline_ms(args.repeats)
+    print(f"Bare interpreter startup: {baseline:7.1f} ms (median of {args.repeats})\n")
+    print(f"{'Command':35s} {'median ms':>10s} {'import ms':>10s} {'min ms':>10s}")
+
+    rows = []
+    for label, argv, stdin_text in COMMANDS:
+        timings = time_command(argv, stdin_text, args.repeats)
+        median = statistics.median(timings)
+        rows.append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'command': label,
+            'median_ms': round(median, 1),
+            'import_ms': round(median - baseline, 1),
+            'min_ms': round(min(timings), 1)
+        })
+        print(f"{label:35s} {median:10.1f} {median - baseline:10.1f} {min(timings):10.1f}")
+
+    if args.history:
+        write_header = not os.path.exists(args.history)
+        with open(args.history, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nAppended {len(rows)} results to {args.history}")
+
+if __name__ == "__main__":
+    main()
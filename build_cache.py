@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+from data_cache import file_sha256
+
+STATE_FILENAME = 'build_state.json'
+
+# Source files whose contents make up each stage's code version
+STAGE_CODE_FILES = {
+    'tpi': ['calc_zscores_v2.py', 'data_cache.py', 'workbook_reader.py', 'team_names.py', 'zscore_matrix.py', 'recency_zscores.py', 'shrinkage.py'],
+    'goi': ['calculate_goi.py', 'matchup_matrix.py', 'schedule_context.py', 'goi_store.py'],
+    'slate': ['analyze_slate.py', 'goi_store.py', 'matchup_matrix.py']
+}
+
+# Top-level config keys that affect each stage's outputs
+STAGE_CONFIG_KEYS = {
+    'tpi': ['providers', 'bucket_weights', 'team_name_mappings', 'canonical_teams', 'recency', 'shrinkage'],
+    'goi': ['goi', 'schedule_context'],
+    'slate': ['goi']
+}
+
+def _state_path(cache_settings):
+    return os.path.join(cache_settings['dir'], STATE_FILENAME)
+
+def _load_state(cache_settings):
+    path = _state_path(cache_settings)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _hash_path(path):
+    return file_sha256(path) if os.path.exists(path) else 'missing'
+
+def compute_stage_fingerprint(stage_name, config, input_paths, extra=None):
+    """
+    Fingerprints everything a stage's outputs depend on.
+
+    Args:
+        stage_name (str): 'tpi', 'goi' or 'slate', optionally with a ':<key>'
+            suffix to track several variants (e.g. one slate per date).
+        config (dict): The loaded configuration dictionary.
+        input_paths (list): Data files the stage reads. Relative paths are
+            taken from the script directory, not the working directory.
+        extra (dict): Other parameters that change the outputs (run date, CLI args).
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    stage_kind = stage_name.split(':')[0]
+    config = config or {}
+    payload = {
+        'inputs': {os.path.basename(p): _hash_path(os.path.join(base_dir, p)) for p in input_paths},
+        'config': {key: config.get(key) for key in STAGE_CONFIG_KEYS.get(stage_kind, [])},
+        'code': {name: _hash_path(os.path.join(base_dir, name)) for name in STAGE_CODE_FILES.get(stage_kind, [])},
+        'extra': extra or {}
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def is_stage_current(stage_name, fingerprint, output_paths, cache_settings):
+    """
+    Checks whether a stage's last run used the same fingerprint and its
+    outputs are still exactly what that run wrote.
+
+    Args:
+        stage_name (str): The stage name.
+        fingerprint (str): From compute_stage_fingerprint.
+        output_paths (list): Files the stage writes.
+        cache_settings (dict): Settings from get_cache_settings.
+
+    Returns:
+        bool: True if the stage can be skipped.
+    """
+    if not cache_settings or not cache_settings.get('enabled', True):
+        return False
+
+    recorded = _load_state(cache_settings).get(stage_name)
+    if not recorded or recorded.get('fingerprint') != fingerprint:
+        return False
+
+    # Outputs edited or deleted since the last run force a rebuild
+    recorded_outputs = recorded.get('outputs', {})
+    for path in output_paths:
+        if recorded_outputs.get(os.path.basename(path)) != _hash_path(path) or not os.path.exists(path):
+            return False
+    return True
+
+def record_stage(stage_name, fingerprint, output_paths, cache_settings):
+    """
+    Records a successful stage run so identical re-runs can be skipped.
+    """
+    if not cache_settings or not cache_settings.get('enabled', True):
+        return
+
+    state = _load_state(cache_settings)
+    state[stage_name] = {
+        'fingerprint': fingerprint,
+        'outputs': {os.path.basename(p): _hash_path(p) for p in output_paths}
+    }
+
+    path = _state_path(cache_settings)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -1,24 +1,36 @@
 import os
 import sys
+import io
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from scipy.stats import zscore
 import numpy as np
-import yaml
-import fnmatch
-from unidecode import unidecode as ud
+import argparse
 from datetime import datetime
-
-def get_and_verify_file_paths(config):
+from data_cache import get_cache_settings, load_config
+from workbook_reader import get_reader_settings, read_provider_workbook
+from team_names import canonicalize_teams
+from build_cache import compute_stage_fingerprint, is_stage_current, record_stage
+from zscore_matrix import (
+    build_stat_matrix, concat_stat_matrices, compute_bucket_matrix, stat_matrix_to_long
+)
+from recency_zscores import apply_recency, recency_enabled
+from shrinkage import apply_shrinkage
+
+def get_and_verify_file_paths(config, date_str=None, data_dir=None):
     """
     Builds and verifies the full paths for all required data files.
 
     Args:
         config (dict): The loaded configuration dictionary.
+        date_str (str): Snapshot date as YYYYMMDD. Defaults to today.
+        data_dir (str): Directory holding the data files. Defaults to the script directory.
 
     Returns:
         list: A list of file metadata objects if all files are found, otherwise None.
     """
-    today_str = datetime.now().strftime('%Y%m%d')
+    today_str = date_str or datetime.now().strftime('%Y%m%d')
+    data_dir = data_dir or os.path.dirname(__file__)
     verified_files = []
     all_files_found = True
 
@@ -33,7 +45,7 @@ def get_and_verify_file_paths(config):
                 continue
 
             expected_filename = f"{today_str}_{filename_template}"
-            file_path = os.path.join(os.path.dirname(__file__), expected_filename)
+            file_path = os.path.join(data_dir, expected_filename)
 
             print(f"Checking for '{expected_filename}'...", end=' ')
             if os.path.exists(file_path):
@@ -52,7 +64,7 @@ def get_and_verify_file_paths(config):
         
     return verified_files
 
-def validate_teams(df, canonical_teams, team_name_mappings):
+def validate_teams(df, canonical_teams, team_name_mappings, cache_settings=None):
     teams_from_file = df['Team']
     """
     Validates the list of teams from a file against the canonical list.
@@ -60,27 +72,21 @@ def validate_teams(df, canonical_teams, team_name_mappings):
     Args:
         teams_from_file (pd.Series): The 'Team' column from the DataFrame.
         canonical_teams (set): The set of canonical team names from the config.
+        team_name_mappings (list): Pattern-based mapping rules from the config.
+        cache_settings (dict): Cache settings for the persistent name cache.
 
     Returns:
         bool: True if validation passes, False otherwise.
     """
-    # Create a copy to work with
-    working_teams = teams_from_file.copy()
-
-    # 1. Apply pattern-based mapping rules first to the raw names
-    for i, team_name in working_teams.items():
-        original_name = str(team_name)
-        for rule in team_name_mappings:
-            if fnmatch.fnmatch(original_name, rule['pattern']):
-                working_teams.at[i] = rule['replacement']
-                print(f"    - Mapped '{original_name}' to '{rule['replacement']}' based on pattern '{rule['pattern']}'.")
-                break # Rule applied, move to the next team name
+    # 1. Apply the compiled pattern rules, then unidecode and strip whitespace,
+    #    once per distinct raw name (results persist in the team name cache)
+    cleaned_teams, mapped = canonicalize_teams(teams_from_file, team_name_mappings, cache_settings)
+    for original_name, (replacement, pattern) in mapped.items():
+        print(f"    - Mapped '{original_name}' to '{replacement}' based on pattern '{pattern}'.")
 
-    # 2. Apply unidecode and strip whitespace as the final cleaning step
-    cleaned_teams = working_teams.apply(lambda s: ud(str(s)).strip() if pd.notnull(s) else s)
     df['Team'] = cleaned_teams # Update the DataFrame in place
 
-    # 3. Perform the final validation
+    # 2. Perform the final validation
     final_unknown = set(cleaned_teams) - canonical_teams
     if final_unknown:
         print(f"  -> VALIDATION FAILED: Uncorrectable team names found: {final_unknown}")
@@ -93,66 +99,26 @@ def validate_teams(df, canonical_teams, team_name_mappings):
     print("  -> Team validation PASSED after applying mapping rules.")
     return True
 
-def process_stats_batch(df, stats_config):
+def process_stats_batch(df, stats_config, games_played_column=None):
     """
-    Takes a clean, wide DataFrame and processes a batch of stats from it.
+    Takes a clean, wide DataFrame and computes z-scores and ranks for a
+    batch of stats at once on a team x stat array.
 
     Args:
         df (pd.DataFrame): The clean DataFrame with a 'Team' column and stat columns.
         stats_config (list): The list of stat configuration dictionaries from the YAML.
+        games_played_column (str): Column holding each team's games played, if any.
 
     Returns:
-        list: A list of standardized, single-stat, vertical DataFrames.
+        StatMatrix: Values, z-scores and ranks for every stat found in df.
     """
-    all_stat_dfs = []
-    
     stat_names_to_process = [stat['name'] for stat in stats_config]
     print(f"  -> Batch processing stats: {stat_names_to_process}")
 
-    # Efficiently calculate z-scores for all relevant columns at once
-    for stat_name in stat_names_to_process:
-        if stat_name in df.columns:
-            df[f'{stat_name}_zscore'] = zscore(df[stat_name], nan_policy='omit')
-
-    # Now, loop through the config again to create the vertical DataFrames
-    for stat_cfg in stats_config:
-        stat_name = stat_cfg['name']
-        zscore_col = f'{stat_name}_zscore'
-
-        if zscore_col not in df.columns:
-            print(f"  -> WARNING: Stat '{stat_name}' not found in DataFrame. Skipping.")
-            continue
-
-        # Create a temporary DataFrame for this stat
-        stat_df = df[['Team', stat_name, zscore_col]].copy()
-        
-        # Handle sign reversal for stats where lower is better (e.g., Goals Against)
-        if stat_cfg.get('reverse_sign', False):
-            stat_df[zscore_col] = stat_df[zscore_col] * -1
-            print(f"    - Reversed sign for '{stat_name}'.")
-
-        # Calculate rank based on the (potentially reversed) z-score.
-        # We ALWAYS rank in descending order of z-score, because a higher z-score is always better.
-        stat_df['rank'] = stat_df[zscore_col].rank(method='min', ascending=False)
-        
-        # Rename columns to the final standardized vertical format
-        stat_df.rename(columns={
-            'Team': 'team',
-            stat_name: 'value',
-            zscore_col: 'zscore'
-        }, inplace=True)
-        
-        # Add the stat name as a new column
-        stat_df['stat'] = stat_name
-        
-        # Reorder columns to match the final output format
-        final_stat_df = stat_df[['team', 'stat', 'value', 'zscore', 'rank']]
-        
-        print(f"    - Processed vertical DataFrame for '{stat_name}'.")
-        all_stat_dfs.append(final_stat_df)
+    stat_matrix = build_stat_matrix(df, stats_config, games_played_column=games_played_column)
 
-    print(f"  -> Batch processing complete. Generated {len(all_stat_dfs)} stat DataFrames.")
-    return all_stat_dfs
+    print(f"  -> Batch processing complete. Generated z-scores for {len(stat_matrix.stats)} stats.")
+    return stat_matrix
 
 def create_tpi_rankings(z_overall_df, config):
     """
@@ -220,107 +186,38 @@ def create_tpi_rankings(z_overall_df, config):
     print(f"  -> TPI Rankings created for {len(tpi_df)} teams.")
     return tpi_df
 
-def calculate_bucket_zscores(z_overall_df, config):
+def calculate_bucket_zscores(stat_matrix, config):
     """
     Calculates weighted average z-scores per bucket per team.
     
     Args:
-        z_overall_df (pd.DataFrame): The combined DataFrame with all individual stat z-scores.
-        config (dict): The configuration dictionary containing bucket_weights.
+        stat_matrix (StatMatrix): Z-scores for every individual stat.
+        config (dict): The configuration dictionary containing the stat buckets and weights.
     
     Returns:
-        pd.DataFrame: A DataFrame with bucket-level z-scores and ranks.
+        StatMatrix: One '<bucket>_avg' column per bucket, with ranks.
     """
     print("\n--- Calculating Bucket-Level Z-Scores ---")
-    
-    bucket_weights = config.get('bucket_weights', {
-        'offensive_creation': 0.4,
-        'defensive_resistance': 0.3,
-        'pace_drivers': 0.3
-    })
-    
-    # Build a stat-to-bucket mapping from config
-    stat_to_bucket = {}
-    for provider in config.get('providers', []):
-        for file_info in provider.get('files', []):
-            for stat in file_info.get('stats', []):
-                stat_name = stat['name']
-                bucket = stat.get('bucket', 'unknown')
-                stat_to_bucket[stat_name] = bucket
-    
-    # Add bucket column to z_overall_df
-    z_overall_df['bucket'] = z_overall_df['stat'].map(stat_to_bucket)
-    
-    bucket_dfs = []
-    
-    for bucket_name in ['offensive_creation', 'defensive_resistance', 'pace_drivers']:
-        # Filter to this bucket's stats
-        bucket_data = z_overall_df[z_overall_df['bucket'] == bucket_name].copy()
-        
-        if len(bucket_data) == 0:
-            print(f"  -> WARNING: No stats found for bucket '{bucket_name}'. Skipping.")
-            continue
-        
-        # Calculate weighted average z-score per team
-        # Get weights for stats in this bucket
-        bucket_stats = bucket_data['stat'].unique()
-        stat_weights = {}
-        for provider in config.get('providers', []):
-            for file_info in provider.get('files', []):
-                for stat in file_info.get('stats', []):
-                    if stat['name'] in bucket_stats:
-                        stat_weights[stat['name']] = stat.get('weight', 1.0)
-        
-        # Add weight column
-        bucket_data['stat_weight'] = bucket_data['stat'].map(stat_weights)
-        
-        # Calculate weighted z-score
-        bucket_data['weighted_zscore'] = bucket_data['zscore'] * bucket_data['stat_weight']
-        
-        # Group by team and calculate weighted average
-        bucket_avg = bucket_data.groupby('team').agg({
-            'weighted_zscore': 'sum',
-            'stat_weight': 'sum'
-        }).reset_index()
-        
-        # Normalize by total weight
-        bucket_avg['zscore'] = bucket_avg['weighted_zscore'] / bucket_avg['stat_weight']
-        
-        # Calculate rank within bucket
-        bucket_avg['rank'] = bucket_avg['zscore'].rank(method='min', ascending=False)
-        
-        # Create output row
-        bucket_avg['stat'] = f"{bucket_name}_avg"
-        bucket_avg['value'] = bucket_avg['zscore']  # For consistency
-        bucket_avg['bucket'] = bucket_name
-        
-        # Select and reorder columns to match z_overall_df format
-        bucket_avg = bucket_avg[['team', 'stat', 'value', 'zscore', 'rank', 'bucket']]
-        
-        print(f"  -> Calculated {bucket_name}: {len(bucket_avg)} teams.")
-        bucket_dfs.append(bucket_avg)
-    
-    # Combine all bucket DataFrames
-    bucket_combined = pd.concat(bucket_dfs, ignore_index=True)
-    print(f"  -> Bucket calculation complete. Generated {len(bucket_combined)} bucket rows.")
-    
-    return bucket_combined
 
-def process_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings):
+    bucket_matrix = compute_bucket_matrix(stat_matrix, config)
+
+    print(f"  -> Bucket calculation complete. Generated {len(bucket_matrix.stats) * len(bucket_matrix.teams)} bucket rows.")
+    return bucket_matrix
+
+def load_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None):
     """
     Loads and standardizes a file from hockey-reference.com.
+
+    Returns:
+        pd.DataFrame: 'Team' plus the configured stat columns, or None on failure.
     """
     print(f"\nProcessing hockey-reference file: {os.path.basename(file_path)}")
     try:
-        df = pd.read_excel(file_path, sheet_name=0, header=file_info['header_row'])
+        df = read_provider_workbook(file_path, file_info, team_column=1, cache_settings=cache_settings, reader_settings=reader_settings)
     except Exception as e:
         print(f"  -> ERROR: Failed to read Excel file: {e}")
         return None
 
-    if len(df.columns) > 1:
-        df.rename(columns={df.columns[1]: 'Team'}, inplace=True)
-        print(f"  -> Renamed second column to 'Team'.")
-
     rows_to_exclude = file_info.get('rows_to_exclude', [])
     if rows_to_exclude and 'Team' in df.columns:
         original_rows = len(df)
@@ -332,7 +229,7 @@ def process_hockey_reference_file(file_info, file_path, canonical_teams, team_na
         print("  -> VALIDATION FAILED: 'Team' column not found.")
         return None
     
-    if not validate_teams(df, canonical_teams, team_name_mappings):
+    if not validate_teams(df, canonical_teams, team_name_mappings, cache_settings):
         return None
 
     # Reduce the DataFrame to only the 'Team' column and the stats needed for this file
@@ -343,23 +240,29 @@ def process_hockey_reference_file(file_info, file_path, canonical_teams, team_na
     missing_cols = [col for col in required_cols if col not in df.columns]
     if missing_cols:
         print(f"  -> ERROR: The following required stat columns are missing from the file: {missing_cols}")
-        print(f"     Available columns are: {list(df.columns)}")
+        print(f"     Available columns are: {df.attrs.get('available_columns', list(df.columns))}")
         return None
 
+    # Games played rides along for the shrinkage stage when the file has it
+    games_played_column = file_info.get('games_played_column')
+    if games_played_column and games_played_column in df.columns:
+        required_cols.append(games_played_column)
+
     reduced_df = df[required_cols].copy()
     print("  -> Reduced DataFrame to required columns. Head:")
     print(reduced_df.head())
+    return reduced_df
 
-    # Pass the clean, reduced DataFrame to the generic batch processor
-    return process_stats_batch(reduced_df, stats_for_this_file)
-
-def process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings):
+def load_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None):
     """
     Loads and standardizes a file from nhl.com.
+
+    Returns:
+        pd.DataFrame: 'Team' plus the configured stat columns, or None on failure.
     """
     print(f"\nProcessing nhl.com file: {os.path.basename(file_path)}")
     try:
-        df = pd.read_excel(file_path, sheet_name=0, header=file_info.get('header_row', 0))
+        df = read_provider_workbook(file_path, file_info, team_column='Team', cache_settings=cache_settings, reader_settings=reader_settings)
     except Exception as e:
         print(f"  -> ERROR: Failed to read Excel file: {e}")
         return None
@@ -369,7 +272,7 @@ def process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappin
         print("  -> VALIDATION FAILED: 'Team' column not found.")
         return None
     
-    if not validate_teams(df, canonical_teams, team_name_mappings):
+    if not validate_teams(df, canonical_teams, team_name_mappings, cache_settings):
         return None
 
     # Reduce the DataFrame to only the 'Team' column and the stats needed for this file
@@ -380,15 +283,127 @@ def process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappin
     missing_cols = [col for col in required_cols if col not in df.columns]
     if missing_cols:
         print(f"  -> ERROR: The following required stat columns are missing from the file: {missing_cols}")
-        print(f"     Available columns are: {list(df.columns)}")
+        print(f"     Available columns are: {df.attrs.get('available_columns', list(df.columns))}")
         return None
 
+    # Games played rides along for the shrinkage stage when the file has it
+    games_played_column = file_info.get('games_played_column')
+    if games_played_column and games_played_column in df.columns:
+        required_cols.append(games_played_column)
+
     reduced_df = df[required_cols].copy()
     print("  -> Reduced DataFrame to required columns. Head:")
     print(reduced_df.head())
+    return reduced_df
+
+PROVIDER_LOADERS = {
+    "hockey-reference.com": load_hockey_reference_file,
+    "nhl.com": load_nhl_com_file
+}
+
+def load_provider_file(file_to_process, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None):
+    """
+    Runs the provider-specific loader for a single verified file.
+
+    Args:
+        file_to_process (dict): A file metadata object from get_and_verify_file_paths.
+        canonical_teams (set): The set of canonical team names from the config.
+        team_name_mappings (list): Pattern-based team name mapping rules.
+        cache_settings (dict): Workbook cache settings, or None to bypass the cache.
+        reader_settings (dict): Workbook reader settings from get_reader_settings.
 
+    Returns:
+        pd.DataFrame: The validated 'Team' + stat columns, or None if the file failed.
+    """
+    provider_name = file_to_process['provider_name']
+    loader = PROVIDER_LOADERS.get(provider_name)
+    if loader is None:
+        print(f"\nWARNING: No processor found for provider '{provider_name}'.")
+        return None
+    return loader(file_to_process['file_info'], file_to_process['file_path'], canonical_teams, team_name_mappings, cache_settings, reader_settings)
+
+def ingest_file(file_to_process, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None):
+    """
+    Loads a single verified file and computes its per-stat z-scores.
+    See load_provider_file for the arguments.
+
+    Returns:
+        StatMatrix: The file's per-stat z-scores, or None if the file failed.
+    """
+    reduced_df = load_provider_file(file_to_process, canonical_teams, team_name_mappings, cache_settings, reader_settings)
+    if reduced_df is None:
+        return None
     # Pass the clean, reduced DataFrame to the generic batch processor
-    return process_stats_batch(reduced_df, stats_for_this_file)
+    file_info = file_to_process['file_info']
+    return process_stats_batch(reduced_df, file_info.get('stats', []), file_info.get('games_played_column'))
+
+def _ingest_file_with_log(args):
+    """
+    Pool worker: runs ingest_file and captures its console output so the
+    parent can replay logs in file order instead of interleaving them.
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        result = ingest_file(*args)
+    return result, log.getvalue()
+
+def get_ingestion_workers(config):
+    """
+    Reads the ingestion worker count from config ('ingestion: workers').
+
+    A value of 0 (or a missing value) means one worker per CPU core.
+    """
+    workers = (config.get('ingestion', {}) or {}).get('workers', 0)
+    if not workers or workers < 0:
+        workers = os.cpu_count() or 1
+    return int(workers)
+
+def ingest_files_by_file(file_list, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None, workers=1):
+    """
+    Ingests every verified file and returns one result per file.
+
+    Files are fanned out across a process pool when more than one worker is
+    available. Results (and each file's console log) are returned in
+    file_list order, so the output is identical to the serial path.
+
+    Args:
+        file_list (list): File metadata objects from get_and_verify_file_paths.
+        canonical_teams (set): The set of canonical team names from the config.
+        team_name_mappings (list): Pattern-based team name mapping rules.
+        cache_settings (dict): Workbook cache settings, or None to bypass the cache.
+        reader_settings (dict): Workbook reader settings from get_reader_settings.
+        workers (int): Maximum number of worker processes.
+
+    Returns:
+        list: For each file, its StatMatrix or None.
+    """
+    workers = max(1, min(workers, len(file_list)))
+
+    if workers == 1:
+        return [ingest_file(f, canonical_teams, team_name_mappings, cache_settings, reader_settings) for f in file_list]
+
+    print(f"\nIngesting {len(file_list)} files with {workers} worker processes...")
+    tasks = [(f, canonical_teams, team_name_mappings, cache_settings, reader_settings) for f in file_list]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in submission order regardless of completion order
+        for stat_matrix, log in executor.map(_ingest_file_with_log, tasks):
+            print(log, end='')
+            results.append(stat_matrix)
+    return results
+
+def ingest_files(file_list, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None, workers=1):
+    """
+    Ingests every verified file and keeps the ones that produced stats, in
+    file_list order. See ingest_files_by_file for the arguments.
+
+    Returns:
+        list: StatMatrix blocks, in config order.
+    """
+    return [
+        stat_matrix for stat_matrix in ingest_files_by_file(file_list, canonical_teams, team_name_mappings, cache_settings, reader_settings, workers)
+        if stat_matrix is not None and stat_matrix.stats
+    ]
 
 def perform_sanity_checks(df):
     """
@@ -419,23 +434,143 @@ def perform_sanity_checks(df):
 
     print("\n--- Sanity Checks Complete ---")
 
-def main():
+def combine_z_overall(stat_matrix, bucket_matrix):
     """
-    Main function to orchestrate the z-score calculation pipeline.
+    Exports per-stat and bucket z-scores to the long zOverall view and ranks everything.
+
+    Args:
+        stat_matrix (StatMatrix): Z-scores for every individual stat.
+        bucket_matrix (StatMatrix): Output of calculate_bucket_zscores.
+
+    Returns:
+        pd.DataFrame: zOverall, sorted by z-score with overall rank and date.
     """
-    config_path = os.path.join(os.path.dirname(__file__), 'config_v2.yaml')
-    try:
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
-    except FileNotFoundError:
-        print(f"ERROR: Configuration file not found at {config_path}")
-        sys.exit(1)
+    # The long layout exists only here, at export time
+    z_overall_df = pd.concat([stat_matrix_to_long(stat_matrix), stat_matrix_to_long(bucket_matrix)], ignore_index=True)
+
+    # Sort, add rank, and add date as requested
+    z_overall_df = z_overall_df.sort_values(by='zscore', ascending=False).reset_index(drop=True)
+    z_overall_df['zOverallRank'] = z_overall_df.index + 1
+    z_overall_df['Date'] = datetime.now().strftime('%Y%m%d')
+
+    # Reorder columns
+    return z_overall_df[['zOverallRank', 'Date', 'team', 'stat', 'value', 'zscore', 'rank']]
+
+def build_z_overall(stat_matrices, config, date_str=None):
+    """
+    Joins the per-file stat matrices, adds bucket averages and exports the long zOverall view.
+
+    Args:
+        stat_matrices (list): StatMatrix blocks from ingestion, in config order.
+        config (dict): The configuration dictionary.
+        date_str (str): Date of the provider files (YYYYMMDD); recency
+            weighting folds in stored snapshots before it. Defaults to today.
+
+    Returns:
+        pd.DataFrame: zOverall, sorted by z-score with overall rank and date.
+    """
+    stat_matrix = concat_stat_matrices(stat_matrices)
+
+    # Rolling / EWM stats swap in recency-weighted z-scores (no-op for season stats)
+    stat_matrix = apply_recency(stat_matrix, config, date_str)
+
+    # Shrink small-sample z-scores toward the league average (no-op unless enabled)
+    stat_matrix = apply_shrinkage(stat_matrix, config)
+
+    # Calculate bucket-level z-scores
+    bucket_matrix = calculate_bucket_zscores(stat_matrix, config)
+    return combine_z_overall(stat_matrix, bucket_matrix)
+
+def create_team_totals(z_overall_df, config):
+    """
+    Creates the team_total_zscores view: TPI as a weighted sum of bucket averages.
+
+    Args:
+        z_overall_df (pd.DataFrame): zOverall including bucket average rows.
+        config (dict): The configuration dictionary containing bucket_weights.
+
+    Returns:
+        pd.DataFrame: One row per team with Rank, team, zTotal and Date.
+    """
+    # Use ONLY bucket averages for TPI calculation
+    bucket_rows = z_overall_df[z_overall_df['stat'].str.contains('_avg', na=False)].copy()
+
+    # Get bucket weights from config
+    bucket_weights = config.get('bucket_weights', {
+        'offensive_creation': 0.4,
+        'defensive_resistance': 0.3,
+        'pace_drivers': 0.3
+    })
+
+    # Map stat names to bucket names and apply weights
+    def get_bucket_weight(stat_name):
+        if 'offensive_creation' in stat_name:
+            return bucket_weights.get('offensive_creation', 0.4)
+        elif 'defensive_resistance' in stat_name:
+            return bucket_weights.get('defensive_resistance', 0.3)
+        elif 'pace_drivers' in stat_name:
+            return bucket_weights.get('pace_drivers', 0.3)
+        return 1.0
+
+    bucket_rows['bucket_weight'] = bucket_rows['stat'].apply(get_bucket_weight)
+    bucket_rows['weighted_zscore'] = bucket_rows['zscore'] * bucket_rows['bucket_weight']
+
+    # Calculate TPI as weighted sum of bucket averages
+    team_totals = bucket_rows.groupby('team')['weighted_zscore'].sum().reset_index()
+    team_totals.rename(columns={'weighted_zscore': 'zTotal'}, inplace=True)
+    team_totals = team_totals.sort_values(by='zTotal', ascending=False).reset_index(drop=True)
+
+    # Add Rank and Date columns
+    team_totals['Rank'] = team_totals.index + 1
+    team_totals['Date'] = datetime.now().strftime('%Y%m%d')
+
+    # Reorder columns to have Rank first
+    return team_totals[['Rank', 'team', 'zTotal', 'Date']]
+
+TPI_OUTPUT_FILES = {
+    'zOverall': 'zOverall.csv',
+    'team_total_zscores': 'team_total_zscores.csv',
+    'tpi_rankings': 'tpi_rankings.csv'
+}
+
+def load_tpi_outputs(output_dir=None):
+    """
+    Reads previously written TPI outputs back from disk.
+
+    Returns:
+        dict: {output name: pd.DataFrame} for every output file that exists.
+    """
+    output_dir = output_dir or os.path.dirname(__file__)
+    outputs = {}
+    for name, filename in TPI_OUTPUT_FILES.items():
+        path = os.path.join(output_dir, filename)
+        if os.path.exists(path):
+            outputs[name] = pd.read_csv(path)
+    return outputs
+
+def run_tpi_stage(config, force=False, write=True, output_dir=None):
+    """
+    Runs Step 1 in-process: verify files, ingest, and build zOverall,
+    team totals and TPI rankings.
+
+    Args:
+        config (dict): The configuration dictionary.
+        force (bool): Recompute even if the build cache says outputs are current.
+        write (bool): Write the CSV outputs (and record the build cache).
+        output_dir (str): Output directory. Defaults to the script directory.
+
+    Returns:
+        dict: {'zOverall', 'team_total_zscores', 'tpi_rankings'} DataFrames
+        ({} if no data was processed), or None on failure.
+    """
+    output_dir = output_dir or os.path.dirname(__file__)
 
     # Get and verify the list of files to process.
-    file_list = get_and_verify_file_paths(config)
+    date_str = datetime.now().strftime('%Y%m%d')
+    file_list = get_and_verify_file_paths(config, date_str)
     if not file_list:
         print("\nOne or more required data files are missing. Exiting.")
-        sys.exit(1)
+        return None
     else:
         print("\nAll required data files found. Proceeding...")
 
@@ -444,114 +579,109 @@ def main():
     team_name_mappings = config.get('team_name_mappings', [])
     if not canonical_teams:
         print("ERROR: 'canonical_teams' list not found or empty in config. Exiting.")
-        sys.exit(1)
+        return None
 
-    all_final_dfs = []
+    # Parsed workbooks are cached by content hash, so unchanged inputs skip Excel parsing
+    cache_settings = get_cache_settings(config)
+    reader_settings = get_reader_settings(config)
+
+    # Skip the whole stage if inputs, config and code match the last run
+    output_paths = [os.path.join(output_dir, filename) for filename in TPI_OUTPUT_FILES.values()]
+    input_paths = [f['file_path'] for f in file_list]
+    if recency_enabled(config):
+        # Recency-weighted stats also read the snapshot store
+        from snapshot_store import get_history_settings, MANIFEST_FILENAME
+        input_paths.append(os.path.join(get_history_settings(config)['store_dir'], MANIFEST_FILENAME))
+    fingerprint = compute_stage_fingerprint(
+        'tpi', config, input_paths, {'date': date_str}
+    )
+    if write and not force and is_stage_current('tpi', fingerprint, output_paths, cache_settings):
+        print("\nInputs, config and code unchanged since the last run. Outputs are up to date; skipping (use --force to rebuild).")
+        return load_tpi_outputs(output_dir)
 
     # --- Main Processing Loop ---
-    for file_to_process in file_list:
-        provider_name = file_to_process['provider_name']
-        file_path = file_to_process['file_path']
-        file_info = file_to_process['file_info']
-
-        list_of_stat_dfs = None
-        if provider_name == "hockey-reference.com":
-            list_of_stat_dfs = process_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings)
-        elif provider_name == "nhl.com":
-            list_of_stat_dfs = process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings)
-        else:
-            print(f"\nWARNING: No processor found for provider '{provider_name}'.")
+    # Provider files are independent, so they are ingested across a process pool
+    workers = get_ingestion_workers(config)
+    stat_matrices = ingest_files(file_list, canonical_teams, team_name_mappings, cache_settings, reader_settings, workers)
 
-        if list_of_stat_dfs:
-            all_final_dfs.extend(list_of_stat_dfs)
-
-    print(f"\n\nPipeline complete. Total vertical DataFrames created: {len(all_final_dfs)}")
+    print(f"\n\nPipeline complete. Total stats processed: {sum(len(m.stats) for m in stat_matrices)}")
 
     # --- Final Output Generation ---
-    if not all_final_dfs:
+    if not stat_matrices:
         print("\nNo data was processed. Exiting without creating output files.")
-        sys.exit(0)
+        return {}
+
+    outputs = {}
 
     # 1. Create the zOverall.csv file
     try:
-        z_overall_df = pd.concat(all_final_dfs, ignore_index=True)
-
-        # Calculate bucket-level z-scores
-        bucket_df = calculate_bucket_zscores(z_overall_df, config)
-        
-        # Append bucket rows to z_overall_df
-        # Ensure columns match before concatenating
-        bucket_df_aligned = bucket_df[['team', 'stat', 'value', 'zscore', 'rank']].copy()
-        z_overall_df = pd.concat([z_overall_df, bucket_df_aligned], ignore_index=True)
-
-        # Sort, add rank, and add date as requested
-        z_overall_df = z_overall_df.sort_values(by='zscore', ascending=False).reset_index(drop=True)
-        z_overall_df['zOverallRank'] = z_overall_df.index + 1
-        z_overall_df['Date'] = datetime.now().strftime('%Y%m%d')
-
-        # Reorder columns
-        z_overall_df = z_overall_df[['zOverallRank', 'Date', 'team', 'stat', 'value', 'zscore', 'rank']]
+        z_overall_df = build_z_overall(stat_matrices, config, date_str)
 
         # Perform sanity checks on the final combined data
         perform_sanity_checks(z_overall_df)
-        z_overall_output_path = os.path.join(os.path.dirname(__file__), 'zOverall.csv')
-        z_overall_df.to_csv(z_overall_output_path, index=False)
-        print(f"\nSuccessfully created '{os.path.basename(z_overall_output_path)}' with {len(z_overall_df)} rows.")
+        outputs['zOverall'] = z_overall_df
+        if write:
+            z_overall_output_path = os.path.join(output_dir, TPI_OUTPUT_FILES['zOverall'])
+            z_overall_df.to_csv(z_overall_output_path, index=False)
+            print(f"\nSuccessfully created '{os.path.basename(z_overall_output_path)}' with {len(z_overall_df)} rows.")
     except Exception as e:
         print(f"\nERROR: Failed to create zOverall.csv: {e}")
-        return # Stop processing if we can't create the main file
+        return None # Stop processing if we can't create the main file
 
     # 2. Create the team_total_zscores.csv file (TPI - Team DFS Power Index)
+    outputs_complete = True
     try:
-        # Use ONLY bucket averages for TPI calculation
-        bucket_rows = z_overall_df[z_overall_df['stat'].str.contains('_avg', na=False)].copy()
-        
-        # Get bucket weights from config
-        bucket_weights = config.get('bucket_weights', {
-            'offensive_creation': 0.4,
-            'defensive_resistance': 0.3,
-            'pace_drivers': 0.3
-        })
-        
-        # Map stat names to bucket names and apply weights
-        def get_bucket_weight(stat_name):
-            if 'offensive_creation' in stat_name:
-                return bucket_weights.get('offensive_creation', 0.4)
-            elif 'defensive_resistance' in stat_name:
-                return bucket_weights.get('defensive_resistance', 0.3)
-            elif 'pace_drivers' in stat_name:
-                return bucket_weights.get('pace_drivers', 0.3)
-            return 1.0
-        
-        bucket_rows['bucket_weight'] = bucket_rows['stat'].apply(get_bucket_weight)
-        bucket_rows['weighted_zscore'] = bucket_rows['zscore'] * bucket_rows['bucket_weight']
-        
-        # Calculate TPI as weighted sum of bucket averages
-        team_totals = bucket_rows.groupby('team')['weighted_zscore'].sum().reset_index()
-        team_totals.rename(columns={'weighted_zscore': 'zTotal'}, inplace=True)
-        team_totals = team_totals.sort_values(by='zTotal', ascending=False).reset_index(drop=True)
-
-        # Add Rank and Date columns
-        team_totals['Rank'] = team_totals.index + 1
-        team_totals['Date'] = datetime.now().strftime('%Y%m%d')
-
-        # Reorder columns to have Rank first
-        team_totals = team_totals[['Rank', 'team', 'zTotal', 'Date']]
-
-        team_totals_output_path = os.path.join(os.path.dirname(__file__), 'team_total_zscores.csv')
-        team_totals.to_csv(team_totals_output_path, index=False)
-        print(f"Successfully created '{os.path.basename(team_totals_output_path)}' with {len(team_totals)} teams (TPI = Team DFS Power Index).")
+        team_totals = create_team_totals(z_overall_df, config)
+        outputs['team_total_zscores'] = team_totals
+        if write:
+            team_totals_output_path = os.path.join(output_dir, TPI_OUTPUT_FILES['team_total_zscores'])
+            team_totals.to_csv(team_totals_output_path, index=False)
+            print(f"Successfully created '{os.path.basename(team_totals_output_path)}' with {len(team_totals)} teams (TPI = Team DFS Power Index).")
     except Exception as e:
         print(f"\nERROR: Failed to create team_total_zscores.csv: {e}")
+        outputs_complete = False
 
     # 3. Create the tpi_rankings.csv file (detailed TPI with bucket breakdowns)
     try:
         tpi_rankings = create_tpi_rankings(z_overall_df, config)
-        tpi_rankings_output_path = os.path.join(os.path.dirname(__file__), 'tpi_rankings.csv')
-        tpi_rankings.to_csv(tpi_rankings_output_path, index=False)
-        print(f"Successfully created '{os.path.basename(tpi_rankings_output_path)}' with {len(tpi_rankings)} teams.")
+        outputs['tpi_rankings'] = tpi_rankings
+        if write:
+            tpi_rankings_output_path = os.path.join(output_dir, TPI_OUTPUT_FILES['tpi_rankings'])
+            tpi_rankings.to_csv(tpi_rankings_output_path, index=False)
+            print(f"Successfully created '{os.path.basename(tpi_rankings_output_path)}' with {len(tpi_rankings)} teams.")
     except Exception as e:
         print(f"\nERROR: Failed to create tpi_rankings.csv: {e}")
+        outputs_complete = False
+
+    # 4. Precompute every pairing's GOI for the GOI step and hypothetical lookups.
+    # The matrix is only a cache (the GOI step rebuilds it), so a failure here
+    # does not invalidate the TPI outputs.
+    if write and 'tpi_rankings' in outputs:
+        try:
+            from matchup_matrix import get_matchup_matrix
+            get_matchup_matrix(config, outputs['tpi_rankings'])
+        except Exception as e:
+            print(f"\nWARNING: Failed to build the matchup matrix: {e}")
+
+    if write and outputs_complete:
+        record_stage('tpi', fingerprint, output_paths, cache_settings)
+
+    return outputs
+
+def main():
+    """
+    Main function to orchestrate the z-score calculation pipeline.
+    """
+    parser = argparse.ArgumentParser(description="Calculate z-scores and TPI from today's provider files")
+    parser.add_argument('--force', action='store_true', help="Recompute even if inputs, config and code are unchanged.")
+    args = parser.parse_args()
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    if run_tpi_stage(config, force=args.force) is None:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,31 +1,24 @@
 import os
 import sys
 import pandas as pd
-from scipy.stats import zscore
-import numpy as np
-import yaml
-import fnmatch
-from unidecode import unidecode as ud
 from datetime import datetime
+from data_cache import get_cache_settings
+from workbook_reader import get_reader_settings, read_provider_workbook
+from team_names import canonicalize_teams
+from guardrails import get_guardrail_rules, compile_guardrail_rules, apply_guardrail_rules
+from guardrail_inputs import load_guardrail_inputs
 
 # ================================
 # GOI v2.1 MODEL GUARDRAILS
 # ================================
 GOI_VERSION = "v2.1"
-EARLY_SEASON_GAMES = 10
-SH_CAP_EARLY = 0.095   # 9.5%
-SV_CAP_EARLY = 0.900   # .900
-PP_CAP_EARLY = 0.40    # Reduce reliance by 40%
-
-HOT_GOALIE_SV_THRESHOLD = 0.925
-HOT_GOALIE_PENALTY = -0.7
-
-LINE_MOVE_THRESHOLD = 0.15  # 15 cents
-MIN_DOG_Z_FOR_SHARP_MOVE = 2.1
 
 def apply_goi_guardrails(df, config, games_played_dict, opp_goalie_last3_sv, market_lines):
     """
     Applies GOI v2.1 guardrails to z-scores for matchup modeling.
+
+    The rules come from the 'guardrails' block of config_v2.yaml (see
+    guardrails.py); each is one vectorized update over all affected teams.
     
     Args:
         df: zOverall DataFrame
@@ -40,60 +33,14 @@ def apply_goi_guardrails(df, config, games_played_dict, opp_goalie_last3_sv, mar
     print(f"\n--- Applying GOI {GOI_VERSION} Guardrails ---")
     
     df = df.copy()
-    df['goi_z'] = df['zscore'].copy()
-
-    # 1. Early-Season Volatility Caps
-    for team, gp in games_played_dict.items():
-        if gp >= EARLY_SEASON_GAMES:
-            continue
-
-        mask = df['team'] == team
-        sh_mask = df['stat'].str.contains('sh%|shoot', case=False, na=False)
-        sv_mask = df['stat'].str.contains('sv%|save', case=False, na=False)
-        pp_mask = df['stat'].str.contains('pp%', case=False, na=False)
-
-        # Cap shooting % regression
-        df.loc[mask & sh_mask, 'goi_z'] = np.clip(
-            df.loc[mask & sh_mask, 'goi_z'],
-            -np.inf, zscore([SH_CAP_EARLY] * 32)[0]
-        )
-
-        # Cap save % weight
-        df.loc[mask & sv_mask, 'goi_z'] = np.clip(
-            df.loc[mask & sv_mask, 'goi_z'],
-            zscore([SV_CAP_EARLY] * 32)[0], np.inf
-        )
-
-        # Reduce PP% reliance
-        df.loc[mask & pp_mask, 'goi_z'] *= (1 - PP_CAP_EARLY)
-
-        if (mask & (sh_mask | sv_mask | pp_mask)).any():
-            print(f"  -> Early-season cap applied to {team} (GP: {gp})")
-
-    # 2. Hot Goalie Alert
-    for team, sv in opp_goalie_last3_sv.items():
-        if sv > HOT_GOALIE_SV_THRESHOLD:
-            high_shot_mask = (
-                (df['team'] == team) &
-                (df['stat'].str.contains('sog|shots|cf', case=False, na=False))
-            )
-            if high_shot_mask.any():
-                df.loc[high_shot_mask, 'goi_z'] += HOT_GOALIE_PENALTY
-                print(f"  -> Hot Goalie Alert: {team} vs SV%={sv:.3f} → -0.7 GOI")
-
-    # 3. Market Drift Cross-Check
-    for team, line_data in market_lines.items():
-        move = line_data.get('close_move', 0)
-        ml = line_data.get('ml', 0)
-        is_dog = ml > 0
-
-        if is_dog and move > LINE_MOVE_THRESHOLD:
-            dog_mask = df['team'] == team
-            current_max = df.loc[dog_mask, 'goi_z'].max()
-            if current_max < MIN_DOG_Z_FOR_SHARP_MOVE:
-                df.loc[dog_mask, 'goi_z'] = np.nan  # Fade entirely
-                print(f"  -> Sharp money fade: {team} +{ml} moved {move:+.0f}¢ → requires {MIN_DOG_Z_FOR_SHARP_MOVE}σ")
-
+    rules = compile_guardrail_rules(get_guardrail_rules(config))
+    inputs = {
+        'games_played': games_played_dict,
+        'opp_goalie_sv': opp_goalie_last3_sv,
+        'ml': {team: line_data.get('ml', 0) for team, line_data in market_lines.items()},
+        'close_move': {team: line_data.get('close_move', 0) for team, line_data in market_lines.items()}
+    }
+    df['goi_z'] = apply_guardrail_rules(df, rules, inputs)
     return df
 
 # ================================
@@ -135,19 +82,11 @@ def get_and_verify_file_paths(config):
         
     return verified_files
 
-def validate_teams(df, canonical_teams, team_name_mappings):
+def validate_teams(df, canonical_teams, team_name_mappings, cache_settings=None):
     teams_from_file = df['Team']
-    working_teams = teams_from_file.copy()
-
-    for i, team_name in working_teams.items():
-        original_name = str(team_name)
-        for rule in team_name_mappings:
-            if fnmatch.fnmatch(original_name, rule['pattern']):
-                working_teams.at[i] = rule['replacement']
-                print(f"    - Mapped '{original_name}' to '{rule['replacement']}' based on pattern '{rule['pattern']}'.")
-                break
-
-    cleaned_teams = working_teams.apply(lambda s: ud(str(s)).strip() if pd.notnull(s) else s)
+    cleaned_teams, mapped = canonicalize_teams(teams_from_file, team_name_mappings, cache_settings)
+    for original_name, (replacement, pattern) in mapped.items():
+        print(f"    - Mapped '{original_name}' to '{replacement}' based on pattern '{pattern}'.")
     df['Team'] = cleaned_teams
 
     final_unknown = set(cleaned_teams) - canonical_teams
@@ -163,6 +102,8 @@ def validate_teams(df, canonical_teams, team_name_mappings):
     return True
 
 def process_stats_batch(df, stats_config):
+    from scipy.stats import zscore
+
     all_stat_dfs = []
     stat_names_to_process = [stat['name'] for stat in stats_config]
     print(f"  -> Batch processing stats: {stat_names_to_process}")
@@ -274,23 +215,19 @@ def calculate_bucket_zscores(z_overall_df, config):
     bucket_combined = pd.concat(bucket_dfs, ignore_index=True)
     return bucket_combined
 
-def process_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings):
+def process_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None):
     print(f"\nProcessing hockey-reference: {os.path.basename(file_path)}")
     try:
-        df = pd.read_excel(file_path, sheet_name=0, header=file_info['header_row'])
+        df = read_provider_workbook(file_path, file_info, team_column=1, cache_settings=cache_settings, reader_settings=reader_settings)
     except Exception as e:
         print(f"  -> ERROR: {e}")
         return None
 
-    if len(df.columns) > 1:
-        df.rename(columns={df.columns[1]: 'Team'}, inplace=True)
-        print(f"  -> Renamed col[1] → 'Team'.")
-
     rows_to_exclude = file_info.get('rows_to_exclude', [])
     if rows_to_exclude and 'Team' in df.columns:
         df = df[~df['Team'].isin(rows_to_exclude)].reset_index(drop=True)
 
-    if 'Team' not in df.columns or not validate_teams(df, canonical_teams, team_name_mappings):
+    if 'Team' not in df.columns or not validate_teams(df, canonical_teams, team_name_mappings, cache_settings):
         return None
 
     stats_for_this_file = file_info.get('stats', [])
@@ -304,15 +241,15 @@ def process_hockey_reference_file(file_info, file_path, canonical_teams, team_na
     reduced_df = df[required_cols].copy()
     return process_stats_batch(reduced_df, stats_for_this_file)
 
-def process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings):
+def process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings, cache_settings=None, reader_settings=None):
     print(f"\nProcessing nhl.com: {os.path.basename(file_path)}")
     try:
-        df = pd.read_excel(file_path, sheet_name=0, header=file_info.get('header_row', 0))
+        df = read_provider_workbook(file_path, file_info, team_column='Team', cache_settings=cache_settings, reader_settings=reader_settings)
     except Exception as e:
         print(f"  -> ERROR: {e}")
         return None
 
-    if 'Team' not in df.columns or not validate_teams(df, canonical_teams, team_name_mappings):
+    if 'Team' not in df.columns or not validate_teams(df, canonical_teams, team_name_mappings, cache_settings):
         return None
 
     stats_for_this_file = file_info.get('stats', [])
@@ -350,6 +287,8 @@ def perform_sanity_checks(df):
 # MAIN + GOI INTEGRATION
 # ================================
 def main():
+    import yaml
+
     config_path = os.path.join(os.path.dirname(__file__), 'config_v2.yaml')
     try:
         with open(config_path, 'r') as f:
@@ -369,6 +308,9 @@ def main():
         print("ERROR: 'canonical_teams' missing in config.")
         sys.exit(1)
 
+    cache_settings = get_cache_settings(config)
+    reader_settings = get_reader_settings(config)
+
     all_final_dfs = []
     for file_to_process in file_list:
         provider_name = file_to_process['provider_name']
@@ -376,9 +318,9 @@ def main():
         file_info = file_to_process['file_info']
 
         if provider_name == "hockey-reference.com":
-            dfs = process_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings)
+            dfs = process_hockey_reference_file(file_info, file_path, canonical_teams, team_name_mappings, cache_settings, reader_settings)
         elif provider_name == "nhl.com":
-            dfs = process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings)
+            dfs = process_nhl_com_file(file_info, file_path, canonical_teams, team_name_mappings, cache_settings, reader_settings)
         else:
             continue
 
@@ -404,14 +346,8 @@ def main():
     z_overall_df.to_csv(z_overall_output_path, index=False)
     print(f"\n→ zOverall.csv created: {len(z_overall_df)} rows")
 
-    # === GOI GUARDRAILS INPUTS (YOU PROVIDE THESE) ===
-    # Example structure — replace with your data loader
-    games_played_dict = {team: 6 for team in z_overall_df['team'].unique()}  # ← UPDATE
-    opp_goalie_last3_sv = {"Columbus Blue Jackets": 0.957}  # ← UPDATE
-    market_lines = {
-        "Columbus Blue Jackets": {"ml": 145, "close_move": 0.25},
-        "Washington Capitals": {"ml": -190, "close_move": -0.25}
-    }  # ← UPDATE
+    # Guardrail inputs come from local drops (see guardrail_inputs.py)
+    games_played_dict, opp_goalie_last3_sv, market_lines = load_guardrail_inputs(config)
 
     # Apply GOI v2.1
     z_overall_df = apply_goi_guardrails(
@@ -1,6 +1,9 @@
 import os
-import pandas as pd
+import argparse
 from datetime import datetime
+from data_cache import get_cache_settings
+from build_cache import compute_stage_fingerprint, is_stage_current, record_stage
+from goi_store import get_goi_store_dir, list_goi_dates, write_goi_store
 
 def create_team_mapping():
     """
@@ -42,110 +45,271 @@ def create_team_mapping():
     }
     return team_mapping
 
-def calculate_goi(tpi_rankings, schedule):
+DEFAULT_GOI_SETTINGS = {
+    'offense_weight': 0.6,
+    'pace_weight': 0.4
+}
+
+def get_goi_settings(config):
+    """
+    Returns the 'goi' block of the config merged over the defaults
+    (the offense / pace blend of each team's GOI).
+    """
+    settings = dict(DEFAULT_GOI_SETTINGS)
+    settings.update((config or {}).get('goi', {}) or {})
+    return settings
+
+def compute_goi_arrays(home_dr, away_dr, home_pace, away_pace, goi_settings=None):
+    """
+    GOI for many games at once from each side's defensive_resistance and
+    pace_drivers arrays.
+
+    Returns:
+        tuple: (home_goi, away_goi, game_pace, total_opportunity) arrays.
+    """
+    goi_settings = goi_settings or DEFAULT_GOI_SETTINGS
+    offense_weight = goi_settings['offense_weight']
+    pace_weight = goi_settings['pace_weight']
+
+    # Home offensive opportunity = Away's defensive resistance vs Home's
+    # (and the mirror image for the away side)
+    home_goi_offense = away_dr - home_dr
+    away_goi_offense = home_dr - away_dr
+
+    # Pace opportunity = average of both teams' pace drivers
+    game_pace = (home_pace + away_pace) / 2
+
+    # Total GOI per team (0.6 offense, 0.4 pace by default)
+    home_goi = offense_weight * home_goi_offense + pace_weight * game_pace
+    away_goi = offense_weight * away_goi_offense + pace_weight * game_pace
+    return home_goi, away_goi, game_pace, home_goi + away_goi
+
+def _round4(values):
+    # Python's round() per value, as the per-game loop did (np.round can
+    # differ in the last digit)
+    return [round(v, 4) for v in values.tolist()]
+
+def calculate_goi(tpi_rankings, schedule, goi_settings=None, matrix=None, adjustments=None):
     """
     Calculates Game Opportunity Index (GOI) for each game.
+
+    Every pairing is precomputed in the matchup matrix; home and away teams
+    are mapped to its rows and columns once and each game is a lookup.
     
     Args:
         tpi_rankings (pd.DataFrame): DataFrame with TPI scores per team
         schedule (pd.DataFrame): DataFrame with game schedule
+        goi_settings (dict): Offense / pace blend from get_goi_settings.
+            Defaults to 0.6 offense, 0.4 pace.
+        matrix (MatchupMatrix): Precomputed pairings for this TPI and blend
+            (see matchup_matrix.get_matchup_matrix). Built here if omitted.
+        adjustments (tuple): Optional (home, away) arrays aligned with the
+            schedule rows, added to Home_GOI / Away_GOI (see
+            schedule_context.schedule_goi_adjustments).
     
     Returns:
         pd.DataFrame: DataFrame with GOI calculations per game
     """
+    import pandas as pd
+
     print("\n--- Calculating Game Opportunity Index (GOI) ---")
-    
-    # Create a dictionary for quick TPI lookups
-    tpi_dict = {}
-    for idx, row in tpi_rankings.iterrows():
-        tpi_dict[row['team']] = {
-            'offensive_creation': row['offensive_creation'],
-            'defensive_resistance': row['defensive_resistance'],
-            'pace_drivers': row['pace_drivers']
-        }
-    
-    goi_results = []
-    
-    for idx, game in schedule.iterrows():
-        home_team = game['Home']
-        away_team = game['Visitor']
-        game_date = game['Date']
-        
-        # Skip if teams not in TPI data
-        if home_team not in tpi_dict or away_team not in tpi_dict:
-            print(f"  -> WARNING: Skipping game {game_date} - {away_team} @ {home_team} (team not found in TPI data)")
-            continue
-        
-        # Get TPI components
-        home_tpi = tpi_dict[home_team]
-        away_tpi = tpi_dict[away_team]
-        
-        # Calculate offensive opportunities
-        # Home offensive opportunity = Away's defensive resistance vs Home's offensive creation
-        home_goi_offense = away_tpi['defensive_resistance'] - home_tpi['defensive_resistance']
-        # Away offensive opportunity = Home's defensive resistance vs Away's offensive creation
-        away_goi_offense = home_tpi['defensive_resistance'] - away_tpi['defensive_resistance']
-        
-        # Calculate pace opportunity (average of both teams' pace drivers)
-        game_pace = (home_tpi['pace_drivers'] + away_tpi['pace_drivers']) / 2
-        
-        # Calculate total GOI per team (0.6 offense, 0.4 pace)
-        home_goi = 0.6 * home_goi_offense + 0.4 * game_pace
-        away_goi = 0.6 * away_goi_offense + 0.4 * game_pace
-        
-        # Total opportunity = sum of both teams' GOI
+
+    if matrix is None:
+        from matchup_matrix import build_matchup_matrix
+        matrix = build_matchup_matrix(tpi_rankings, goi_settings)
+    team_index = pd.Index(matrix.teams)
+
+    home_idx = team_index.get_indexer(schedule['Home'])
+    away_idx = team_index.get_indexer(schedule['Visitor'])
+    found = (home_idx >= 0) & (away_idx >= 0)
+
+    # Skip games with teams not in TPI data, reported once for all of them
+    if not found.all():
+        missing_teams = sorted(set(schedule['Home'][home_idx < 0].astype(str)) | set(schedule['Visitor'][away_idx < 0].astype(str)))
+        print(f"  -> WARNING: Skipping {int((~found).sum())} games (teams not found in TPI data: {missing_teams})")
+
+    games = schedule[found]
+    home_idx, away_idx = home_idx[found], away_idx[found]
+    home_goi, away_goi, game_pace, total_opportunity = matrix.gather(home_idx, away_idx)
+    if adjustments is not None:
+        home_goi = home_goi + adjustments[0][found]
+        away_goi = away_goi + adjustments[1][found]
         total_opportunity = home_goi + away_goi
-        
-        goi_results.append({
-            'Date': game_date,
-            'Home': home_team,
-            'Away': away_team,
-            'Home_GOI': round(home_goi, 4),
-            'Away_GOI': round(away_goi, 4),
-            'Game_Pace': round(game_pace, 4),
-            'Total_Opportunity': round(total_opportunity, 4)
-        })
-    
-    goi_df = pd.DataFrame(goi_results)
+
+    goi_df = pd.DataFrame({
+        'Date': games['Date'].tolist(),
+        'Home': games['Home'].tolist(),
+        'Away': games['Visitor'].tolist(),
+        'Home_GOI': _round4(home_goi),
+        'Away_GOI': _round4(away_goi),
+        'Game_Pace': _round4(game_pace),
+        'Total_Opportunity': _round4(total_opportunity)
+    })
     print(f"  -> Calculated GOI for {len(goi_df)} games.")
     return goi_df
 
-def main():
+def calculate_goi_asof(schedule, tpi_history, goi_settings=None, adjustments=None):
     """
-    Main function to orchestrate GOI calculation.
+    Calculates GOI for every game from the TPI valid on game day: each team
+    is rated by the latest snapshot on or before the game date, so past
+    games never see later information.
+
+    Args:
+        schedule (pd.DataFrame): DataFrame with game schedule
+        tpi_history (pd.DataFrame): Point-in-time TPI from tpi_history.tpi_history.
+        goi_settings (dict): Offense / pace blend from get_goi_settings.
+        adjustments (tuple): Optional (home, away) schedule adjustments, as
+            for calculate_goi.
+
+    Returns:
+        pd.DataFrame: calculate_goi's columns plus TPI_Date, the older of the
+        two snapshots used (YYYYMMDD).
     """
-    print("--- GOI (Game Opportunity Index) Calculator ---")
-    
+    import pandas as pd
+    from tpi_history import asof_tpi_join
+
+    print("\n--- Calculating Point-in-Time GOI ---")
+
+    games = asof_tpi_join(schedule, tpi_history)
+    found = (games['home_tpi_date'].notna() & games['away_tpi_date'].notna()).to_numpy()
+    if not found.all():
+        print(f"  -> WARNING: Skipping {int((~found).sum())} games with no TPI snapshot on or before game day.")
+
+    games = games[found]
+    home_goi, away_goi, game_pace, total_opportunity = compute_goi_arrays(
+        games['home_defensive_resistance'].to_numpy(dtype=float), games['away_defensive_resistance'].to_numpy(dtype=float),
+        games['home_pace_drivers'].to_numpy(dtype=float), games['away_pace_drivers'].to_numpy(dtype=float), goi_settings
+    )
+    if adjustments is not None:
+        # asof_tpi_join keeps the schedule's row order
+        home_goi = home_goi + adjustments[0][found]
+        away_goi = away_goi + adjustments[1][found]
+        total_opportunity = home_goi + away_goi
+
+    goi_df = pd.DataFrame({
+        'Date': games['Date'].tolist(),
+        'Home': games['Home'].tolist(),
+        'Away': games['Visitor'].tolist(),
+        'Home_GOI': _round4(home_goi),
+        'Away_GOI': _round4(away_goi),
+        'Game_Pace': _round4(game_pace),
+        'Total_Opportunity': _round4(total_opportunity),
+        'TPI_Date': games[['home_tpi_date', 'away_tpi_date']].min(axis=1).dt.strftime('%Y%m%d').tolist()
+    })
+    print(f"  -> Calculated point-in-time GOI for {len(goi_df)} games.")
+    return goi_df
+
+def get_schedule_adjustments(config, schedule, schedule_path=None):
+    """
+    Rest / travel GOI adjustments for the schedule, or None when every
+    schedule_context adjustment is 0. The context is read through the
+    schedule-hash cache when the schedule came from schedule_path.
+    """
+    from schedule_context import (get_schedule_context_settings, adjustments_enabled, compute_schedule_context,
+                                  load_schedule_context, schedule_goi_adjustments)
+
+    settings = get_schedule_context_settings(config)
+    if not adjustments_enabled(settings):
+        return None
+    if schedule_path:
+        context = load_schedule_context(config, schedule_path)
+    else:
+        context = compute_schedule_context(schedule, settings)
+    print(f"  -> Applying schedule adjustments ({int(context['Home_B2B'].sum() + context['Away_B2B'].sum())} back-to-back team games).")
+    return schedule_goi_adjustments(context, settings)
+
+def run_goi_stage(config, tpi_rankings=None, schedule=None, force=False, write=True, output_dir=None):
+    """
+    Runs Step 2 in-process.
+
+    Args:
+        config (dict): The configuration dictionary.
+        tpi_rankings (pd.DataFrame): TPI rankings from Step 1. Read from
+            tpi_rankings.csv if omitted.
+        schedule (pd.DataFrame): The schedule. Read from schedule.csv if omitted.
+        force (bool): Recompute even if the build cache says goi_rankings.csv is current.
+        write (bool): Write goi_rankings.csv and the GOI store (and record the build cache).
+        output_dir (str): Data/output directory. Defaults to the script directory.
+
+    Returns:
+        pd.DataFrame: GOI for every game, or None on failure.
+    """
+    # Deferred so --help returns without loading pandas
+    import pandas as pd
+
+    output_dir = output_dir or os.path.dirname(__file__)
+    cache_settings = get_cache_settings(config)
+
+    tpi_path = os.path.join(output_dir, 'tpi_rankings.csv')
+    schedule_path = os.path.join(output_dir, 'schedule.csv')
+    goi_output_path = os.path.join(output_dir, 'goi_rankings.csv')
+
+    # Skip if TPI, schedule, config and code match the last run
+    fingerprint = compute_stage_fingerprint('goi', config, [tpi_path, schedule_path])
+    if write and not force and is_stage_current('goi', fingerprint, [goi_output_path], cache_settings):
+        print("\nTPI rankings, schedule, config and code unchanged since the last run. goi_rankings.csv is up to date; skipping (use --force to rebuild).")
+        goi_df = pd.read_csv(goi_output_path)
+        store_dir = get_goi_store_dir(config)
+        if not list_goi_dates(store_dir):
+            write_goi_store(goi_df, store_dir)
+        return goi_df
+
     # Load TPI rankings
-    tpi_path = os.path.join(os.path.dirname(__file__), 'tpi_rankings.csv')
-    try:
-        tpi_rankings = pd.read_csv(tpi_path)
-        print(f"\nLoaded TPI rankings: {len(tpi_rankings)} teams")
-    except FileNotFoundError:
-        print(f"ERROR: TPI rankings file not found at {tpi_path}")
-        return
-    
+    if tpi_rankings is None:
+        try:
+            tpi_rankings = pd.read_csv(tpi_path)
+            print(f"\nLoaded TPI rankings: {len(tpi_rankings)} teams")
+        except FileNotFoundError:
+            print(f"ERROR: TPI rankings file not found at {tpi_path}")
+            return None
+
     # Load schedule
-    schedule_path = os.path.join(os.path.dirname(__file__), 'schedule.csv')
-    try:
-        schedule = pd.read_csv(schedule_path)
-        print(f"Loaded schedule: {len(schedule)} games")
-    except FileNotFoundError:
-        print(f"ERROR: Schedule file not found at {schedule_path}")
-        return
-    
-    # Calculate GOI
-    goi_df = calculate_goi(tpi_rankings, schedule)
-    
+    schedule_from_file = schedule is None
+    if schedule is None:
+        try:
+            schedule = pd.read_csv(schedule_path)
+            print(f"Loaded schedule: {len(schedule)} games")
+        except FileNotFoundError:
+            print(f"ERROR: Schedule file not found at {schedule_path}")
+            return None
+
+    # Calculate GOI from the (cached) matchup matrix of every pairing
+    from matchup_matrix import get_matchup_matrix
+    goi_settings = get_goi_settings(config)
+    goi_df = calculate_goi(tpi_rankings, schedule, goi_settings, get_matchup_matrix(config, tpi_rankings, goi_settings),
+                           get_schedule_adjustments(config, schedule, schedule_path if schedule_from_file else None))
+
     # Save GOI rankings
-    goi_output_path = os.path.join(os.path.dirname(__file__), 'goi_rankings.csv')
-    goi_df.to_csv(goi_output_path, index=False)
-    print(f"\nSuccessfully created 'goi_rankings.csv' with {len(goi_df)} games.")
-    
+    if write:
+        goi_df.to_csv(goi_output_path, index=False)
+        print(f"\nSuccessfully created 'goi_rankings.csv' with {len(goi_df)} games.")
+        write_goi_store(goi_df, get_goi_store_dir(config))
+        record_stage('goi', fingerprint, [goi_output_path], cache_settings)
+
     # Display top 10 highest opportunity games
     print("\n--- Top 10 Highest Opportunity Games ---")
     top_10 = goi_df.nlargest(10, 'Total_Opportunity')[['Date', 'Away', 'Home', 'Away_GOI', 'Home_GOI', 'Total_Opportunity']]
     print(top_10.to_string(index=False))
+    return goi_df
+
+def main():
+    """
+    Main function to orchestrate GOI calculation.
+    """
+    parser = argparse.ArgumentParser(description="Calculate GOI for every game in schedule.csv")
+    parser.add_argument('--force', action='store_true', help="Recompute even if inputs, config and code are unchanged.")
+    args = parser.parse_args()
+
+    print("--- GOI (Game Opportunity Index) Calculator ---")
+
+    config_path = os.path.join(os.path.dirname(__file__), 'config_v2.yaml')
+    config = {}
+    if os.path.exists(config_path):
+        import yaml
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+
+    run_goi_stage(config, force=args.force)
 
 if __name__ == "__main__":
     main()
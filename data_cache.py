@@ -0,0 +1,245 @@
+import os
+import time
+import hashlib
+
+DEFAULT_CACHE_SETTINGS = {
+    'enabled': True,
+    'dir': '.cache',
+    'max_age_days': 14,
+    'max_size_mb': 256
+}
+
+CACHE_EXTENSIONS = ('.parquet', '.pkl')
+
+def load_config(config_path=None):
+    """
+    Loads the YAML configuration. Lives here rather than in calc_zscores_v2
+    so light entry points can read it without importing pandas.
+
+    Args:
+        config_path (str): Path to the config. Defaults to config_v2.yaml next to this script.
+
+    Returns:
+        dict: The configuration, or None if the file does not exist.
+    """
+    import yaml
+
+    config_path = config_path or os.path.join(os.path.dirname(__file__), 'config_v2.yaml')
+    try:
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f)
+    except FileNotFoundError:
+        print(f"ERROR: Configuration file not found at {config_path}")
+        return None
+
+def get_cache_settings(config):
+    """
+    Resolves the cache settings from the 'cache' block of the config.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+
+    Returns:
+        dict: Cache settings with an absolute 'dir' path.
+    """
+    settings = dict(DEFAULT_CACHE_SETTINGS)
+    settings.update((config or {}).get('cache', {}) or {})
+
+    # Relative cache directories live next to the scripts, like the data files
+    if not os.path.isabs(settings['dir']):
+        settings['dir'] = os.path.join(os.path.dirname(__file__), settings['dir'])
+    return settings
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    Computes the SHA-256 digest of a file's contents.
+
+    Args:
+        file_path (str): Path to the file.
+        chunk_size (int): Number of bytes read per chunk.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_frame(df, base_path):
+    """
+    Writes a DataFrame in a columnar format, falling back to pickle.
+
+    Parquet is used when pyarrow is installed and the frame is representable
+    (string column names, no mixed-type object columns). Anything else is
+    pickled so the cache never loses an entry.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to store.
+        base_path (str): Target path without extension.
+
+    Returns:
+        str: The path that was written.
+    """
+    os.makedirs(os.path.dirname(base_path), exist_ok=True)
+    tmp_suffix = f".tmp{os.getpid()}"
+
+    parquet_path = base_path + '.parquet'
+    try:
+        df.to_parquet(parquet_path + tmp_suffix)
+        os.replace(parquet_path + tmp_suffix, parquet_path)
+        return parquet_path
+    except (ImportError, ValueError, TypeError):
+        if os.path.exists(parquet_path + tmp_suffix):
+            os.remove(parquet_path + tmp_suffix)
+
+    pickle_path = base_path + '.pkl'
+    df.to_pickle(pickle_path + tmp_suffix)
+    os.replace(pickle_path + tmp_suffix, pickle_path)
+    return pickle_path
+
+def write_csv_atomic(df, path):
+    """
+    Writes a CSV via a temporary file and rename, so readers never see a
+    partially written file.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def find_frame(base_path):
+    """
+    Returns the stored path for base_path, or None if nothing is stored.
+    """
+    for ext in CACHE_EXTENSIONS:
+        if os.path.exists(base_path + ext):
+            return base_path + ext
+    return None
+
+def read_frame(path):
+    """
+    Reads a DataFrame written by write_frame.
+    """
+    # Deferred so hashing and build-cache checks stay import-light
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+def evict_stale_entries(cache_dir, max_age_days, max_size_mb):
+    """
+    Removes cache entries older than max_age_days, then the least recently
+    used entries until the directory fits in max_size_mb.
+
+    Args:
+        cache_dir (str): Directory holding cache entries.
+        max_age_days (float): Maximum entry age, or None to disable.
+        max_size_mb (float): Maximum total size, or None to disable.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith(CACHE_EXTENSIONS) and os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_atime, stat.st_size, path))
+
+    removed = 0
+    now = time.time()
+    if max_age_days is not None:
+        cutoff = now - float(max_age_days) * 86400
+        for entry in [e for e in entries if e[0] < cutoff]:
+            os.remove(entry[2])
+            entries.remove(entry)
+            removed += 1
+
+    if max_size_mb is not None:
+        budget = float(max_size_mb) * 1024 * 1024
+        total = sum(size for _, size, _ in entries)
+        # Oldest access first
+        for atime, size, path in sorted(entries):
+            if total <= budget:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+
+    return removed
+
+def load_cached_frame(file_path, key_fields, loader, cache_settings=None, namespace='excel'):
+    """
+    Loads a DataFrame derived from file_path through the content-addressed cache.
+
+    Entries are keyed on the file's SHA-256 plus key_fields, so renaming or
+    re-downloading an identical file still hits the cache while any content
+    change (or different key_fields) misses it.
+
+    Args:
+        file_path (str): Path to the source file.
+        key_fields (dict): Extra parameters that affect the parsed result.
+        loader (callable): Zero-argument function that parses the file on a miss.
+        cache_settings (dict): Settings from get_cache_settings, or None to
+            bypass the cache.
+        namespace (str): Subdirectory of the cache directory for these
+            entries, so each kind of derived frame is evicted on its own.
+
+    Returns:
+        pd.DataFrame: The parsed (or cached) DataFrame.
+    """
+    if not cache_settings or not cache_settings.get('enabled', True):
+        return loader()
+
+    cache_dir = os.path.join(cache_settings['dir'], namespace)
+    key_source = file_sha256(file_path) + ''.join(f"|{k}={key_fields[k]!r}" for k in sorted(key_fields))
+    base_path = os.path.join(cache_dir, hashlib.sha256(key_source.encode('utf-8')).hexdigest())
+
+    cached_path = find_frame(base_path)
+    if cached_path:
+        try:
+            df = read_frame(cached_path)
+            # Touch the entry so size-based eviction treats it as recently used
+            os.utime(cached_path, None)
+            print(f"  -> Cache hit: loaded {os.path.basename(file_path)} from {os.path.basename(cached_path)}.")
+            return df
+        except Exception as e:
+            print(f"  -> WARNING: Unreadable cache entry {os.path.basename(cached_path)} ({e}). Re-parsing.")
+            os.remove(cached_path)
+
+    df = loader()
+    try:
+        written_path = write_frame(df, base_path)
+        print(f"  -> Cached parsed {os.path.basename(file_path)} as {os.path.basename(written_path)}.")
+        evict_stale_entries(cache_dir, cache_settings.get('max_age_days'), cache_settings.get('max_size_mb'))
+    except OSError as e:
+        print(f"  -> WARNING: Could not write cache entry: {e}")
+    return df
+
+def read_excel_cached(file_path, sheet_name=0, header=0, cache_settings=None):
+    """
+    Reads a full Excel sheet through the content-addressed cache.
+
+    Args:
+        file_path (str): Path to the workbook.
+        sheet_name (int or str): Sheet to read, as for pd.read_excel.
+        header (int): Header row, as for pd.read_excel.
+        cache_settings (dict): Settings from get_cache_settings, or None to
+            bypass the cache.
+
+    Returns:
+        pd.DataFrame: The parsed sheet.
+    """
+    import pandas as pd
+
+    return load_cached_frame(
+        file_path,
+        {'sheet': sheet_name, 'header': header},
+        lambda: pd.read_excel(file_path, sheet_name=sheet_name, header=header),
+        cache_settings
+    )
@@ -1,19 +1,36 @@
-import pandas as pd
+import os
+import argparse
 
-# Load GOI rankings
-goi_df = pd.read_csv('goi_rankings.csv')
+def main():
+    parser = argparse.ArgumentParser(description="Show GOI rankings for a single date")
+    parser.add_argument('--date', type=str, default='2025-10-24',
+                        help="Date to show (YYYY-MM-DD).")
+    args = parser.parse_args()
 
-# Filter to Oct 24, 2025
-target_date = '2025-10-24'
-oct24_games = goi_df[goi_df['Date'] == target_date].sort_values('Total_Opportunity', ascending=False)
+    # Deferred so argument errors and --help return without loading pandas
+    from data_cache import load_config
+    from goi_store import get_goi_store_dir, list_goi_dates, load_goi_for_date
 
-print(f"\n--- OCT 24, 2025 SLATE (Tomorrow) ---")
-print(f"Total games: {len(oct24_games)}\n")
+    config = load_config() or {}
 
-if len(oct24_games) > 0:
-    display_cols = ['Date', 'Away', 'Home', 'Away_GOI', 'Home_GOI', 'Total_Opportunity']
-    print(oct24_games[display_cols].head(15).to_string(index=False))
-else:
-    print("No games found for Oct 24, 2025")
-    print("\nAvailable dates in GOI data:")
-    print(goi_df['Date'].unique()[:20])
+    # Load the date's games from the GOI store
+    target_date = args.date
+    date_games = load_goi_for_date(config, target_date).sort_values('Total_Opportunity', ascending=False)
+
+    print(f"\n--- {target_date} SLATE ---")
+    print(f"Total games: {len(date_games)}\n")
+
+    if len(date_games) > 0:
+        display_cols = ['Date', 'Away', 'Home', 'Away_GOI', 'Home_GOI', 'Total_Opportunity']
+        print(date_games[display_cols].head(15).to_string(index=False))
+    else:
+        print(f"No games found for {target_date}")
+        print("\nAvailable dates in GOI data:")
+        available = list_goi_dates(get_goi_store_dir(config))
+        if not available:
+            import pandas as pd
+            available = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'goi_rankings.csv'))['Date'].unique().tolist()
+        print(available[:20])
+
+if __name__ == "__main__":
+    main()
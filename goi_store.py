@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import hashlib
+import contextlib
+import argparse
+from data_cache import write_frame, read_frame
+
+INDEX_FILENAME = 'index.json'
+
+DEFAULT_GOI_STORE_SETTINGS = {
+    'dir': 'goi_store'
+}
+
+GOI_COLUMNS = ['Date', 'Home', 'Away', 'Home_GOI', 'Away_GOI', 'Game_Pace', 'Total_Opportunity']
+
+# store_dir -> ((mtime_ns, size), index); reloaded only when index.json changes
+_index_cache = {}
+
+def get_goi_store_dir(config):
+    """
+    Resolves the 'goi_store' block of the config to an absolute directory.
+    """
+    settings = dict(DEFAULT_GOI_STORE_SETTINGS)
+    settings.update((config or {}).get('goi_store', {}) or {})
+    store_dir = settings['dir']
+    if not os.path.isabs(store_dir):
+        store_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), store_dir))
+    return store_dir
+
+def load_index(store_dir):
+    """
+    Loads the store index:
+    {'dates': {date: {'path', 'games', 'max_total', 'digest'}}, 'teams': {team: [dates]}}.
+    """
+    path = os.path.join(store_dir, INDEX_FILENAME)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {'dates': {}, 'teams': {}}
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _index_cache.get(store_dir)
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    _index_cache[store_dir] = (signature, index)
+    return index
+
+def save_index(store_dir, index):
+    """
+    Atomically writes the store index.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, INDEX_FILENAME)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'dates': dict(sorted(index['dates'].items())),
+            'teams': {team: sorted(dates) for team, dates in sorted(index['teams'].items())}
+        }, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _frame_digest(df):
+    import pandas as pd
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+
+def write_goi_store(goi_df, store_dir):
+    """
+    Upserts GOI results into the store, one partition per game date.
+
+    Only dates whose games changed are rewritten. Within the date span of
+    goi_df, stored dates it no longer has (e.g. postponed games) are
+    removed; dates outside it (e.g. earlier seasons) are kept.
+
+    Args:
+        goi_df (pd.DataFrame): Output of calculate_goi.
+        store_dir (str): Store location.
+
+    Returns:
+        list: The dates that were (re)written.
+    """
+    index = load_index(store_dir)
+    index = {'dates': dict(index['dates']), 'teams': {t: set(d) for t, d in index['teams'].items()}}
+
+    written = []
+    for date, games in goi_df.groupby('Date', sort=True):
+        date = str(date)
+        games = games[GOI_COLUMNS].reset_index(drop=True)
+        digest = _frame_digest(games)
+        entry = index['dates'].get(date)
+        if entry and entry['digest'] == digest and os.path.exists(os.path.join(store_dir, entry['path'])):
+            continue
+
+        year = date[:4]
+        written_path = write_frame(games, os.path.join(store_dir, year, date))
+        index['dates'][date] = {
+            'path': os.path.relpath(written_path, store_dir).replace(os.sep, '/'),
+            'games': len(games),
+            'max_total': float(games['Total_Opportunity'].max()) if games['Total_Opportunity'].notna().any() else None,
+            'digest': digest
+        }
+        for dates in index['teams'].values():
+            dates.discard(date)
+        for team in set(games['Home']) | set(games['Away']):
+            index['teams'].setdefault(str(team), set()).add(date)
+        written.append(date)
+
+    current_dates = set(goi_df['Date'].dropna().astype(str))
+    removed = []
+    if current_dates:
+        first, last = min(current_dates), max(current_dates)
+        removed = [d for d in sorted(index['dates']) if first <= d <= last and d not in current_dates]
+    for date in removed:
+        path = os.path.join(store_dir, index['dates'].pop(date)['path'])
+        if os.path.exists(path):
+            os.remove(path)
+        with contextlib.suppress(OSError):
+            os.rmdir(os.path.dirname(path))  # Only succeeds once the year is empty
+        for dates in index['teams'].values():
+            dates.discard(date)
+    index['teams'] = {team: dates for team, dates in index['teams'].items() if dates}
+
+    if written or removed:
+        save_index(store_dir, index)
+    print(f"  -> GOI store: {len(written)} of {len(current_dates)} dates written to {store_dir}"
+          + (f", {len(removed)} unscheduled date(s) removed." if removed else "."))
+    return written
+
+def list_goi_dates(store_dir):
+    """
+    Returns the sorted list of stored game dates (YYYY-MM-DD).
+    """
+    return sorted(load_index(store_dir)['dates'])
+
+def _read_dates(store_dir, dates):
+    import pandas as pd
+
+    entries = load_index(store_dir)['dates']
+    frames = [read_frame(os.path.join(store_dir, entries[d]['path'])) for d in dates if d in entries]
+    if not frames:
+        return pd.DataFrame(columns=GOI_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def _dates_in_range(store_dir, start_date=None, end_date=None):
+    return [d for d in list_goi_dates(store_dir) if (not start_date or d >= start_date) and (not end_date or d <= end_date)]
+
+def query_goi_date(store_dir, date):
+    """
+    All games on one date: an index lookup and a single partition read.
+    """
+    return _read_dates(store_dir, [date])
+
+def query_goi_range(store_dir, start_date=None, end_date=None):
+    """
+    All games with start_date <= Date <= end_date (inclusive, YYYY-MM-DD).
+    """
+    return _read_dates(store_dir, _dates_in_range(store_dir, start_date, end_date))
+
+def query_goi_team(store_dir, team, start_date=None, end_date=None):
+    """
+    Every game a team plays in a date range. Only the dates the team
+    index lists for the team are read.
+    """
+    dates = [d for d in load_index(store_dir)['teams'].get(team, [])
+             if (not start_date or d >= start_date) and (not end_date or d <= end_date)]
+    games = _read_dates(store_dir, sorted(dates))
+    return games[(games['Home'] == team) | (games['Away'] == team)].reset_index(drop=True)
+
+def query_goi_top(store_dir, n=10, start_date=None, end_date=None):
+    """
+    The n games with the highest Total_Opportunity in a date range.
+
+    Partitions are read in order of their best game and reading stops once
+    no unread partition can beat the current n-th best.
+    """
+    import pandas as pd
+
+    entries = load_index(store_dir)['dates']
+    candidates = [d for d in _dates_in_range(store_dir, start_date, end_date) if entries[d]['max_total'] is not None]
+    candidates.sort(key=lambda d: entries[d]['max_total'], reverse=True)
+
+    top = pd.DataFrame(columns=GOI_COLUMNS)
+    for date in candidates:
+        if len(top) >= n and entries[date]['max_total'] < top['Total_Opportunity'].iloc[-1]:
+            break
+        games = query_goi_date(store_dir, date)
+        top = pd.concat([top, games], ignore_index=True) if len(top) else games
+        top = top.sort_values(['Total_Opportunity', 'Date'], ascending=[False, True], kind='stable').head(n).reset_index(drop=True)
+    return top
+
+def load_goi_for_date(config, date, fallback_csv=None):
+    """
+    Games on one date from the GOI store, falling back to filtering
+    fallback_csv (goi_rankings.csv next to this script by default) when the
+    store has not been built yet.
+    """
+    import pandas as pd
+
+    fallback_csv = fallback_csv or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'goi_rankings.csv')
+    store_dir = get_goi_store_dir(config)
+    if load_index(store_dir)['dates']:
+        return query_goi_date(store_dir, date)
+    print(f"  -> GOI store not found at {store_dir}; reading {os.path.basename(fallback_csv)}.")
+    goi_df = pd.read_csv(fallback_csv)
+    return goi_df[goi_df['Date'] == date].reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the date-partitioned GOI store")
+    parser.add_argument('--build', type=str, nargs='?', const='goi_rankings.csv', default=None, help="Load a goi_rankings CSV into the store.")
+    parser.add_argument('--date', type=str, default=None, help="Show games on this date (YYYY-MM-DD).")
+    parser.add_argument('--start', type=str, default=None, help="First date of a range query.")
+    parser.add_argument('--end', type=str, default=None, help="Last date of a range query.")
+    parser.add_argument('--team', type=str, default=None, help="Show one team's games (in the range, if given).")
+    parser.add_argument('--top', type=int, default=None, help="Show the N highest Total_Opportunity games (in the range, if given).")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+    store_dir = get_goi_store_dir(config)
+
+    if args.build:
+        write_goi_store(pd.read_csv(args.build), store_dir)
+        return
+
+    if args.date:
+        result = query_goi_date(store_dir, args.date)
+    elif args.team:
+        result = query_goi_team(store_dir, args.team, args.start, args.end)
+    elif args.top:
+        result = query_goi_top(store_dir, args.top, args.start, args.end)
+    elif args.start or args.end:
+        result = query_goi_range(store_dir, args.start, args.end)
+    else:
+        dates = list_goi_dates(store_dir)
+        print(f"{len(dates)} dates stored in {store_dir}" + (f" ({dates[0]} - {dates[-1]})" if dates else ""))
+        return
+
+    if args.top and (args.date or args.team):
+        result = result.nlargest(args.top, 'Total_Opportunity')
+    print(result.to_string(index=False) if not result.empty else "No games found.")
+
+if __name__ == "__main__":
+    main()
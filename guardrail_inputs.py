@@ -0,0 +1,181 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from team_names import canonicalize_teams
+
+DEFAULT_GUARDRAIL_INPUT_SETTINGS = {
+    'dir': None,
+    'games_played': 'guardrail_games_played.csv',
+    'goalie_form': 'guardrail_goalie_form.csv',
+    'market_lines': 'guardrail_market_lines.csv'
+}
+
+# Value columns each input file must provide, besides 'team'
+INPUT_COLUMNS = {
+    'games_played': ['games_played'],
+    'goalie_form': ['opp_goalie_sv'],
+    'market_lines': ['ml', 'close_move']
+}
+
+# (path, columns, teams digest) -> ((mtime_ns, size), table); parsed tables
+# stay warm within a process, and the content-addressed cache keeps them
+# between processes
+_table_cache = {}
+
+def get_guardrail_input_settings(config):
+    """
+    Returns the 'guardrail_inputs' block of the config merged over the defaults.
+    """
+    settings = dict(DEFAULT_GUARDRAIL_INPUT_SETTINGS)
+    settings.update((config or {}).get('guardrail_inputs', {}) or {})
+    return settings
+
+def guardrail_input_paths(config, data_dir=None):
+    """
+    Returns {input name: path} for the three guardrail input files. They
+    live in guardrail_inputs.dir if set, else data_dir, else the script
+    directory.
+    """
+    settings = get_guardrail_input_settings(config)
+    base_dir = settings['dir'] or data_dir or os.path.dirname(os.path.abspath(__file__))
+    return {name: os.path.join(base_dir, settings[name]) for name in INPUT_COLUMNS}
+
+def read_input_file(path):
+    """
+    Reads a CSV or JSON drop into a DataFrame with a 'team' column.
+
+    JSON may be a list of records, {team: value} or {team: {column: value}}.
+    """
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        if isinstance(payload, list):
+            return pd.DataFrame(payload)
+        if payload and all(isinstance(v, dict) for v in payload.values()):
+            return pd.DataFrame.from_dict(payload, orient='index').rename_axis('team').reset_index()
+        return pd.DataFrame({'team': list(payload), 'value': list(payload.values())})
+
+    df = pd.read_csv(path)
+    return df.rename(columns={c: 'team' for c in df.columns if str(c).lower() == 'team'})
+
+def _parse_input_table(path, columns, canonical_teams, team_name_mappings, cache_settings=None):
+    """
+    Reads and validates one guardrail input (see load_input_table). An
+    unusable file gives an empty table.
+    """
+    name = os.path.basename(path)
+    empty = pd.DataFrame(columns=columns, index=pd.Index([], name='team'))
+    try:
+        df = read_input_file(path)
+    except (OSError, ValueError) as e:
+        print(f"  -> WARNING: Could not read guardrail input {name}: {e}")
+        return empty
+    if 'value' in df.columns and columns[0] not in df.columns:
+        df = df.rename(columns={'value': columns[0]})
+
+    missing = [c for c in ['team'] + columns if c not in df.columns]
+    if missing:
+        print(f"  -> WARNING: Guardrail input {name} is missing columns {missing}; ignoring it.")
+        return empty
+
+    df = df[['team'] + columns].copy()
+    df['team'], mapped = canonicalize_teams(df['team'], team_name_mappings, cache_settings)
+    for original_name, (replacement, pattern) in mapped.items():
+        print(f"    - Mapped '{original_name}' to '{replacement}' based on pattern '{pattern}'.")
+
+    unknown = sorted(set(df['team'].dropna()) - set(canonical_teams))
+    if unknown:
+        print(f"  -> WARNING: Unknown teams in {name} ignored: {unknown}")
+    df = df[df['team'].isin(canonical_teams)]
+
+    for column in columns:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    bad = df[columns].isna().any(axis=1)
+    if bad.any():
+        print(f"  -> WARNING: Dropped {int(bad.sum())} rows with missing or non-numeric values in {name}.")
+        df = df[~bad]
+
+    if df['team'].duplicated().any():
+        print(f"  -> WARNING: Duplicate teams in {name}; keeping the last row for each.")
+        df = df.drop_duplicates('team', keep='last')
+    return df.set_index('team')
+
+def load_input_table(path, columns, canonical_teams, team_name_mappings, cache_settings=None):
+    """
+    Loads one guardrail input as a team-indexed table.
+
+    Team names go through the configured mappings; unknown teams and
+    non-numeric values are dropped with a warning. Parsed tables go through
+    the content-addressed cache (keyed on the file's SHA-256, the columns
+    and the team configuration), so a fresh process only re-reads changed
+    files; within a process they are also kept on the same key plus the
+    file's mtime and size.
+
+    Args:
+        path (str): CSV or JSON file.
+        columns (list): Value columns to keep. A single-value JSON mapping
+            fills the first one.
+        canonical_teams (set): Canonical team names.
+        team_name_mappings (list): Pattern-based team name mapping rules.
+        cache_settings (dict): Cache settings, or None to bypass the cache.
+
+    Returns:
+        pd.DataFrame: Indexed by canonical team (empty if the file is
+        unusable), or None if the file is missing.
+    """
+    from data_cache import load_cached_frame
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    teams_digest = hashlib.sha256(json.dumps([sorted(canonical_teams), team_name_mappings], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    memo_key = (path, tuple(columns), teams_digest)
+    cached = _table_cache.get(memo_key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    table = load_cached_frame(
+        path,
+        {'guardrail_input': 1, 'columns': list(columns), 'teams': teams_digest},
+        lambda: _parse_input_table(path, columns, canonical_teams, team_name_mappings, cache_settings),
+        cache_settings,
+        namespace='guardrail_inputs'
+    )
+    _table_cache[memo_key] = (signature, table)
+    return table
+
+def load_guardrail_inputs(config, data_dir=None):
+    """
+    Loads games played, opponent goalie form and market lines for
+    apply_goi_guardrails from local drops.
+
+    A missing input is reported and left empty, which switches off the
+    guardrails that depend on it.
+
+    Returns:
+        tuple: (games_played_dict {team: gp}, opp_goalie_last3_sv {team: sv},
+        market_lines {team: {'ml', 'close_move'}}).
+    """
+    from data_cache import get_cache_settings
+
+    canonical_teams = set(config.get('canonical_teams', []))
+    team_name_mappings = config.get('team_name_mappings', [])
+    cache_settings = get_cache_settings(config)
+
+    tables = {}
+    for input_name, path in guardrail_input_paths(config, data_dir).items():
+        table = load_input_table(path, INPUT_COLUMNS[input_name], canonical_teams, team_name_mappings, cache_settings)
+        if table is None:
+            if not os.path.exists(path):
+                print(f"  -> WARNING: Guardrail input not found: {path}. Its guardrails are skipped.")
+            table = pd.DataFrame(columns=INPUT_COLUMNS[input_name])
+        tables[input_name] = table
+
+    games_played_dict = tables['games_played']['games_played'].to_dict()
+    opp_goalie_last3_sv = tables['goalie_form']['opp_goalie_sv'].to_dict()
+    market_lines = tables['market_lines'][['ml', 'close_move']].to_dict(orient='index')
+    print(f"  -> Guardrail inputs: {len(games_played_dict)} games-played, {len(opp_goalie_last3_sv)} goalie-form, {len(market_lines)} market-line teams.")
+    return games_played_dict, opp_goalie_last3_sv, market_lines
@@ -0,0 +1,268 @@
+import operator
+import numpy as np
+
+# Per-team inputs a rule condition can test. goi_z_max is the team's highest
+# goi_z when the rule runs; the others come from guardrail_inputs.py.
+GUARDRAIL_INPUTS = ('games_played', 'opp_goalie_sv', 'ml', 'close_move', 'goi_z_max')
+
+CONDITION_OPS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+GUARDRAIL_ACTIONS = ('clip', 'scale', 'add', 'null')
+
+# Same rules as the original GOI v2.1 constants. Used when config_v2.yaml
+# has no 'guardrails' block.
+DEFAULT_GUARDRAIL_RULES = [
+    {
+        'name': 'early_season_caps',
+        'when': [{'input': 'games_played', 'op': '<', 'value': 10}],
+        'actions': [
+            {'stats': 'sh%|shoot', 'clip': {'max_raw': 0.095}},
+            {'stats': 'sv%|save', 'clip': {'min_raw': 0.900}},
+            {'stats': 'pp%', 'scale': 0.6}
+        ],
+        'message': "Early-season cap applied to {team} (GP: {games_played})"
+    },
+    {
+        'name': 'hot_goalie',
+        'when': [{'input': 'opp_goalie_sv', 'op': '>', 'value': 0.925}],
+        'actions': [{'stats': 'sog|shots|cf', 'add': -0.7}],
+        'message': "Hot Goalie Alert: {team} vs SV%={opp_goalie_sv:.3f} → -0.7 GOI"
+    },
+    {
+        'name': 'sharp_move_fade',
+        'when': [
+            {'input': 'ml', 'op': '>', 'value': 0},
+            {'input': 'close_move', 'op': '>', 'value': 0.15},
+            {'input': 'goi_z_max', 'op': '<', 'value': 2.1}
+        ],
+        'actions': [{'null': True}],
+        'message': "Sharp money fade: {team} +{ml} moved {close_move:+.0f}¢ → requires 2.1σ"
+    }
+]
+
+def get_guardrail_rules(config):
+    """
+    Returns the guardrail rule list from config ('guardrails: rules'), or
+    the defaults.
+    """
+    rules = ((config or {}).get('guardrails', {}) or {}).get('rules')
+    return DEFAULT_GUARDRAIL_RULES if rules is None else rules
+
+class GuardrailRule:
+    """
+    One compiled guardrail: team conditions, then a list of
+    (stat pattern, action, parameters) updates.
+
+    Attributes:
+        name (str): Rule name, for messages and errors.
+        conditions (list): (input name, comparison function, value) tuples; all must hold.
+        actions (list): (stat regex or None for all stats, action, parameter) tuples.
+        message (str): Format string printed per affected team, or None.
+    """
+
+    def __init__(self, name, conditions, actions, message):
+        self.name = name
+        self.conditions = conditions
+        self.actions = actions
+        self.message = message
+
+def _compile_action(rule_name, action_cfg):
+    pattern = action_cfg.get('stats')
+    kinds = [kind for kind in GUARDRAIL_ACTIONS if kind in action_cfg]
+    if len(kinds) != 1:
+        raise ValueError(f"Guardrail '{rule_name}': each action needs exactly one of {GUARDRAIL_ACTIONS}.")
+    kind = kinds[0]
+    param = action_cfg[kind]
+    if kind == 'clip':
+        raw_low, raw_high = param.get('min_raw'), param.get('max_raw')
+        param = (
+            float(param.get('min', -np.inf)),
+            float(param.get('max', np.inf)),
+            None if raw_low is None else float(raw_low),
+            None if raw_high is None else float(raw_high)
+        )
+    elif kind in ('scale', 'add'):
+        param = float(param)
+    return (pattern, kind, param)
+
+def compile_guardrail_rules(rules):
+    """
+    Validates rule declarations and turns them into GuardrailRule objects.
+
+    Each rule has 'when' (a list of {input, op, value} conditions on the
+    team), 'actions' (a list of {stats: regex, <action>: parameter} with
+    action clip {min/max on the z-score, min_raw/max_raw on the stat's raw
+    value}, scale, add or null) and an optional 'message' format string.
+
+    Raises:
+        ValueError: On an unknown input, operator or action.
+    """
+    compiled = []
+    for i, rule in enumerate(rules):
+        name = rule.get('name', f"rule_{i + 1}")
+        conditions = []
+        for cond in rule.get('when', []):
+            if cond.get('input') not in GUARDRAIL_INPUTS:
+                raise ValueError(f"Guardrail '{name}': unknown input '{cond.get('input')}'. Use one of {GUARDRAIL_INPUTS}.")
+            if cond.get('op') not in CONDITION_OPS:
+                raise ValueError(f"Guardrail '{name}': unknown operator '{cond.get('op')}'. Use one of {tuple(CONDITION_OPS)}.")
+            conditions.append((cond['input'], CONDITION_OPS[cond['op']], float(cond['value'])))
+        if not conditions:
+            raise ValueError(f"Guardrail '{name}' has no 'when' conditions.")
+        actions = [_compile_action(name, action_cfg) for action_cfg in rule.get('actions', [])]
+        compiled.append(GuardrailRule(name, conditions, actions, rule.get('message')))
+    return compiled
+
+class GuardrailFrame:
+    """
+    Row indexes of a zOverall-style frame: factorized teams and stats plus
+    a cache of stat-pattern masks, so every rule is a mask lookup and one
+    vectorized update.
+    """
+
+    def __init__(self, df, values_column='zscore'):
+        import pandas as pd
+
+        self.team_codes, self.teams = pd.factorize(df['team'])
+        self.stat_codes, self.stats = pd.factorize(df['stat'])
+        self.raw = df['value'].to_numpy(dtype=float) if 'value' in df.columns else None
+        self.base = df[values_column].to_numpy(dtype=float)
+        self._stat_masks = {}
+        self._raw_scales = {}
+
+    def team_rows(self, team_mask):
+        return (self.team_codes >= 0) & np.append(team_mask, False)[self.team_codes]
+
+    def stat_rows(self, pattern):
+        """
+        Row mask for a case-insensitive stat regex (None = every row).
+        Each pattern is matched once against the distinct stat names.
+        """
+        import pandas as pd
+
+        if pattern is None:
+            return np.ones(len(self.stat_codes), dtype=bool)
+        if pattern not in self._stat_masks:
+            matches = pd.Series(self.stats, dtype=object).str.contains(pattern, case=False, na=False).to_numpy()
+            self._stat_masks[pattern] = (self.stat_codes >= 0) & np.append(matches, False)[self.stat_codes]
+        return self._stat_masks[pattern]
+
+    def _raw_scale(self, code):
+        """
+        League mean, standard deviation and z-score sign of one stat's raw
+        values. The sign is -1 for stats whose z-scores were reversed.
+        """
+        rows = self.stat_codes == code
+        raw, base = self.raw[rows], self.base[rows]
+        ok = ~np.isnan(raw) & ~np.isnan(base)
+        if ok.sum() < 2 or raw[ok].std() == 0:
+            return (np.nan, np.nan, 1.0)
+        mean, std = raw[ok].mean(), raw[ok].std()
+        sign = -1.0 if ((raw[ok] - mean) * base[ok]).sum() < 0 else 1.0
+        return (mean, std, sign)
+
+    def raw_clip(self, rows, current, raw_low, raw_high):
+        """
+        Clips z-scores so no row's stat is credited beyond raw_low / raw_high
+        in raw units. Each raw cap is converted with its stat's league mean
+        and std; stats with no spread (or no raw values) are left alone.
+        """
+        if self.raw is None:
+            return current
+        lower = np.full(len(current), -np.inf)
+        upper = np.full(len(current), np.inf)
+        codes = self.stat_codes[rows]
+        scales = np.full((len(current), 3), np.nan)
+        for code in np.unique(codes[codes >= 0]):
+            if code not in self._raw_scales:
+                self._raw_scales[code] = self._raw_scale(code)
+            scales[codes == code] = self._raw_scales[code]
+        mean, std, sign = scales.T
+
+        for raw, is_max in ((raw_low, False), (raw_high, True)):
+            if raw is None:
+                continue
+            bound = sign * (raw - mean) / std
+            valid = ~np.isnan(bound)
+            # A reversed stat's raw maximum is a floor on its z-score
+            as_upper = valid & ((sign > 0) == is_max)
+            as_lower = valid & ~((sign > 0) == is_max)
+            upper[as_upper] = np.minimum(upper[as_upper], bound[as_upper])
+            lower[as_lower] = np.maximum(lower[as_lower], bound[as_lower])
+        return np.clip(current, lower, upper)
+
+    def team_max(self, values):
+        import pandas as pd
+
+        has_team = self.team_codes >= 0
+        return pd.Series(values[has_team]).groupby(self.team_codes[has_team]).max().reindex(range(len(self.teams))).to_numpy()
+
+def apply_guardrail_rules(df, rules, inputs, values_column='zscore'):
+    """
+    Runs compiled guardrail rules in order over a zOverall-style frame.
+
+    Args:
+        df (pd.DataFrame): Rows with 'team', 'stat' and values_column.
+        rules (list): GuardrailRule objects from compile_guardrail_rules.
+        inputs (dict): {input name: {team: value}}. A team missing from an
+            input fails every condition on it.
+        values_column (str): Column the guardrails start from.
+
+    Returns:
+        np.ndarray: The adjusted values (goi_z), aligned with df's rows.
+    """
+    import pandas as pd
+
+    frame = GuardrailFrame(df, values_column)
+    values = df[values_column].to_numpy(dtype=float, copy=True)
+    aligned = {
+        name: pd.Series(team_values, dtype=float).reindex(frame.teams).to_numpy()
+        for name, team_values in inputs.items()
+    }
+
+    for rule in rules:
+        selected = np.ones(len(frame.teams), dtype=bool)
+        for input_name, compare, threshold in rule.conditions:
+            if input_name == 'goi_z_max':
+                current = frame.team_max(values)
+            else:
+                current = aligned.get(input_name, np.full(len(frame.teams), np.nan))
+            with np.errstate(invalid='ignore'):
+                selected &= ~np.isnan(current) & compare(current, threshold)
+        if not selected.any():
+            continue
+
+        rows = frame.team_rows(selected)
+        touched = np.zeros(len(values), dtype=bool)
+        for pattern, kind, param in rule.actions:
+            target = rows & frame.stat_rows(pattern)
+            if kind == 'clip':
+                low, high, raw_low, raw_high = param
+                values[target] = np.clip(values[target], low, high)
+                if raw_low is not None or raw_high is not None:
+                    values[target] = frame.raw_clip(target, values[target], raw_low, raw_high)
+            elif kind == 'scale':
+                values[target] *= param
+            elif kind == 'add':
+                values[target] += param
+            else:
+                values[target] = np.nan
+            touched |= target
+
+        if rule.message:
+            affected = set(frame.teams[np.unique(frame.team_codes[touched])])
+            # Report teams in the order of the rule's first input
+            first_input = inputs.get(rule.conditions[0][0], {}) or dict.fromkeys(frame.teams)
+            for team in first_input:
+                if team in affected:
+                    fields = {name: team_values.get(team) for name, team_values in inputs.items()}
+                    print(f"  -> {rule.message.format(team=team, **fields)}")
+
+    return values
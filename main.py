@@ -1,5 +1,4 @@
 import os
-import subprocess
 import sys
 from datetime import datetime
 
@@ -19,21 +18,19 @@ def print_menu(options):
         print(f"  {i}. {option}")
     print()
 
-def run_script(script_name, description, args=""):
-    """Run a Python script and handle errors"""
+def run_step(step_func, description, **kwargs):
+    """Run a pipeline step in-process and handle errors"""
     print_header(f"Running: {description}")
     try:
-        cmd = f"python {script_name} {args}".strip()
-        print(f"Command: {cmd}\n")
-        result = subprocess.run(cmd, shell=True, cwd=os.path.dirname(__file__))
-        if result.returncode == 0:
+        result = step_func(**kwargs)
+        if result is not None:
             print(f"\n✅ {description} completed successfully!")
             return True
         else:
-            print(f"\n❌ {description} failed with exit code {result.returncode}")
+            print(f"\n❌ {description} failed. Check the output above.")
             return False
     except Exception as e:
-        print(f"❌ Error running {script_name}: {e}")
+        print(f"❌ Error running {description}: {e}")
         return False
 
 def step_1_calculate_tpi():
@@ -48,7 +45,8 @@ def step_1_calculate_tpi():
     
     confirm = input("Run TPI calculation? (y/n): ").strip().lower()
     if confirm == 'y':
-        return run_script("calc_zscores_v2.py", "TPI Calculation")
+        from pipeline import run_tpi
+        return run_step(run_tpi, "TPI Calculation")
     return False
 
 def step_2_calculate_goi():
@@ -60,13 +58,14 @@ def step_2_calculate_goi():
     print("  • Calculates GOI for each matchup using formula:")
     print("    - Offensive opportunity = opponent defense vs your offense")
     print("    - Pace = average of both teams' pace drivers")
-    print("    - GOI = 0.6 × offense + 0.4 × pace")
+    print("    - GOI = 0.6 × offense + 0.4 × pace (set in the goi block of config_v2.yaml)")
     print("  • Outputs: goi_rankings.csv (all games ranked by Total_Opportunity)")
     print()
     
     confirm = input("Run GOI calculation? (y/n): ").strip().lower()
     if confirm == 'y':
-        return run_script("calculate_goi.py", "GOI Calculation")
+        from pipeline import run_goi
+        return run_step(run_goi, "GOI Calculation")
     return False
 
 def step_3_analyze_slate():
@@ -107,9 +106,10 @@ def step_3_analyze_slate():
     # Step 2: Load games for that date
     print_header(f"Games on {target_date}")
     try:
-        import pandas as pd
-        goi_df = pd.read_csv('goi_rankings.csv')
-        date_games = goi_df[goi_df['Date'] == target_date].sort_values('Total_Opportunity', ascending=False).reset_index(drop=True)
+        from data_cache import load_config
+        from goi_store import load_goi_for_date
+        goi_df = load_goi_for_date(load_config() or {}, target_date)
+        date_games = goi_df.sort_values('Total_Opportunity', ascending=False).reset_index(drop=True)
         
         if date_games.empty:
             print(f"No games found for {target_date}.")
@@ -143,12 +143,13 @@ def step_3_analyze_slate():
                 print("Invalid input. Returning to menu.")
                 return False
         
-        # Step 3: Build game string for analyze_slate.py
+        # Step 3: Build game string for the slate analysis
         games_str = ','.join([f"{row['Away']} @ {row['Home']}" for _, row in selected_games.iterrows()])
         
-        # Step 4: Run analyze_slate.py with selected games
+        # Step 4: Run the slate analysis in-process with the already-loaded GOI
+        from pipeline import run_slate
         print_header(f"Analyzing {len(selected_games)} games for {target_date}")
-        return run_script("analyze_slate.py", f"Slate Analysis ({len(selected_games)} games)", f"--date {target_date} --games \"{games_str}\"")
+        return run_step(run_slate, f"Slate Analysis ({len(selected_games)} games)", date=target_date, games=games_str, goi_df=goi_df)
     
     except Exception as e:
         print(f"Error: {e}")
@@ -222,20 +223,14 @@ def main_menu():
         
         elif choice == '5':
             print_header("Running Full Pipeline")
-            print("This will run Steps 1 and 2 sequentially...\n")
+            print("This will run Steps 1 and 2 in one process, passing results in memory...\n")
             confirm = input("Continue? (y/n): ").strip().lower()
             if confirm == 'y':
-                success_1 = step_1_calculate_tpi()
-                if success_1:
-                    input("\nStep 1 complete. Press Enter to run Step 2...")
-                    success_2 = step_2_calculate_goi()
-                    if success_2:
-                        print("\n✅ Full pipeline completed successfully!")
-                        print("Next: Use Step 3 to analyze your DFS slate.")
-                    else:
-                        print("\n⚠️ Step 2 failed. Check the output above.")
-                else:
-                    print("\n⚠️ Step 1 failed. Check the output above.")
+                from pipeline import run_full_pipeline
+                results = run_full_pipeline()
+                if 'goi' in results:
+                    print("\n✅ Full pipeline completed successfully!")
+                    print("Next: Use Step 3 to analyze your DFS slate.")
             input("\nPress Enter to continue...")
         
         elif choice == '6':
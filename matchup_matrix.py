@@ -0,0 +1,193 @@
+import os
+import sys
+import hashlib
+import zipfile
+import argparse
+import numpy as np
+
+MATRIX_FILENAME = 'matchup_matrix.npz'
+
+MATRIX_FIELDS = ('home_goi', 'away_goi', 'game_pace', 'total_opportunity')
+
+class MatchupMatrix:
+    """
+    GOI for every possible pairing: each field is a teams x teams array with
+    the home team on the rows and the away team on the columns.
+
+    Attributes:
+        teams (list): Team names, in row / column order.
+        home_goi, away_goi, game_pace, total_opportunity (np.ndarray):
+            Unrounded GOI components.
+        key (str): Digest of the TPI inputs and GOI settings it was built from.
+    """
+
+    def __init__(self, teams, home_goi, away_goi, game_pace, total_opportunity, key=None):
+        self.teams = list(teams)
+        self.home_goi = home_goi
+        self.away_goi = away_goi
+        self.game_pace = game_pace
+        self.total_opportunity = total_opportunity
+        self.key = key
+        self.index = {team: i for i, team in enumerate(self.teams)}
+
+    def resolve_team(self, name):
+        """
+        Matches a team by exact name, abbreviation (e.g. 'CBJ') or a unique
+        case-insensitive substring. Returns the row index or None.
+        """
+        if name in self.index:
+            return self.index[name]
+        from calculate_goi import create_team_mapping
+
+        by_abbreviation = {abbr: team for team, abbr in create_team_mapping().items()}
+        if name.upper() in by_abbreviation and by_abbreviation[name.upper()] in self.index:
+            return self.index[by_abbreviation[name.upper()]]
+        matches = [i for i, team in enumerate(self.teams) if name.lower() in str(team).lower()]
+        return matches[0] if len(matches) == 1 else None
+
+    def lookup(self, home, away):
+        """
+        GOI for one hypothetical game in O(1).
+
+        Returns:
+            dict: Home, Away, Home_GOI, Away_GOI, Game_Pace and
+            Total_Opportunity (rounded as in goi_rankings.csv), or None if a
+            team is not known.
+        """
+        h, a = self.resolve_team(home), self.resolve_team(away)
+        if h is None or a is None:
+            return None
+        return {
+            'Home': self.teams[h],
+            'Away': self.teams[a],
+            'Home_GOI': round(float(self.home_goi[h, a]), 4),
+            'Away_GOI': round(float(self.away_goi[h, a]), 4),
+            'Game_Pace': round(float(self.game_pace[h, a]), 4),
+            'Total_Opportunity': round(float(self.total_opportunity[h, a]), 4)
+        }
+
+    def gather(self, home_idx, away_idx):
+        """
+        The four GOI components for many games at once, by row / column index.
+        """
+        return tuple(getattr(self, field)[home_idx, away_idx] for field in MATRIX_FIELDS)
+
+def matchup_key(tpi, goi_settings):
+    """
+    Digest of the team ratings and GOI blend a matrix depends on.
+    """
+    payload = repr((
+        tpi['team'].astype(str).tolist(),
+        tpi['defensive_resistance'].to_numpy(dtype=float).tobytes(),
+        tpi['pace_drivers'].to_numpy(dtype=float).tobytes(),
+        sorted(goi_settings.items())
+    ))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_matchup_matrix(tpi_rankings, goi_settings=None):
+    """
+    Computes every home / away pairing from the TPI table in one broadcast.
+
+    Args:
+        tpi_rankings (pd.DataFrame): TPI with team, defensive_resistance and
+            pace_drivers. Duplicate teams keep the last row.
+        goi_settings (dict): Offense / pace blend from get_goi_settings.
+
+    Returns:
+        MatchupMatrix
+    """
+    from calculate_goi import DEFAULT_GOI_SETTINGS, compute_goi_arrays
+
+    goi_settings = goi_settings or DEFAULT_GOI_SETTINGS
+    tpi = tpi_rankings.drop_duplicates('team', keep='last')
+    dr = tpi['defensive_resistance'].to_numpy(dtype=float)
+    pace = tpi['pace_drivers'].to_numpy(dtype=float)
+    components = compute_goi_arrays(dr[:, np.newaxis], dr[np.newaxis, :], pace[:, np.newaxis], pace[np.newaxis, :], goi_settings)
+    return MatchupMatrix(tpi['team'].tolist(), *components, key=matchup_key(tpi, goi_settings))
+
+def save_matchup_matrix(matrix, path):
+    """
+    Atomically writes a matrix to a compressed .npz.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}.npz"
+    np.savez_compressed(tmp_path, teams=np.array(matrix.teams, dtype=str), key=np.array(matrix.key or ''),
+                        **{field: getattr(matrix, field) for field in MATRIX_FIELDS})
+    os.replace(tmp_path, path)
+
+def load_matchup_matrix(path):
+    """
+    Reads a saved matrix, or returns None if it is missing or unreadable.
+    """
+    try:
+        with np.load(path) as saved:
+            return MatchupMatrix(saved['teams'].tolist(), *(saved[field] for field in MATRIX_FIELDS), key=str(saved['key']))
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+def matchup_matrix_path(config):
+    from data_cache import get_cache_settings
+    return os.path.join(get_cache_settings(config)['dir'], MATRIX_FILENAME)
+
+def get_matchup_matrix(config, tpi_rankings, goi_settings=None):
+    """
+    The matchup matrix for the current TPI, from the cache if TPI and the
+    GOI blend are unchanged, otherwise rebuilt and saved.
+    """
+    from calculate_goi import get_goi_settings
+
+    goi_settings = goi_settings or get_goi_settings(config)
+    path = matchup_matrix_path(config)
+    key = matchup_key(tpi_rankings.drop_duplicates('team', keep='last'), goi_settings)
+    matrix = load_matchup_matrix(path)
+    if matrix is not None and matrix.key == key:
+        return matrix
+
+    matrix = build_matchup_matrix(tpi_rankings, goi_settings)
+    save_matchup_matrix(matrix, path)
+    print(f"  -> Matchup matrix rebuilt for {len(matrix.teams)} teams ({path}).")
+    return matrix
+
+def main():
+    parser = argparse.ArgumentParser(description="Hypothetical GOI for any pairing from the cached matchup matrix")
+    parser.add_argument('games', nargs='*', help="Games as 'Away @ Home' or 'Home vs Away'; team names may be abbreviations.")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the matrix from tpi_rankings.csv.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+    from calculate_goi import get_goi_settings
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    tpi_rankings = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tpi_rankings.csv'))
+    if args.rebuild:
+        matrix = build_matchup_matrix(tpi_rankings, get_goi_settings(config))
+        save_matchup_matrix(matrix, matchup_matrix_path(config))
+    else:
+        matrix = get_matchup_matrix(config, tpi_rankings)
+
+    rows = []
+    for game in args.games:
+        if ' @ ' in game:
+            away, home = (part.strip() for part in game.split(' @ ', 1))
+        elif ' vs ' in game:
+            home, away = (part.strip() for part in game.split(' vs ', 1))
+        else:
+            print(f"WARNING: Game '{game}' format not recognized. Use 'Away @ Home' or 'Home vs Away'.")
+            continue
+        result = matrix.lookup(home, away)
+        if result is None:
+            print(f"WARNING: Could not match both teams in '{game}'.")
+            continue
+        rows.append(result)
+
+    if rows:
+        print(pd.DataFrame(rows)[['Away', 'Home', 'Away_GOI', 'Home_GOI', 'Game_Pace', 'Total_Opportunity']].to_string(index=False))
+    else:
+        print(f"Matchup matrix: {len(matrix.teams)} x {len(matrix.teams)} teams. Pass games to look up, e.g. 'CBJ @ COL'.")
+
+if __name__ == "__main__":
+    main()
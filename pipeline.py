@@ -0,0 +1,94 @@
+# Stage modules pull in pandas (and scipy for z-scores), so each function
+# imports only what it runs. Importing this module stays cheap for menus.
+
+def _load_config():
+    from calc_zscores_v2 import load_config
+    return load_config()
+
+def run_tpi(config=None, force=False, write=True):
+    """
+    Step 1: Calculate TPI in-process.
+
+    Args:
+        config (dict): The configuration dictionary. Loaded from config_v2.yaml if omitted.
+        force (bool): Recompute even if inputs are unchanged.
+        write (bool): Write zOverall.csv, team_total_zscores.csv and tpi_rankings.csv.
+
+    Returns:
+        dict: The TPI output DataFrames, or None on failure.
+    """
+    from calc_zscores_v2 import run_tpi_stage
+
+    config = config if config is not None else _load_config()
+    if config is None:
+        return None
+    return run_tpi_stage(config, force=force, write=write)
+
+def run_goi(tpi_rankings=None, schedule=None, config=None, force=False, write=True):
+    """
+    Step 2: Calculate GOI in-process, reusing an in-memory TPI if given.
+
+    Returns:
+        pd.DataFrame: GOI for every game, or None on failure.
+    """
+    from calculate_goi import run_goi_stage
+
+    config = config if config is not None else (_load_config() or {})
+    return run_goi_stage(config, tpi_rankings=tpi_rankings, schedule=schedule, force=force, write=write)
+
+def run_slate(date, games=None, goi_df=None, schedule_df=None, config=None, force=False, write=True):
+    """
+    Step 3: Analyze a slate in-process, reusing an in-memory GOI if given.
+
+    Returns:
+        pd.DataFrame: The ranked slate, or None if no games matched.
+    """
+    from analyze_slate import run_slate_stage
+
+    config = config if config is not None else (_load_config() or {})
+    return run_slate_stage(config, date, games, goi_df=goi_df, schedule_df=schedule_df, force=force, write=write)
+
+def run_full_pipeline(config=None, slate_date=None, games=None, force=False, write=True):
+    """
+    Runs TPI -> GOI (-> slate analysis if slate_date is given) in one
+    interpreter, passing DataFrames between steps in memory. Disk writes
+    are an optional side effect controlled by write.
+
+    Args:
+        config (dict): The configuration dictionary. Loaded from config_v2.yaml if omitted.
+        slate_date (str): Slate date (YYYY-MM-DD) to analyze after GOI, or None to stop at GOI.
+        games (str): Comma-separated game selection for the slate.
+        force (bool): Recompute every step even if inputs are unchanged.
+        write (bool): Write each step's output files.
+
+    Returns:
+        dict: {'tpi': dict, 'goi': DataFrame, 'slate': DataFrame}; a step that
+        did not run (or failed) is missing.
+    """
+    from calc_zscores_v2 import run_tpi_stage
+    from calculate_goi import run_goi_stage
+    from analyze_slate import run_slate_stage
+
+    config = config if config is not None else _load_config()
+    if config is None:
+        return {}
+
+    results = {}
+    tpi_outputs = run_tpi_stage(config, force=force, write=write)
+    if not tpi_outputs or 'tpi_rankings' not in tpi_outputs:
+        print("\n⚠️ Step 1 failed. Check the output above.")
+        return results
+    results['tpi'] = tpi_outputs
+
+    goi_df = run_goi_stage(config, tpi_rankings=tpi_outputs['tpi_rankings'], force=force, write=write)
+    if goi_df is None:
+        print("\n⚠️ Step 2 failed. Check the output above.")
+        return results
+    results['goi'] = goi_df
+
+    if slate_date:
+        slate_df = run_slate_stage(config, slate_date, games, goi_df=goi_df, force=force, write=write)
+        if slate_df is not None:
+            results['slate'] = slate_df
+
+    return results
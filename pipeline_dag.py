@@ -0,0 +1,598 @@
+import io
+import os
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+import threading
+import contextlib
+import functools
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Stage modules pull in pandas and scipy; they are imported when a graph is
+# built (--list-nodes included), so only --help stays fast.
+
+# Pipeline sources that are not part of a build_cache stage but change node outputs
+GRAPH_CODE_FILES = ['pipeline_dag.py', 'calc_zscores_v2a.py', 'guardrails.py', 'guardrail_inputs.py']
+
+class Node:
+    """
+    One pipeline stage: a function from named inputs to named outputs.
+
+    Args:
+        name (str): Unique node name.
+        func (callable): Called with one positional argument per input, in
+            inputs order. Returns the output value, or a tuple in outputs
+            order if there are several.
+            Returning None marks the node as failed.
+        inputs (list): Output names this node consumes.
+        outputs (list): Output names this node produces. Defaults to [name].
+        cache_key (callable): Returns a JSON-serializable fingerprint of
+            anything the node reads besides its inputs (e.g. a file's mtime).
+            The node is re-run only when this or an input changes.
+        use_process (bool): Run in a worker process instead of a thread, for
+            CPU-bound Python work such as workbook parsing. func and its bound
+            arguments must be picklable.
+        optional_inputs (list): Inputs the node can do without: if their
+            producer fails, the node still runs and gets None for them.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=None, cache_key=None, use_process=False, optional_inputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs) if outputs else [name]
+        self.cache_key = cache_key
+        self.use_process = use_process
+        self.optional_inputs = set(optional_inputs)
+
+    def __repr__(self):
+        return f"Node({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+class _ThreadLogRouter(io.TextIOBase):
+    """
+    Stands in for sys.stdout while a graph runs: each worker thread writes
+    to its own buffer, everything else goes to the real stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def _run_with_log(func, args):
+    """
+    Process worker: runs a node function and captures its console output.
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        result = func(*args)
+    return result, log.getvalue()
+
+def _run_in_thread(router, func, args):
+    router.local.buffer = io.StringIO()
+    try:
+        result = func(*args)
+        return result, router.local.buffer.getvalue()
+    finally:
+        router.local.buffer = None
+
+class DagScheduler:
+    """
+    Runs a graph of Nodes, executing independent nodes concurrently.
+
+    Results are kept between runs keyed by each node's fingerprint (its own
+    cache_key plus the fingerprints of its inputs), so a re-run only executes
+    nodes downstream of something that changed. With store_dir they are also
+    pickled to disk, so a one-shot process reuses what an earlier one
+    computed; salt must then cover whatever the node functions close over
+    (config, code), since that is not part of any cache_key.
+
+    Args:
+        nodes (list): The graph's Nodes.
+        workers (int): Nodes run concurrently.
+        store_dir (str): Directory for persisted results, or None.
+        salt (str): Mixed into every fingerprint.
+        cache_settings (dict): Settings from get_cache_settings, for evicting
+            old entries from store_dir.
+    """
+
+    def __init__(self, nodes, workers=1, store_dir=None, salt=None, cache_settings=None):
+        self.nodes = {}
+        self.producers = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate node name '{node.name}'.")
+            self.nodes[node.name] = node
+            for output in node.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Output '{output}' is produced by both '{self.producers[output]}' and '{node.name}'.")
+                self.producers[output] = node.name
+
+        for node in self.nodes.values():
+            missing = [i for i in node.inputs if i not in self.producers]
+            if missing:
+                raise ValueError(f"Node '{node.name}' needs inputs nobody produces: {missing}")
+
+        self.order = self._topological_order()
+        self.workers = max(1, int(workers or 1))
+        # node name -> (fingerprint, {output name: value})
+        self._results = {}
+        self.store_dir = store_dir
+        self.salt = salt
+        self.cache_settings = cache_settings or {}
+
+    def _upstream(self, node_name):
+        return [self.producers[i] for i in self.nodes[node_name].inputs]
+
+    def _topological_order(self):
+        """
+        Orders nodes so every node follows its producers, keeping declaration
+        order among independent nodes. Raises ValueError on a cycle.
+        """
+        remaining = {name: set(self._upstream(name)) for name in self.nodes}
+        order = []
+        while remaining:
+            ready = [name for name in self.nodes if name in remaining and not remaining[name]]
+            if not ready:
+                raise ValueError(f"Pipeline graph has a cycle among: {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def subgraph(self, targets=None):
+        """
+        Returns the node names needed to produce the target outputs (or node
+        names), in execution order. None selects the whole graph.
+        """
+        if targets is None:
+            return list(self.order)
+
+        needed = set()
+        stack = []
+        for target in targets:
+            if target in self.producers:
+                stack.append(self.producers[target])
+            elif target in self.nodes:
+                stack.append(target)
+            else:
+                raise KeyError(f"Unknown pipeline output '{target}'. Known outputs: {sorted(self.producers)}")
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self._upstream(name))
+        return [name for name in self.order if name in needed]
+
+    def _fingerprint(self, node, input_fingerprints):
+        payload = {
+            'node': node.name,
+            'key': node.cache_key() if node.cache_key else None,
+            'inputs': input_fingerprints,
+            'salt': self.salt
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _stored_path(self, fingerprint):
+        return os.path.join(self.store_dir, f"{fingerprint}.pkl")
+
+    def _load_stored(self, fingerprint):
+        """
+        Outputs persisted under fingerprint, or None.
+        """
+        if not self.store_dir:
+            return None
+        path = self._stored_path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                outputs = pickle.load(f)
+            # Touch the entry so size-based eviction treats it as recently used
+            os.utime(path, None)
+            return outputs
+        except Exception as e:
+            print(f"  -> WARNING: Unreadable node result {os.path.basename(path)} ({e}). Re-running.")
+            os.remove(path)
+            return None
+
+    def _store(self, fingerprint, outputs):
+        if not self.store_dir:
+            return
+        from data_cache import evict_stale_entries
+
+        path = self._stored_path(fingerprint)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            evict_stale_entries(self.store_dir, self.cache_settings.get('max_age_days'), self.cache_settings.get('max_size_mb'))
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"  -> WARNING: Could not persist result of node {fingerprint[:12]}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def invalidate(self, node_names=None):
+        """
+        Drops cached results for the given nodes (or all nodes).
+        """
+        for name in (node_names if node_names is not None else list(self._results)):
+            self._results.pop(name, None)
+
+    def run(self, targets=None, force=False):
+        """
+        Runs the nodes needed for targets and returns their outputs.
+
+        Args:
+            targets (list): Output or node names to produce. None runs everything.
+            force (bool): Ignore cached results, in memory and on disk.
+
+        Returns:
+            dict: {output name: value} for every output of every node that ran
+            or was reused. Outputs of failed nodes and of nodes downstream of a
+            failure (other than through optional inputs) are missing.
+        """
+        selected = self.subgraph(targets)
+        pending = {name: set(self._upstream(name)) for name in selected}
+        fingerprints = {}
+        values = {}
+        failed = set()
+
+        router = _ThreadLogRouter(sys.stdout)
+        thread_pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        process_pool = None
+        running = {}
+
+        def finish(name, result, log):
+            node = self.nodes[name]
+            if log:
+                print(log, end='')
+            if len(node.outputs) == 1:
+                result = (result,) if result is not None else None
+            if result is None or len(result) != len(node.outputs):
+                print(f"  -> Node '{name}' failed; skipping the nodes that need its outputs.")
+                failed.add(name)
+                return
+            outputs = dict(zip(node.outputs, result))
+            self._results[name] = (fingerprints[name], outputs)
+            self._store(fingerprints[name], outputs)
+            values.update(outputs)
+
+        def start(name):
+            node = self.nodes[name]
+            # A failed optional input contributes None, so a later successful run does not match
+            fingerprints[name] = self._fingerprint(node, [None if u in failed else fingerprints[u] for u in self._upstream(name)])
+            cached = self._results.get(name)
+            if not force and cached and cached[0] == fingerprints[name]:
+                values.update(cached[1])
+                return None
+            stored = None if force else self._load_stored(fingerprints[name])
+            if stored is not None:
+                self._results[name] = (fingerprints[name], stored)
+                values.update(stored)
+                return None
+
+            args = [values.get(i) if i in node.optional_inputs else values[i] for i in node.inputs]
+            if self.workers == 1:
+                # Serial path: run inline so logs stream as they happen
+                try:
+                    result = node.func(*args)
+                except Exception as e:
+                    print(f"  -> ERROR in node '{name}': {e}")
+                    result = None
+                finish(name, result, '')
+                return None
+            if node.use_process:
+                nonlocal process_pool
+                if process_pool is None:
+                    process_pool = ProcessPoolExecutor(max_workers=self.workers)
+                return process_pool.submit(_run_with_log, node.func, args)
+            return thread_pool.submit(_run_in_thread, router, node.func, args)
+
+        try:
+            with contextlib.redirect_stdout(router):
+                while pending or running:
+                    ready = [name for name in selected if name in pending and not pending[name]]
+                    for name in ready:
+                        del pending[name]
+                        future = start(name)
+                        if future is not None:
+                            running[future] = name
+                        else:
+                            self._release(name, pending, failed)
+
+                    if not running:
+                        if pending and not ready:
+                            break  # Only nodes blocked by failures remain
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            result, log = future.result()
+                        except Exception as e:
+                            print(f"  -> ERROR in node '{name}': {e}")
+                            result, log = None, ''
+                        finish(name, result, log)
+                        self._release(name, pending, failed)
+        finally:
+            if thread_pool is not None:
+                thread_pool.shutdown()
+            if process_pool is not None:
+                process_pool.shutdown()
+
+        return values
+
+    def _release(self, name, pending, failed):
+        """
+        Marks name as done for its dependents; dependents of a failed node
+        are dropped (and so are theirs, transitively) unless they only take
+        its outputs as optional inputs.
+        """
+        if name in failed:
+            for dependent in [d for d, deps in pending.items() if name in deps]:
+                node = self.nodes[dependent]
+                needed = [i for i in node.inputs if self.producers[i] == name and i not in node.optional_inputs]
+                if not needed:
+                    pending[dependent].discard(name)
+                elif dependent in pending:
+                    del pending[dependent]
+                    failed.add(dependent)
+                    self._release(dependent, pending, failed)
+            return
+        for deps in pending.values():
+            deps.discard(name)
+
+def _file_key(path):
+    """
+    Cheap change detector for a data file: (path, mtime, size), or 'missing'.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return [path, 'missing']
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+def graph_salt(config):
+    """
+    Digest of the config and pipeline source files, which node functions
+    close over but no cache_key covers. Persisted node results are only
+    reused under the same salt.
+    """
+    from build_cache import STAGE_CODE_FILES
+    from data_cache import file_sha256
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    code_files = sorted({name for names in STAGE_CODE_FILES.values() for name in names} | set(GRAPH_CODE_FILES))
+    payload = {
+        'config': config,
+        'code': {name: file_sha256(os.path.join(base_dir, name)) if os.path.exists(os.path.join(base_dir, name)) else 'missing'
+                 for name in code_files}
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def create_scheduler(config, nodes, workers=1):
+    """
+    A DagScheduler whose node results persist under <cache dir>/pipeline_dag
+    (in memory only when the cache is disabled).
+    """
+    from data_cache import get_cache_settings
+
+    cache_settings = get_cache_settings(config)
+    if not cache_settings.get('enabled', True):
+        return DagScheduler(nodes, workers)
+    return DagScheduler(nodes, workers, store_dir=os.path.join(cache_settings['dir'], 'pipeline_dag'),
+                        salt=graph_salt(config), cache_settings=cache_settings)
+
+def _concat_stats(config, date_str, *stat_matrices):
+    from zscore_matrix import concat_stat_matrices
+    from recency_zscores import apply_recency
+    from shrinkage import apply_shrinkage
+    # A provider file that failed to load or process arrives as None and is skipped
+    stat_matrices = [m for m in stat_matrices if m is not None and m.stats]
+    if not stat_matrices:
+        print("  -> No provider file produced stats.")
+        return None
+    return apply_shrinkage(apply_recency(concat_stat_matrices(stat_matrices), config, date_str), config)
+
+def _process_frame(file_info, reduced_df):
+    from calc_zscores_v2 import process_stats_batch
+    return process_stats_batch(reduced_df, file_info.get('stats', []), file_info.get('games_played_column'))
+
+def _read_schedule(path):
+    import pandas as pd
+
+    if not os.path.exists(path):
+        print(f"ERROR: Schedule file not found at {path}")
+        return None
+    schedule = pd.read_csv(path)
+    print(f"Loaded schedule: {len(schedule)} games")
+    return schedule
+
+def build_model_graph(config, date_str=None, data_dir=None, slate_date=None, games=None):
+    """
+    Declares the model pipeline as a list of Nodes.
+
+    Per provider file: load:<template> -> frame:<template> (read + validate)
+    and zscores:<template> -> stats:<template> (process_stats_batch). Then
+    stat_zscores -> bucket_zscores -> zOverall -> team_total_zscores and
+    tpi_rankings; schedule + tpi_rankings -> goi_rankings; the v2.1
+    guardrails (guardrail_inputs -> zOverall_GOI) and, with slate_date,
+    the slate analysis.
+
+    Args:
+        config (dict): The configuration dictionary.
+        date_str (str): Provider file date (YYYYMMDD). Defaults to today.
+        data_dir (str): Directory holding data files. Defaults to the script directory.
+        slate_date (str): Slate date (YYYY-MM-DD) for the 'slate' output.
+        games (str): Comma-separated game selection for the slate.
+
+    Returns:
+        list: The pipeline's Nodes.
+    """
+    from data_cache import get_cache_settings
+    from workbook_reader import get_reader_settings
+    from calc_zscores_v2 import (
+        load_provider_file, calculate_bucket_zscores,
+        combine_z_overall, create_team_totals, create_tpi_rankings
+    )
+    from calc_zscores_v2a import apply_goi_guardrails
+    from recency_zscores import recency_enabled
+    from guardrail_inputs import load_guardrail_inputs, guardrail_input_paths
+    from calculate_goi import calculate_goi, get_goi_settings, get_schedule_adjustments
+    from matchup_matrix import get_matchup_matrix
+
+    date_str = date_str or datetime.now().strftime('%Y%m%d')
+    data_dir = data_dir or os.path.dirname(os.path.abspath(__file__))
+    canonical_teams = set(config.get('canonical_teams', []))
+    team_name_mappings = config.get('team_name_mappings', [])
+    cache_settings = get_cache_settings(config)
+    reader_settings = get_reader_settings(config)
+
+    nodes = []
+    stats_outputs = []
+    for provider in config.get('providers', []):
+        for file_info in provider.get('files', []):
+            template = file_info.get('filename_template')
+            if not template:
+                continue
+            file_path = os.path.join(data_dir, f"{date_str}_{template}")
+            file_to_process = {'provider_name': provider.get('name'), 'file_path': file_path, 'file_info': file_info}
+            nodes.append(Node(
+                f"load:{template}",
+                functools.partial(load_provider_file, file_to_process, canonical_teams, team_name_mappings, cache_settings, reader_settings),
+                outputs=[f"frame:{template}"],
+                cache_key=functools.partial(_file_key, file_path),
+                use_process=True
+            ))
+            nodes.append(Node(
+                f"zscores:{template}",
+                functools.partial(_process_frame, file_info),
+                inputs=[f"frame:{template}"],
+                outputs=[f"stats:{template}"]
+            ))
+            stats_outputs.append(f"stats:{template}")
+
+    # Recency weighting also reads the snapshot store up to date_str
+    recency_paths = []
+    if recency_enabled(config):
+        from snapshot_store import get_history_settings, MANIFEST_FILENAME
+        recency_paths.append(os.path.join(get_history_settings(config)['store_dir'], MANIFEST_FILENAME))
+    nodes.append(Node('stat_zscores', functools.partial(_concat_stats, config, date_str), inputs=stats_outputs,
+                      optional_inputs=stats_outputs, cache_key=lambda: [date_str] + [_file_key(path) for path in recency_paths]))
+    nodes.append(Node('bucket_zscores', lambda stat_zscores: calculate_bucket_zscores(stat_zscores, config), inputs=['stat_zscores']))
+    nodes.append(Node('zOverall', combine_z_overall, inputs=['stat_zscores', 'bucket_zscores']))
+    nodes.append(Node('team_total_zscores', lambda zOverall: create_team_totals(zOverall, config), inputs=['zOverall']))
+    nodes.append(Node('tpi_rankings', lambda zOverall: create_tpi_rankings(zOverall, config), inputs=['zOverall']))
+
+    guardrail_paths = list(guardrail_input_paths(config, data_dir).values())
+    nodes.append(Node('guardrail_inputs', functools.partial(load_guardrail_inputs, config, data_dir),
+                      outputs=['games_played', 'opp_goalie_last3_sv', 'market_lines'],
+                      cache_key=lambda: [_file_key(path) for path in guardrail_paths]))
+    nodes.append(Node(
+        'zOverall_GOI',
+        lambda zOverall, games_played, opp_goalie_last3_sv, market_lines: apply_goi_guardrails(
+            zOverall, config, games_played, opp_goalie_last3_sv, market_lines),
+        inputs=['zOverall', 'games_played', 'opp_goalie_last3_sv', 'market_lines']
+    ))
+
+    schedule_path = os.path.join(data_dir, 'schedule.csv')
+    nodes.append(Node('schedule', functools.partial(_read_schedule, schedule_path), cache_key=functools.partial(_file_key, schedule_path)))
+    nodes.append(Node('matchup_matrix', lambda tpi_rankings: get_matchup_matrix(config, tpi_rankings, get_goi_settings(config)), inputs=['tpi_rankings']))
+    nodes.append(Node(
+        'goi_rankings',
+        lambda tpi_rankings, schedule, matchup_matrix: calculate_goi(tpi_rankings, schedule, get_goi_settings(config), matchup_matrix,
+                                                                     get_schedule_adjustments(config, schedule)),
+        inputs=['tpi_rankings', 'schedule', 'matchup_matrix']
+    ))
+
+    if slate_date:
+        from analyze_slate import build_slate
+        nodes.append(Node(
+            'slate',
+            lambda goi_rankings, schedule, matchup_matrix: build_slate(goi_rankings, schedule, slate_date, games, matchup_matrix),
+            inputs=['goi_rankings', 'schedule', 'matchup_matrix'],
+            cache_key=lambda: [slate_date, games]
+        ))
+    return nodes
+
+# Outputs written by --write, relative to the data directory
+OUTPUT_FILES = {
+    'zOverall': 'zOverall.csv',
+    'team_total_zscores': 'team_total_zscores.csv',
+    'tpi_rankings': 'tpi_rankings.csv',
+    'zOverall_GOI': 'zOverall_GOI_v2.1.csv',
+    'goi_rankings': 'goi_rankings.csv'
+}
+
+def write_outputs(values, output_dir, slate_date=None, goi_store_dir=None):
+    """
+    Writes every produced output that has a CSV file name, and GOI to the
+    GOI store if goi_store_dir is given.
+    """
+    from data_cache import write_csv_atomic
+
+    files = dict(OUTPUT_FILES)
+    if slate_date:
+        files['slate'] = f'slate_analysis_{slate_date}.csv'
+    for name, filename in files.items():
+        if name in values:
+            write_csv_atomic(values[name], os.path.join(output_dir, filename))
+            print(f"  -> Wrote {filename} ({len(values[name])} rows)")
+    if goi_store_dir and 'goi_rankings' in values:
+        from goi_store import write_goi_store
+        write_goi_store(values['goi_rankings'], goi_store_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the model pipeline (or just the part needed for some outputs) as a dependency graph")
+    parser.add_argument('--target', action='append', default=None,
+                        help="Output to produce, e.g. tpi_rankings or goi_rankings. Repeatable. Defaults to every output.")
+    parser.add_argument('--date', type=str, default=None, help="Provider file date (YYYYMMDD). Defaults to today.")
+    parser.add_argument('--slate-date', type=str, default=None, help="Also analyze this slate date (YYYY-MM-DD).")
+    parser.add_argument('--games', type=str, default=None, help="Comma-separated games for the slate.")
+    parser.add_argument('--workers', type=int, default=None, help="Concurrent nodes. Defaults to ingestion.workers in config_v2.yaml.")
+    parser.add_argument('--write', action='store_true', help="Write the produced outputs to CSV.")
+    parser.add_argument('--force', action='store_true', help="Re-run every node instead of reusing stored results.")
+    parser.add_argument('--list-nodes', action='store_true', help="Print the graph in execution order and exit.")
+    args = parser.parse_args()
+
+    from calc_zscores_v2 import load_config, get_ingestion_workers
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    workers = args.workers if args.workers is not None else get_ingestion_workers(config)
+    scheduler = create_scheduler(config, build_model_graph(config, args.date, slate_date=args.slate_date, games=args.games), workers)
+
+    if args.list_nodes:
+        for name in scheduler.subgraph(args.target):
+            node = scheduler.nodes[name]
+            print(f"{name:35s} {', '.join(node.inputs) or '-':60s} -> {', '.join(node.outputs)}")
+        return
+
+    values = scheduler.run(args.target, force=args.force)
+    missing = [t for t in (args.target or []) if t not in values]
+    if args.write:
+        from goi_store import get_goi_store_dir
+        write_outputs(values, os.path.dirname(os.path.abspath(__file__)), args.slate_date, get_goi_store_dir(config))
+    if missing:
+        print(f"\nERROR: Could not produce: {missing}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime
+import numpy as np
+from zscore_matrix import StatMatrix, compute_method_zscores, rank_descending
+
+RECENCY_MODES = ('season', 'rolling', 'ewm')
+
+RECENCY_AGGREGATIONS = ('rate', 'count')
+
+DEFAULT_RECENCY_SETTINGS = {
+    'mode': 'season',
+    'window': 7,
+    'halflife': 5,
+    'aggregation': 'rate'
+}
+
+STATE_FILENAME = 'recency_state.npz'
+
+def get_recency_settings(config):
+    """
+    Resolves the recency mode of every configured stat.
+
+    The top-level 'recency' block sets the default; a stat can override it
+    with its own 'recency', 'window', 'halflife' and 'aggregation' keys.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+
+    Returns:
+        dict: {stat name: {'mode', 'window', 'halflife', 'aggregation'}} in
+        config order.
+    """
+    defaults = dict(DEFAULT_RECENCY_SETTINGS)
+    defaults.update((config or {}).get('recency', {}) or {})
+
+    settings = {}
+    for provider in (config or {}).get('providers', []):
+        for file_info in provider.get('files', []):
+            for stat in file_info.get('stats', []):
+                mode = stat.get('recency', defaults['mode'])
+                if mode not in RECENCY_MODES:
+                    raise ValueError(f"Stat '{stat['name']}' has unknown recency mode '{mode}'. Use one of {RECENCY_MODES}.")
+                aggregation = stat.get('aggregation', defaults['aggregation'])
+                if aggregation not in RECENCY_AGGREGATIONS:
+                    raise ValueError(f"Stat '{stat['name']}' has unknown aggregation '{aggregation}'. Use one of {RECENCY_AGGREGATIONS}.")
+                settings[stat['name']] = {
+                    'mode': mode,
+                    'window': int(stat.get('window', defaults['window'])),
+                    'halflife': float(stat.get('halflife', defaults['halflife'])),
+                    'aggregation': aggregation
+                }
+    return settings
+
+def recency_enabled(config):
+    """
+    True if any stat uses a rolling or exponentially weighted z-score.
+    """
+    return any(s['mode'] != 'season' for s in get_recency_settings(config).values())
+
+class RecencyState:
+    """
+    Streaming per-team, per-stat recency values over daily snapshots.
+
+    Snapshots are season-to-date aggregates, so games played turns each one
+    into a running season total: value x GP for rate stats (percentages,
+    per-60 and per-game figures), the value itself for count stats. The
+    difference between two totals covers exactly the games played in
+    between, and both modes report per-game averages of those games:
+
+    - rolling: the last `window` games, i.e. the total since the latest
+      snapshot at or before GP - window, divided by the games it spans.
+      Until a team has played `window` games this is its season value.
+    - ewm: every game weighted by 0.5 ** (games ago / halflife); the games
+      between two snapshots share their average.
+
+    A drop in games played starts a new season, and neither mode reaches
+    back past it. Season stats just hold the latest value and do not need
+    games played. Each update costs O(teams x stats x games in the season).
+
+    Attributes:
+        boundary_total, boundary_gp (np.ndarray): teams x stats x (games + 1).
+            Entry g is the season total and games played of the latest
+            snapshot with at most g games; entry 0 is the season start.
+        last_total, last_gp (np.ndarray): The latest snapshot's season total
+            and games played.
+        ew_sum, ew_weight (np.ndarray): Decayed per-game sums for EWM stats.
+        latest (np.ndarray): The latest raw value, for season stats.
+    """
+
+    def __init__(self, teams, stats, settings):
+        self.teams = list(teams)
+        self.stats = list(stats)
+        self.modes = np.array([settings[s]['mode'] for s in self.stats])
+        self.windows = np.array([settings[s]['window'] if settings[s]['mode'] == 'rolling' else 1 for s in self.stats], dtype=np.intp)
+        self.decay = np.array([0.5 ** (1.0 / settings[s]['halflife']) if settings[s]['mode'] == 'ewm' else 0.0 for s in self.stats])
+        self.is_rate = np.array([settings[s]['aggregation'] == 'rate' for s in self.stats], dtype=bool)
+        self.signature = self.make_signature(self.teams, self.stats, settings)
+
+        shape = (len(self.teams), len(self.stats))
+        self.boundary_total = np.zeros(shape + (1,))
+        self.boundary_gp = np.zeros(shape + (1,))
+        self.last_total = np.zeros(shape)
+        self.last_gp = np.zeros(shape)
+        self.ew_sum = np.zeros(shape)
+        self.ew_weight = np.zeros(shape)
+        self.latest = np.full(shape, np.nan)
+        self.dates = []
+
+    @staticmethod
+    def make_signature(teams, stats, settings):
+        payload = {'version': 2, 'teams': list(teams), 'stats': list(stats), 'settings': {s: settings[s] for s in stats}}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def update(self, date_str, values, games_played):
+        """
+        Adds one snapshot.
+
+        Args:
+            date_str (str): Snapshot date (YYYYMMDD); must be after the last update.
+            values (np.ndarray): teams x stats season-to-date values, NaN where missing.
+            games_played (np.ndarray): teams x stats games behind each value,
+                NaN where unknown. Cells without games played only update
+                season stats.
+        """
+        if self.dates and date_str <= self.dates[-1]:
+            raise ValueError(f"Snapshot {date_str} is not after the last update {self.dates[-1]}.")
+
+        self.latest = np.where(np.isnan(values), self.latest, values)
+
+        present = ~np.isnan(values) & ~np.isnan(games_played) & (np.nan_to_num(games_played, nan=-1.0) >= 0)
+        gp = np.where(present, np.round(np.nan_to_num(games_played)), self.last_gp)
+        total = np.where(present, np.where(self.is_rate, np.nan_to_num(values) * gp, np.nan_to_num(values)), self.last_total)
+
+        # Fewer games than last time: a new season, so forget the old one
+        new_season = present & (gp < self.last_gp)
+        if new_season.any():
+            self.boundary_total[new_season] = 0.0
+            self.boundary_gp[new_season] = 0.0
+            for name in ('last_total', 'last_gp', 'ew_sum', 'ew_weight'):
+                getattr(self, name)[new_season] = 0.0
+
+        max_gp = int(gp.max()) if gp.size else 0
+        if max_gp >= self.boundary_total.shape[2]:
+            extra = max_gp + 1 - self.boundary_total.shape[2]
+            self.boundary_total = np.pad(self.boundary_total, ((0, 0), (0, 0), (0, extra)))
+            self.boundary_gp = np.pad(self.boundary_gp, ((0, 0), (0, 0), (0, extra)))
+
+        # Games between the last snapshot and this one have no snapshot of their
+        # own: their boundary is the last snapshot
+        games = np.arange(self.boundary_total.shape[2])
+        between = present[..., np.newaxis] & (games > self.last_gp[..., np.newaxis]) & (games < gp[..., np.newaxis])
+        self.boundary_total = np.where(between, self.last_total[..., np.newaxis], self.boundary_total)
+        self.boundary_gp = np.where(between, self.last_gp[..., np.newaxis], self.boundary_gp)
+        rows, cols = np.nonzero(present)
+        at = gp[rows, cols].astype(np.intp)
+        self.boundary_total[rows, cols, at] = total[rows, cols]
+        self.boundary_gp[rows, cols, at] = gp[rows, cols]
+
+        # EWM: the n new games each count their per-game average; older games
+        # decay by decay ** n, and the new ones weigh 1 + decay + ... + decay ** (n - 1)
+        new_games = present & (gp > self.last_gp)
+        n_games = np.where(new_games, gp - self.last_gp, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            per_game = np.where(new_games, (total - self.last_total) / n_games, 0.0)
+            kept = self.decay ** n_games
+            added = np.where(self.decay > 0, (1.0 - kept) / (1.0 - self.decay), n_games)
+        self.ew_sum = np.where(new_games, self.ew_sum * kept + per_game * added, self.ew_sum)
+        self.ew_weight = np.where(new_games, self.ew_weight * kept + added, self.ew_weight)
+
+        self.last_total = total
+        self.last_gp = gp
+        self.dates.append(date_str)
+
+    def current_values(self):
+        """
+        Returns the teams x stats recency-weighted values after the last update.
+        """
+        start = np.maximum(self.last_gp - self.windows, 0).astype(np.intp)[..., np.newaxis]
+        start_total = np.take_along_axis(self.boundary_total, start, axis=2)[..., 0]
+        start_gp = np.take_along_axis(self.boundary_gp, start, axis=2)[..., 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rolling = (self.last_total - start_total) / (self.last_gp - start_gp)
+            ewm = self.ew_sum / self.ew_weight
+        values = np.where(self.modes == 'rolling', rolling, np.where(self.modes == 'ewm', ewm, self.latest))
+        return np.asfortranarray(values)
+
+    def copy(self):
+        clone = RecencyState.__new__(RecencyState)
+        clone.__dict__.update({k: (v.copy() if isinstance(v, (np.ndarray, list)) else v) for k, v in self.__dict__.items()})
+        return clone
+
+    def save(self, path, manifest_digest):
+        arrays = {k: v for k, v in self.__dict__.items() if isinstance(v, np.ndarray) and k not in ('modes', 'windows', 'decay', 'is_rate')}
+        meta = {'signature': self.signature, 'dates': self.dates, 'manifest_digest': manifest_digest}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}.npz"
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """
+        Restores a saved state. Returns the saved manifest digest, or None if
+        the file is missing or was made for different teams, stats or settings.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as saved:
+                meta = json.loads(str(saved['meta']))
+                if meta['signature'] != self.signature:
+                    return None
+                for key in saved.files:
+                    if key != 'meta':
+                        setattr(self, key, saved[key])
+        except (OSError, ValueError, KeyError):
+            return None
+        self.dates = meta['dates']
+        return meta['manifest_digest']
+
+def snapshot_values(date_str, store_dir, teams, stats, column='value'):
+    """
+    Loads one column of a stored snapshot (raw values by default) as a
+    teams x stats array. NaN where the team, stat or column is not stored.
+    """
+    from snapshot_store import load_snapshot
+
+    snapshot = load_snapshot(date_str, store_dir, stats=stats)
+    values = np.full((len(teams), len(stats)), np.nan)
+    if snapshot.empty or column not in snapshot.columns:
+        return values
+    row_of = {team: i for i, team in enumerate(teams)}
+    col_of = {stat: j for j, stat in enumerate(stats)}
+    rows = snapshot['team'].map(row_of)
+    cols = snapshot['stat'].map(col_of)
+    keep = rows.notna() & cols.notna()
+    values[rows[keep].astype(int).to_numpy(), cols[keep].astype(int).to_numpy()] = snapshot[column][keep].astype(float).to_numpy()
+    return values
+
+def _manifest_digest(store_dir, dates):
+    from snapshot_store import load_manifest
+
+    manifest = load_manifest(store_dir)
+    payload = {d: manifest.get(d) for d in dates}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_recency_state(config, before_date, store_dir=None):
+    """
+    Returns the recency state built from every stored snapshot dated before
+    before_date.
+
+    The state is persisted in the cache directory, so each call only folds
+    in snapshots stored since the last one. It is rebuilt from scratch when
+    the stats, settings or any already-folded snapshot change.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+        before_date (str): Exclusive upper bound (YYYYMMDD).
+        store_dir (str): Snapshot store. Defaults to history.store_dir.
+
+    Returns:
+        RecencyState: The state after the last snapshot before before_date.
+    """
+    from data_cache import get_cache_settings
+    from snapshot_store import get_history_settings, list_snapshot_dates
+
+    store_dir = store_dir or get_history_settings(config)['store_dir']
+    settings = get_recency_settings(config)
+    teams = sorted(config.get('canonical_teams', []))
+    stats = list(settings)
+    state_path = os.path.join(get_cache_settings(config)['dir'], STATE_FILENAME)
+
+    state = RecencyState(teams, stats, settings)
+    saved_digest = state.load(state_path)
+    if saved_digest is None or saved_digest != _manifest_digest(store_dir, state.dates) or (state.dates and state.dates[-1] >= before_date):
+        state = RecencyState(teams, stats, settings)
+
+    new_dates = [d for d in list_snapshot_dates(store_dir) if d < before_date and (not state.dates or d > state.dates[-1])]
+    for date_str in new_dates:
+        state.update(date_str, snapshot_values(date_str, store_dir, teams, stats),
+                     snapshot_values(date_str, store_dir, teams, stats, column='games_played'))
+    if new_dates:
+        print(f"  -> Recency state updated with {len(new_dates)} snapshot(s) through {new_dates[-1]}.")
+        state.save(state_path, _manifest_digest(store_dir, state.dates))
+    return state
+
+def apply_recency(stat_matrix, config, date_str=None, store_dir=None):
+    """
+    Replaces the z-scores of rolling and EWM stats with recency-weighted ones.
+
+    History comes from the snapshot store (dates before date_str); today's
+    values from stat_matrix are folded in on top. Season stats are left
+    untouched, so with the default config this returns stat_matrix as-is.
+    Windows are counted in games, so a stat whose file reports no games
+    played keeps its season value (with a warning).
+
+    Args:
+        stat_matrix (StatMatrix): Today's per-stat values and z-scores.
+        config (dict): The loaded configuration dictionary.
+        date_str (str): Today's date (YYYYMMDD). Defaults to today.
+        store_dir (str): Snapshot store. Defaults to history.store_dir.
+
+    Returns:
+        StatMatrix: A matrix with recency-weighted values, z-scores and ranks
+        for non-season stats.
+    """
+    settings = get_recency_settings(config)
+    recent_cols = [j for j, s in enumerate(stat_matrix.stats) if settings.get(s, {}).get('mode', 'season') != 'season']
+    if not recent_cols:
+        return stat_matrix
+
+    print("\n--- Applying Recency Weighting ---")
+    games_played = stat_matrix.games_played
+    if games_played is None:
+        games_played = np.full(stat_matrix.values.shape, np.nan)
+    no_games = [j for j in recent_cols if np.isnan(games_played[:, j]).all()]
+    for j in no_games:
+        print(f"  -> WARNING: No games played reported for '{stat_matrix.stats[j]}'; keeping its season value.")
+    recent_cols = [j for j in recent_cols if j not in no_games]
+    if not recent_cols:
+        return stat_matrix
+
+    date_str = date_str or datetime.now().strftime('%Y%m%d')
+    state = load_recency_state(config, date_str, store_dir).copy()
+
+    # Fold today's values in, aligned to the state's team and stat axes
+    today = np.full((len(state.teams), len(state.stats)), np.nan)
+    today_games = np.full((len(state.teams), len(state.stats)), np.nan)
+    state_rows = {team: i for i, team in enumerate(state.teams)}
+    state_cols = {stat: j for j, stat in enumerate(state.stats)}
+    rows = np.array([state_rows.get(team, -1) for team in stat_matrix.teams])
+    known = rows >= 0
+    for j, stat_name in enumerate(stat_matrix.stats):
+        today[rows[known], state_cols[stat_name]] = stat_matrix.values[known, j]
+        today_games[rows[known], state_cols[stat_name]] = games_played[known, j]
+    state.update(date_str, today, today_games)
+    weighted = state.current_values()
+
+    stat_cfgs = _stat_configs(config, stat_matrix.stats)
+    signs = np.array([-1.0 if cfg.get('reverse_sign', False) else 1.0 for cfg in stat_cfgs])
+    values = stat_matrix.values.copy(order='F')
+    for j in recent_cols:
+        cfg = settings[stat_matrix.stats[j]]
+        values[:, j] = np.nan
+        values[known, j] = weighted[rows[known], state_cols[stat_matrix.stats[j]]]
+        span = f"per-game mean of the last {cfg['window']} games" if cfg['mode'] == 'rolling' else f"per-game EWM, half-life {cfg['halflife']:g} games"
+        print(f"    - '{stat_matrix.stats[j]}': {span} ({cfg['aggregation']} stat, {len(state.dates)} snapshot(s)).")
+
+    zscores = stat_matrix.zscores.copy(order='F')
+    ranks = stat_matrix.ranks.copy(order='F')
+    recent_z = compute_method_zscores(np.asfortranarray(values[:, recent_cols]), [stat_cfgs[j] for j in recent_cols]) * signs[recent_cols]
+    zscores[:, recent_cols] = recent_z
+    ranks[:, recent_cols] = rank_descending(np.asfortranarray(recent_z))
+    return StatMatrix(stat_matrix.teams, stat_matrix.stats, values, zscores, ranks, stat_matrix.source_rows,
+                      stat_matrix.games_played)
+
+def _stat_configs(config, stats):
+    stat_cfgs = {}
+    for provider in config.get('providers', []):
+        for file_info in provider.get('files', []):
+            for stat in file_info.get('stats', []):
+                stat_cfgs[stat['name']] = stat
+    return [stat_cfgs.get(s, {'name': s}) for s in stats]
+
+def recency_history(config, start_date=None, end_date=None, store_dir=None):
+    """
+    Computes recency-weighted z-scores for every stored snapshot in a range.
+
+    One streaming pass over the store: each date costs O(teams x stats).
+    Snapshots before start_date are folded in but not reported, so windows
+    are full from the first reported date.
+
+    Returns:
+        pd.DataFrame: Date, team, stat, mode, value, zscore, rank.
+    """
+    import pandas as pd
+    from snapshot_store import get_history_settings, list_snapshot_dates
+
+    store_dir = store_dir or get_history_settings(config)['store_dir']
+    settings = get_recency_settings(config)
+    teams = sorted(config.get('canonical_teams', []))
+    stats = list(settings)
+    stat_cfgs = _stat_configs(config, stats)
+    signs = np.array([-1.0 if cfg.get('reverse_sign', False) else 1.0 for cfg in stat_cfgs])
+    state = RecencyState(teams, stats, settings)
+
+    frames = []
+    for date_str in list_snapshot_dates(store_dir):
+        if end_date and date_str > end_date:
+            break
+        state.update(date_str, snapshot_values(date_str, store_dir, teams, stats),
+                     snapshot_values(date_str, store_dir, teams, stats, column='games_played'))
+        if start_date and date_str < start_date:
+            continue
+        values = state.current_values()
+        zscores = compute_method_zscores(values, stat_cfgs) * signs
+        ranks = rank_descending(np.asfortranarray(zscores))
+        frames.append(pd.DataFrame({
+            'Date': date_str,
+            'team': np.repeat(np.asarray(teams, dtype=object), len(stats)),
+            'stat': np.tile(np.asarray(stats, dtype=object), len(teams)),
+            'mode': np.tile(state.modes.astype(object), len(teams)),
+            'value': values.ravel(order='C'),
+            'zscore': zscores.ravel(order='C'),
+            'rank': ranks.ravel(order='C')
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'team', 'stat', 'mode', 'value', 'zscore', 'rank'])
+    return pd.concat(frames, ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute rolling / exponentially weighted z-scores over the snapshot store")
+    parser.add_argument('--start', type=str, default=None, help="First date to report (YYYYMMDD).")
+    parser.add_argument('--end', type=str, default=None, help="Last date to report (YYYYMMDD).")
+    parser.add_argument('--out', type=str, default='recency_zscores.csv', help="Output CSV path.")
+    args = parser.parse_args()
+
+    from calc_zscores_v2 import load_config
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    history = recency_history(config, args.start, args.end)
+    if history.empty:
+        print("No stored snapshots in range. Run snapshot_store.py first.")
+        return
+    history.to_csv(args.out, index=False)
+    print(f"Wrote {len(history)} rows for {history['Date'].nunique()} dates to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+DEFAULT_SCHEDULE_CONTEXT_SETTINGS = {
+    'window_days': 7,
+    'season_break_days': 30,
+    'adjustments': {
+        'back_to_back': 0.0,
+        'rest_advantage': 0.0,
+        'max_rest_edge': 3,
+        'road_streak': 0.0
+    }
+}
+
+CONTEXT_COLUMNS = [
+    'Home_Rest_Days', 'Away_Rest_Days', 'Home_B2B', 'Away_B2B',
+    'Home_Recent_Games', 'Away_Recent_Games', 'Home_Road_Streak', 'Away_Road_Streak', 'Rest_Advantage'
+]
+
+def get_schedule_context_settings(config):
+    """
+    Returns the 'schedule_context' block of the config merged over the
+    defaults (adjustments are merged key by key).
+    """
+    user = dict((config or {}).get('schedule_context', {}) or {})
+    settings = dict(DEFAULT_SCHEDULE_CONTEXT_SETTINGS)
+    settings['adjustments'] = dict(DEFAULT_SCHEDULE_CONTEXT_SETTINGS['adjustments'])
+    settings['adjustments'].update(user.pop('adjustments', {}) or {})
+    settings.update(user)
+    return settings
+
+def adjustments_enabled(settings):
+    """
+    True if any GOI adjustment coefficient is non-zero.
+    """
+    adjustments = settings['adjustments']
+    return any(adjustments[k] for k in ('back_to_back', 'rest_advantage', 'road_streak'))
+
+def compute_schedule_context(schedule, settings=None):
+    """
+    Rest and travel context for every game, computed in one pass.
+
+    Each game becomes one row per team; the rows are sorted once by
+    (team, date) and everything else is a shift, cumulative sum or
+    searchsorted over that order. A gap of more than season_break_days
+    between a team's games starts a new season: rest is unknown (NaN) and
+    the road streak resets.
+
+    Args:
+        schedule (pd.DataFrame): Games with Date (YYYY-MM-DD), Visitor and Home.
+        settings (dict): From get_schedule_context_settings.
+
+    Returns:
+        pd.DataFrame: Aligned row for row with schedule (same index), with
+        Home_/Away_ Rest_Days (days off since the team's previous game; 0 on
+        a back-to-back), B2B, Recent_Games (games in the window_days before
+        this one), Road_Streak (consecutive road games including this one;
+        0 at home) and Rest_Advantage (home minus away rest days).
+    """
+    import pandas as pd
+
+    settings = settings or DEFAULT_SCHEDULE_CONTEXT_SETTINGS
+    window = int(settings['window_days'])
+    season_break = int(settings['season_break_days'])
+
+    n_games = len(schedule)
+    game_days = pd.to_datetime(schedule['Date'], errors='coerce').to_numpy(dtype='datetime64[D]')
+    dated = ~np.isnat(game_days)
+
+    # One row per (game, side): first all home sides, then all away sides
+    teams = np.concatenate([schedule['Home'].to_numpy(dtype=object), schedule['Visitor'].to_numpy(dtype=object)])
+    is_home = np.repeat([True, False], n_games)
+    days = np.tile(game_days, 2)
+    keep = np.tile(dated, 2) & pd.notna(teams)
+    rows = np.flatnonzero(keep)
+
+    team_codes, _ = pd.factorize(teams[rows])
+    day_numbers = (days[rows] - days[rows].min()).astype(np.int64) if len(rows) else np.zeros(0, dtype=np.int64)
+    order = np.lexsort((rows % max(n_games, 1), day_numbers, team_codes))
+    code, day, home = team_codes[order], day_numbers[order], is_home[rows][order]
+
+    # Previous game of the same team in the same season
+    gap = np.diff(day, prepend=0)
+    new_team = np.r_[True, code[1:] != code[:-1]] if len(code) else np.zeros(0, dtype=bool)
+    new_season = new_team | (gap > season_break)
+    rest = np.where(new_season, np.nan, gap - 1.0)
+
+    # Earlier games within window_days: positions of (team, day - window) in the sorted keys
+    span = int(day.max()) + window + 1 if len(day) else 1
+    keys = code.astype(np.int64) * span + day
+    recent = np.arange(len(keys)) - np.searchsorted(keys, keys - window, side='left')
+
+    # Road streak: away games since the last home game / season start
+    away = (~home).astype(np.int64)
+    reset = new_season | home
+    seen = np.cumsum(away)
+    group_start = np.maximum.accumulate(np.where(reset, np.arange(len(reset)), 0))
+    road_streak = seen - (seen[group_start] - away[group_start])
+
+    # Back to the per-game layout
+    def scatter(values, fill):
+        out = np.full(2 * n_games, fill, dtype=float)
+        out[rows[order]] = values
+        return out[:n_games], out[n_games:]
+
+    home_rest, away_rest = scatter(rest, np.nan)
+    home_recent, away_recent = scatter(recent, np.nan)
+    home_road, away_road = scatter(road_streak, np.nan)
+    context = pd.DataFrame({
+        'Home_Rest_Days': home_rest,
+        'Away_Rest_Days': away_rest,
+        'Home_B2B': home_rest == 0,
+        'Away_B2B': away_rest == 0,
+        'Home_Recent_Games': home_recent,
+        'Away_Recent_Games': away_recent,
+        'Home_Road_Streak': home_road,
+        'Away_Road_Streak': away_road,
+        'Rest_Advantage': home_rest - away_rest
+    }, index=schedule.index)
+    return context
+
+def load_schedule_context(config, schedule_path):
+    """
+    Schedule context for schedule_path through the content-addressed cache,
+    keyed on the file's SHA-256 and the window / season-break settings.
+
+    Returns:
+        pd.DataFrame: As compute_schedule_context, with a default index
+        matching the rows of the CSV.
+    """
+    import pandas as pd
+    from data_cache import get_cache_settings, load_cached_frame
+
+    settings = get_schedule_context_settings(config)
+    return load_cached_frame(
+        schedule_path,
+        {'schedule_context': 1, 'window_days': settings['window_days'], 'season_break_days': settings['season_break_days']},
+        lambda: compute_schedule_context(pd.read_csv(schedule_path), settings),
+        get_cache_settings(config),
+        namespace='schedule_context'
+    )
+
+def schedule_goi_adjustments(context, settings):
+    """
+    Additive Home_GOI / Away_GOI adjustments from the schedule context.
+
+    A team on the second night of a back-to-back gets back_to_back; each
+    day of rest edge over the opponent (capped at max_rest_edge) is worth
+    rest_advantage; the away side gets road_streak per road game beyond
+    the first of its trip. Unknown rest contributes nothing.
+
+    Returns:
+        tuple: (home_adjustment, away_adjustment) arrays aligned with context.
+    """
+    adjustments = settings['adjustments']
+    cap = float(adjustments['max_rest_edge'])
+    rest_edge = np.clip(np.nan_to_num(context['Rest_Advantage'].to_numpy(dtype=float)), -cap, cap)
+
+    home = adjustments['back_to_back'] * context['Home_B2B'].to_numpy(dtype=float) + adjustments['rest_advantage'] * rest_edge
+    away = adjustments['back_to_back'] * context['Away_B2B'].to_numpy(dtype=float) - adjustments['rest_advantage'] * rest_edge
+    away = away + adjustments['road_streak'] * np.maximum(np.nan_to_num(context['Away_Road_Streak'].to_numpy(dtype=float)) - 1, 0)
+    return home, away
+
+def main():
+    parser = argparse.ArgumentParser(description="Rest days, back-to-backs, recent workload and road streaks for every game in schedule.csv")
+    parser.add_argument('--schedule', type=str, default='schedule.csv', help="Schedule CSV.")
+    parser.add_argument('--out', type=str, default='schedule_context.csv', help="Output CSV (schedule columns plus context).")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+    if not os.path.exists(args.schedule):
+        print(f"ERROR: Schedule file not found at {args.schedule}")
+        sys.exit(1)
+
+    schedule = pd.read_csv(args.schedule)
+    context = load_schedule_context(config, args.schedule)
+    result = pd.concat([schedule[['Date', 'Visitor', 'Home']], context.reset_index(drop=True)], axis=1)
+    result.to_csv(args.out, index=False)
+    print(f"Wrote schedule context for {len(result)} games to {args.out} "
+          f"({int(context['Home_B2B'].sum() + context['Away_B2B'].sum())} back-to-back team games).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import sys
+import argparse
+import numpy as np
+from zscore_matrix import StatMatrix, rank_descending
+
+DEFAULT_SHRINKAGE_SETTINGS = {
+    'enabled': False,
+    'default_prior_strength': 0,
+    'default_games_played': None
+}
+
+def get_shrinkage_settings(config):
+    """
+    Returns the 'shrinkage' block of the config merged over the defaults.
+    """
+    settings = dict(DEFAULT_SHRINKAGE_SETTINGS)
+    settings.update((config or {}).get('shrinkage', {}) or {})
+    return settings
+
+def prior_strengths(config, stats):
+    """
+    Per-stat prior strength k (in games), in the order of stats.
+
+    A stat's own 'prior_strength' key wins over shrinkage.default_prior_strength.
+
+    Returns:
+        np.ndarray: One k per stat; 0 means the stat is not shrunk.
+    """
+    default = float(get_shrinkage_settings(config)['default_prior_strength'] or 0)
+    stat_cfgs = {}
+    for provider in (config or {}).get('providers', []):
+        for file_info in provider.get('files', []):
+            for stat in file_info.get('stats', []):
+                stat_cfgs[stat['name']] = stat
+
+    strengths = np.array([float(stat_cfgs.get(s, {}).get('prior_strength', default)) for s in stats])
+    if (strengths < 0).any():
+        raise ValueError("prior_strength must be >= 0.")
+    return strengths
+
+def shrink_zscores(zscores, games_played, prior_strength):
+    """
+    Empirical-Bayes shrinkage of z-scores toward the league average (z = 0).
+
+    A team's observed mean over n games is blended with a prior worth k
+    league-average games, so z becomes z * n / (n + k). Works on any number
+    of leading axes (e.g. days x teams x stats) in one broadcast.
+
+    Args:
+        zscores (np.ndarray): ... x teams x stats z-scores.
+        games_played (np.ndarray): Games behind each z-score, broadcastable to
+            zscores. NaN leaves that z-score unshrunk.
+        prior_strength (np.ndarray): One k per stat (last axis); 0 = no shrinkage.
+
+    Returns:
+        np.ndarray: Shrunk z-scores, same shape and memory order as zscores.
+    """
+    games = np.maximum(np.asarray(games_played, dtype=float), 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        factor = games / (games + prior_strength)
+    # Unknown games played or k = 0: keep the z-score as is
+    factor = np.where(np.isnan(factor) | (prior_strength == 0), 1.0, factor)
+    shrunk = np.empty_like(zscores)
+    np.multiply(zscores, factor, out=shrunk)
+    return shrunk
+
+def _fill_games_played(games_played, settings):
+    fallback = settings.get('default_games_played')
+    if fallback is None:
+        return games_played
+    return np.where(np.isnan(games_played), float(fallback), games_played)
+
+def apply_shrinkage(stat_matrix, config):
+    """
+    Shrinks each stat's z-scores toward the league average by the team's
+    games played and the stat's prior strength, then re-ranks.
+
+    Runs between per-stat z-scoring and bucket averaging. With shrinkage
+    disabled (the default) or no stat with a prior, stat_matrix is returned
+    as-is.
+
+    Args:
+        stat_matrix (StatMatrix): Per-stat values and z-scores.
+        config (dict): The loaded configuration dictionary.
+
+    Returns:
+        StatMatrix: A matrix with shrunk z-scores and ranks.
+    """
+    settings = get_shrinkage_settings(config)
+    if not settings['enabled'] or not stat_matrix.stats:
+        return stat_matrix
+
+    strengths = prior_strengths(config, stat_matrix.stats)
+    shrunk_cols = np.flatnonzero(strengths > 0)
+    if not len(shrunk_cols):
+        return stat_matrix
+
+    games_played = stat_matrix.games_played
+    if games_played is None:
+        games_played = np.full(stat_matrix.zscores.shape, np.nan, order='F')
+    games_played = _fill_games_played(games_played, settings)
+
+    print("\n--- Applying Games-Played Shrinkage ---")
+    block = np.asfortranarray(stat_matrix.zscores[:, shrunk_cols])
+    shrunk = shrink_zscores(block, games_played[:, shrunk_cols], strengths[shrunk_cols])
+
+    zscores = stat_matrix.zscores.copy(order='F')
+    ranks = stat_matrix.ranks.copy(order='F')
+    zscores[:, shrunk_cols] = shrunk
+    ranks[:, shrunk_cols] = rank_descending(shrunk)
+    for j in shrunk_cols:
+        known = games_played[:, j][~np.isnan(games_played[:, j])]
+        if len(known):
+            print(f"    - '{stat_matrix.stats[j]}': prior {strengths[j]:g} games, median GP {np.median(known):g}.")
+        else:
+            print(f"    - WARNING: '{stat_matrix.stats[j]}' has no games played; left unshrunk.")
+
+    return StatMatrix(stat_matrix.teams, stat_matrix.stats, stat_matrix.values, zscores, ranks,
+                      stat_matrix.source_rows, stat_matrix.games_played)
+
+def shrinkage_history(config, start_date=None, end_date=None, store_dir=None):
+    """
+    Shrinks the stored z-scores of every snapshot in a date range at once.
+
+    Z-scores and games played for all dates are stacked into one
+    days x teams x stats array and shrunk in a single vectorized pass.
+
+    Returns:
+        pd.DataFrame: Date, team, stat, games_played, zscore, shrunk_zscore, rank
+        (rank of the shrunk z-score within the date).
+    """
+    import pandas as pd
+    from recency_zscores import snapshot_values
+    from snapshot_store import get_history_settings, list_snapshot_dates
+
+    columns = ['Date', 'team', 'stat', 'games_played', 'zscore', 'shrunk_zscore', 'rank']
+    store_dir = store_dir or get_history_settings(config)['store_dir']
+    dates = [d for d in list_snapshot_dates(store_dir)
+             if (not start_date or d >= start_date) and (not end_date or d <= end_date)]
+    if not dates:
+        return pd.DataFrame(columns=columns)
+
+    teams = sorted(config.get('canonical_teams', []))
+    stats = [s['name'] for p in config.get('providers', []) for f in p.get('files', []) for s in f.get('stats', [])]
+    zscores = np.stack([snapshot_values(d, store_dir, teams, stats, column='zscore') for d in dates])
+    games_played = np.stack([snapshot_values(d, store_dir, teams, stats, column='games_played') for d in dates])
+    games_played = _fill_games_played(games_played, get_shrinkage_settings(config))
+
+    shrunk = shrink_zscores(zscores, games_played, prior_strengths(config, stats))
+    ranks = np.stack([rank_descending(day) for day in shrunk])
+
+    n_days, n_teams, n_stats = shrunk.shape
+    history = pd.DataFrame({
+        'Date': np.repeat(np.asarray(dates, dtype=object), n_teams * n_stats),
+        'team': np.tile(np.repeat(np.asarray(teams, dtype=object), n_stats), n_days),
+        'stat': np.tile(np.asarray(stats, dtype=object), n_days * n_teams),
+        'games_played': games_played.ravel(order='C'),
+        'zscore': zscores.ravel(order='C'),
+        'shrunk_zscore': shrunk.ravel(order='C'),
+        'rank': ranks.ravel(order='C')
+    }, columns=columns)
+    return history[history['zscore'].notna()].reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply games-played shrinkage to every stored snapshot in a date range")
+    parser.add_argument('--start', type=str, default=None, help="First date (YYYYMMDD).")
+    parser.add_argument('--end', type=str, default=None, help="Last date (YYYYMMDD).")
+    parser.add_argument('--out', type=str, default='shrunk_zscores.csv', help="Output CSV path.")
+    args = parser.parse_args()
+
+    from calc_zscores_v2 import load_config
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    history = shrinkage_history(config, args.start, args.end)
+    if history.empty:
+        print("No stored snapshots in range. Run snapshot_store.py first.")
+        return
+    history.to_csv(args.out, index=False)
+    print(f"Wrote {len(history)} rows for {history['Date'].nunique()} dates to {args.out}")
+
+if __name__ == "__main__":
+    main()
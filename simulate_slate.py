@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+DISTRIBUTIONS = ('poisson', 'negative_binomial')
+
+DEFAULT_SIMULATION_SETTINGS = {
+    'sims': 100000,
+    'distribution': 'negative_binomial',
+    'goals_per_team': 3.05,
+    'shots_per_team': 29.0,
+    'home_ice': 0.04,
+    'goi_goal_coef': 0.20,
+    'pace_goal_coef': 0.10,
+    'goi_shot_coef': 0.08,
+    'pace_shot_coef': 0.06,
+    'goal_dispersion': 30.0,
+    'shot_dispersion': 60.0,
+    'overtime_home_win': 0.5,
+    'chunk_size': 25000,
+    'workers': 0,
+    'seed': 0
+}
+
+# Goal counts at or above this land in the last histogram bin
+MAX_GOALS = 20
+
+def get_simulation_settings(config):
+    """
+    Returns the 'simulation' block of the config merged over the defaults.
+    workers 0 means one per CPU.
+    """
+    settings = dict(DEFAULT_SIMULATION_SETTINGS)
+    settings.update((config or {}).get('simulation', {}) or {})
+    if settings['distribution'] not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown simulation distribution '{settings['distribution']}'. Use one of {DISTRIBUTIONS}.")
+    if not settings['workers']:
+        settings['workers'] = os.cpu_count() or 1
+    return settings
+
+def game_rates(goi_df, settings):
+    """
+    Expected goals and shots per side for every game.
+
+    Rates are log-linear in the GOI components: a side's rate is the league
+    rate times exp(coef_goi * side GOI + coef_pace * Game_Pace), plus the
+    home-ice term for the home side.
+
+    Returns:
+        np.ndarray: games x 4 array of (home goals, away goals, home shots,
+        away shots) means.
+    """
+    home_goi = goi_df['Home_GOI'].to_numpy(dtype=float)
+    away_goi = goi_df['Away_GOI'].to_numpy(dtype=float)
+    pace = goi_df['Game_Pace'].to_numpy(dtype=float)
+    home_ice = settings['home_ice']
+
+    return np.column_stack([
+        settings['goals_per_team'] * np.exp(home_ice + settings['goi_goal_coef'] * home_goi + settings['pace_goal_coef'] * pace),
+        settings['goals_per_team'] * np.exp(settings['goi_goal_coef'] * away_goi + settings['pace_goal_coef'] * pace),
+        settings['shots_per_team'] * np.exp(home_ice + settings['goi_shot_coef'] * home_goi + settings['pace_shot_coef'] * pace),
+        settings['shots_per_team'] * np.exp(settings['goi_shot_coef'] * away_goi + settings['pace_shot_coef'] * pace)
+    ])
+
+def _draw(rng, means, size, distribution, dispersion):
+    """
+    size draws per mean, as a len(means) x size array. The negative
+    binomial has variance mean + mean^2 / dispersion.
+    """
+    means = np.asarray(means, dtype=float)[:, np.newaxis]
+    if distribution == 'poisson':
+        return rng.poisson(means, size=(len(means), size))
+    return rng.negative_binomial(dispersion, dispersion / (dispersion + means), size=(len(means), size))
+
+def simulate_game(rates, sims, settings, seed_seq):
+    """
+    Simulates one game sims times in chunks of settings['chunk_size'].
+
+    Args:
+        rates (np.ndarray): (home goals, away goals, home shots, away shots) means.
+        sims (int): Number of simulations.
+        settings (dict): Simulation settings.
+        seed_seq (np.random.SeedSequence): The game's own seed, so results do
+            not depend on the worker count.
+
+    Returns:
+        dict: Histograms home_goals, away_goals and total_goals (bincounts,
+        last bin = MAX_GOALS or more), regulation ties, home wins, and shot
+        sums and sums of squares (home_shots, away_shots).
+    """
+    rng = np.random.default_rng(seed_seq)
+    distribution = settings['distribution']
+    goal_bins, total_bins = MAX_GOALS + 1, 2 * MAX_GOALS + 1
+    result = {
+        'home_goals': np.zeros(goal_bins, dtype=np.int64),
+        'away_goals': np.zeros(goal_bins, dtype=np.int64),
+        'total_goals': np.zeros(total_bins, dtype=np.int64),
+        'home_shots': np.zeros(2),
+        'away_shots': np.zeros(2),
+        'ties': 0,
+        'home_wins': 0
+    }
+
+    for start in range(0, sims, settings['chunk_size']):
+        size = min(settings['chunk_size'], sims - start)
+        home, away = _draw(rng, rates[:2], size, distribution, settings['goal_dispersion'])
+        home_shots, away_shots = _draw(rng, rates[2:], size, distribution, settings['shot_dispersion'])
+
+        result['home_goals'] += np.bincount(np.minimum(home, MAX_GOALS), minlength=goal_bins)
+        result['away_goals'] += np.bincount(np.minimum(away, MAX_GOALS), minlength=goal_bins)
+        result['total_goals'] += np.bincount(np.minimum(home + away, 2 * MAX_GOALS), minlength=total_bins)
+        for key, shots in (('home_shots', home_shots), ('away_shots', away_shots)):
+            result[key] += (shots.sum(), np.square(shots, dtype=float).sum())
+
+        # Regulation ties go to overtime / shootout
+        ties = int((home == away).sum())
+        result['ties'] += ties
+        result['home_wins'] += int((home > away).sum()) + int(rng.binomial(ties, settings['overtime_home_win']))
+    return result
+
+def _simulate_batch(args):
+    indices, rates, sims, settings, seeds = args
+    return indices, [simulate_game(rates[k], sims, settings, seeds[k]) for k in range(len(indices))]
+
+def _histogram_quantile(counts, q):
+    return int(np.searchsorted(np.cumsum(counts), q * counts.sum()))
+
+def summarize_simulations(goi_df, results, sims, totals_lines=(5.5, 6.5)):
+    """
+    One row per game: mean goals and shots per side, goal-total quantiles,
+    over probabilities and win probabilities.
+    """
+    import pandas as pd
+
+    goals = np.arange(MAX_GOALS + 1)
+    totals = np.arange(2 * MAX_GOALS + 1)
+    rows = []
+    for (_, game), res in zip(goi_df.iterrows(), results):
+        row = {
+            'Date': game['Date'],
+            'Away': game['Away'],
+            'Home': game['Home'],
+            'Away_Goals': res['away_goals'] @ goals / sims,
+            'Home_Goals': res['home_goals'] @ goals / sims,
+            'Total_Goals': res['total_goals'] @ totals / sims,
+            'Total_Goals_P10': _histogram_quantile(res['total_goals'], 0.10),
+            'Total_Goals_P50': _histogram_quantile(res['total_goals'], 0.50),
+            'Total_Goals_P90': _histogram_quantile(res['total_goals'], 0.90)
+        }
+        for line in totals_lines:
+            row[f'Over_{line:g}'] = res['total_goals'][totals > line].sum() / sims
+        for side in ('Away', 'Home'):
+            total, squares = res[f'{side.lower()}_shots']
+            row[f'{side}_Shots'] = total / sims
+            row[f'{side}_Shots_SD'] = np.sqrt(max(squares / sims - (total / sims) ** 2, 0.0))
+        row['Home_Win_Prob'] = res['home_wins'] / sims
+        row['Away_Win_Prob'] = 1 - row['Home_Win_Prob']
+        row['Overtime_Prob'] = res['ties'] / sims
+        rows.append(row)
+
+    summary = pd.DataFrame(rows)
+    float_cols = summary.columns[summary.dtypes == float]
+    summary[float_cols] = summary[float_cols].round(4)
+    return summary
+
+def simulate_slate(goi_df, config, sims=None, workers=None, seed=None):
+    """
+    Monte Carlo goals, shots and results for every game in a slate.
+
+    Games are split into one batch per worker and simulated in a process
+    pool; each game draws from its own child of the seed, so results are
+    the same for any worker count.
+
+    Args:
+        goi_df (pd.DataFrame): GOI rows (Date, Home, Away, Home_GOI,
+            Away_GOI, Game_Pace), e.g. one date from the GOI store.
+        config (dict): The configuration dictionary ('simulation' block).
+        sims, workers, seed: Override the configured values.
+
+    Returns:
+        tuple: (summary DataFrame, per-game raw results from simulate_game).
+    """
+    settings = get_simulation_settings(config)
+    sims = int(sims or settings['sims'])
+    workers = int(workers or settings['workers'])
+    seed = settings['seed'] if seed is None else seed
+
+    goi_df = goi_df.dropna(subset=['Home_GOI', 'Away_GOI', 'Game_Pace']).reset_index(drop=True)
+    rates = game_rates(goi_df, settings)
+    seeds = np.random.SeedSequence(seed).spawn(len(goi_df))
+
+    batches = [b for b in np.array_split(np.arange(len(goi_df)), min(workers, len(goi_df)) or 1) if len(b)]
+    batch_args = [(b, rates[b], sims, settings, [seeds[i] for i in b]) for b in batches]
+
+    started = time.perf_counter()
+    if workers <= 1 or len(batches) <= 1:
+        outputs = [_simulate_batch(a) for a in batch_args]
+    else:
+        with ProcessPoolExecutor(max_workers=len(batches)) as executor:
+            outputs = list(executor.map(_simulate_batch, batch_args))
+
+    results = [None] * len(goi_df)
+    for indices, batch_results in outputs:
+        for i, res in zip(indices, batch_results):
+            results[i] = res
+    print(f"  -> Simulated {len(goi_df)} games x {sims} runs ({settings['distribution']}) on {len(batches)} worker(s) in {time.perf_counter() - started:.2f}s.")
+    return summarize_simulations(goi_df, results, sims), results
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo goals, shots and win probabilities for a slate from its GOI")
+    parser.add_argument('--date', type=str, required=True, help="Slate date (YYYY-MM-DD).")
+    parser.add_argument('--sims', type=int, default=None, help="Simulations per game. Defaults to simulation.sims in config_v2.yaml.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes. Defaults to simulation.workers (0 = one per CPU).")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed. Defaults to simulation.seed.")
+    parser.add_argument('--out', type=str, default=None, help="Output CSV. Defaults to slate_simulation_<date>.csv.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+    from goi_store import load_goi_for_date
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    goi_df = load_goi_for_date(config, args.date)
+    if goi_df.empty:
+        print(f"No games found for {args.date}.")
+        return
+
+    print(f"--- Simulating {len(goi_df)} games on {args.date} ---")
+    summary, _ = simulate_slate(goi_df, config, args.sims, args.workers, args.seed)
+    display_cols = ['Away', 'Home', 'Away_Goals', 'Home_Goals', 'Total_Goals', 'Over_5.5', 'Away_Shots', 'Home_Shots', 'Home_Win_Prob']
+    with pd.option_context('display.width', 200):
+        print(summary[display_cols].to_string(index=False))
+
+    out = args.out or f'slate_simulation_{args.date}.csv'
+    summary.to_csv(out, index=False)
+    print(f"\nSaved simulation summary to {out}")
+
+if __name__ == "__main__":
+    main()
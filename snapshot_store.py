@@ -0,0 +1,296 @@
+import os
+import re
+import sys
+import json
+import argparse
+import pandas as pd
+import yaml
+from datetime import datetime
+from data_cache import get_cache_settings, write_frame, read_frame, file_sha256
+from workbook_reader import get_reader_settings
+from calc_zscores_v2 import ingest_files_by_file, get_ingestion_workers
+from zscore_matrix import stat_matrix_to_frames
+
+MANIFEST_FILENAME = 'manifest.json'
+
+DEFAULT_HISTORY_SETTINGS = {
+    'data_dir': '.',
+    'store_dir': 'snapshots'
+}
+
+SNAPSHOT_FILENAME_RE = re.compile(r'^(\d{8})_(.+)$')
+
+def get_history_settings(config):
+    """
+    Resolves the 'history' block of the config to absolute directories.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+
+    Returns:
+        dict: {'data_dir': str, 'store_dir': str}
+    """
+    settings = dict(DEFAULT_HISTORY_SETTINGS)
+    settings.update((config or {}).get('history', {}) or {})
+    for key in ('data_dir', 'store_dir'):
+        if not os.path.isabs(settings[key]):
+            settings[key] = os.path.normpath(os.path.join(os.path.dirname(__file__), settings[key]))
+    return settings
+
+def slugify(name):
+    """
+    Turns a provider or stat name into a filesystem-safe partition name,
+    e.g. 'CF%' -> 'CF_pct', 'Pen Drawn/60' -> 'Pen_Drawn_60'.
+    """
+    slug = str(name).replace('%', '_pct')
+    slug = re.sub(r'[^A-Za-z0-9.\-]+', '_', slug)
+    return slug.strip('_') or '_'
+
+def load_manifest(store_dir):
+    """
+    Loads the store index: {date: {provider: {file type: entry}}}.
+    """
+    path = os.path.join(store_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('snapshots', {})
+
+def save_manifest(store_dir, manifest):
+    """
+    Atomically writes the store index.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, MANIFEST_FILENAME)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'snapshots': dict(sorted(manifest.items()))}, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def scan_snapshot_files(config, data_dir, start_date=None, end_date=None):
+    """
+    Finds every <YYYYMMDD>_<filename_template> file in data_dir within a date range.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+        data_dir (str): Directory to scan.
+        start_date (str): First date (YYYYMMDD, inclusive), or None for no bound.
+        end_date (str): Last date (YYYYMMDD, inclusive), or None for no bound.
+
+    Returns:
+        dict: {date: [file metadata objects]} in config order per date.
+    """
+    templates = {}
+    for provider in config.get('providers', []):
+        for file_info in provider.get('files', []):
+            if file_info.get('filename_template'):
+                templates[file_info['filename_template']] = (provider.get('name'), file_info)
+
+    found = {}
+    for filename in sorted(os.listdir(data_dir)):
+        match = SNAPSHOT_FILENAME_RE.match(filename)
+        if not match or match.group(2) not in templates:
+            continue
+        date_str = match.group(1)
+        if (start_date and date_str < start_date) or (end_date and date_str > end_date):
+            continue
+        provider_name, file_info = templates[match.group(2)]
+        found.setdefault(date_str, []).append({
+            'provider_name': provider_name,
+            'file_path': os.path.join(data_dir, filename),
+            'file_info': file_info
+        })
+
+    # Keep config order within a date so stored results are deterministic
+    template_order = list(templates)
+    for files in found.values():
+        files.sort(key=lambda f: template_order.index(f['file_info']['filename_template']))
+    return dict(sorted(found.items()))
+
+def file_config_signature(config, file_info):
+    """
+    Hash of everything in the config that shapes one file's stored
+    snapshot: the file block (stats, columns, header row) and the team
+    name settings.
+    """
+    import hashlib
+
+    payload = json.dumps({
+        'file_info': file_info,
+        'team_name_mappings': config.get('team_name_mappings', []),
+        'canonical_teams': config.get('canonical_teams', [])
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def ingest_history(config, start_date=None, end_date=None, data_dir=None, store_dir=None, force=False):
+    """
+    Ingests every snapshot in a date range that is not stored yet, or whose
+    stored copy is stale: the file's content changed (e.g. a corrected
+    same-day re-download) or its stats config changed.
+
+    Each provider file is parsed once with the normal Step 1 processors; its
+    per-stat z-score frames are written to
+    <store_dir>/<YYYYMMDD>/<provider>/<stat>.parquet and indexed in the manifest.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+        start_date (str): First date (YYYYMMDD), or None for no bound.
+        end_date (str): Last date (YYYYMMDD), or None for no bound.
+        data_dir (str): Directory to scan. Defaults to history.data_dir.
+        store_dir (str): Store location. Defaults to history.store_dir.
+        force (bool): Re-ingest every file, even if its stored copy is current.
+
+    Returns:
+        list: The dates that received new data.
+    """
+    settings = get_history_settings(config)
+    data_dir = data_dir or settings['data_dir']
+    store_dir = store_dir or settings['store_dir']
+
+    print(f"--- Scanning {data_dir} for snapshots ---")
+    snapshots = scan_snapshot_files(config, data_dir, start_date, end_date)
+    manifest = load_manifest(store_dir)
+
+    pending = []
+    stale = 0
+    for date_str, files in snapshots.items():
+        for file_to_process in files:
+            entry = manifest.get(date_str, {}).get(file_to_process['provider_name'], {}).get(file_to_process['file_info'].get('type'))
+            file_to_process['sha256'] = file_sha256(file_to_process['file_path'])
+            file_to_process['config_signature'] = file_config_signature(config, file_to_process['file_info'])
+            current = (entry is not None and entry.get('sha256') == file_to_process['sha256']
+                       and entry.get('config_signature') == file_to_process['config_signature'])
+            if force or not current:
+                pending.append((date_str, file_to_process))
+                stale += entry is not None and not current
+
+    print(f"  -> Found {sum(len(f) for f in snapshots.values())} files across {len(snapshots)} dates; "
+          f"{len(pending)} to ingest ({stale} stored copies out of date).")
+    if not pending:
+        return []
+
+    canonical_teams = set(config.get('canonical_teams', []))
+    team_name_mappings = config.get('team_name_mappings', [])
+    results = ingest_files_by_file(
+        [file_to_process for _, file_to_process in pending],
+        canonical_teams,
+        team_name_mappings,
+        get_cache_settings(config),
+        get_reader_settings(config),
+        get_ingestion_workers(config)
+    )
+
+    updated_dates = []
+    for (date_str, file_to_process), stat_matrix in zip(pending, results):
+        if stat_matrix is None or not stat_matrix.stats:
+            print(f"  -> WARNING: {os.path.basename(file_to_process['file_path'])} produced no data. Not stored.")
+            continue
+
+        provider_name = file_to_process['provider_name']
+        file_type = file_to_process['file_info'].get('type')
+        provider_dir = os.path.join(store_dir, date_str, slugify(provider_name))
+
+        stat_paths = {}
+        for stat_df in stat_matrix_to_frames(stat_matrix):
+            stat_name = stat_df['stat'].iloc[0]
+            written_path = write_frame(stat_df, os.path.join(provider_dir, slugify(stat_name)))
+            stat_paths[stat_name] = os.path.relpath(written_path, store_dir).replace(os.sep, '/')
+
+        # Drop partitions of stats the file no longer produces (removed or renamed)
+        previous = manifest.get(date_str, {}).get(provider_name, {}).get(file_type, {})
+        for stat_name, rel_path in previous.get('stats', {}).items():
+            if stat_paths.get(stat_name) != rel_path:
+                try:
+                    os.remove(os.path.join(store_dir, rel_path))
+                except OSError:
+                    pass
+
+        manifest.setdefault(date_str, {}).setdefault(provider_name, {})[file_type] = {
+            'source': os.path.basename(file_to_process['file_path']),
+            'sha256': file_to_process['sha256'],
+            'config_signature': file_to_process['config_signature'],
+            'stats': stat_paths
+        }
+        if date_str not in updated_dates:
+            updated_dates.append(date_str)
+
+    save_manifest(store_dir, manifest)
+    print(f"  -> Stored snapshots for {len(updated_dates)} dates in {store_dir}.")
+    return updated_dates
+
+def list_snapshot_dates(store_dir):
+    """
+    Returns the sorted list of stored snapshot dates (YYYYMMDD).
+    """
+    return sorted(load_manifest(store_dir))
+
+def load_snapshot(date_str, store_dir, stats=None, providers=None):
+    """
+    Loads one day's per-stat z-scores from the store.
+
+    Only the partitions for the requested providers and stats are read.
+
+    Args:
+        date_str (str): Snapshot date (YYYYMMDD).
+        store_dir (str): Store location.
+        stats (list): Stat names to load, or None for all.
+        providers (list): Provider names to load, or None for all.
+
+    Returns:
+        pd.DataFrame: Columns Date, team, stat, value, zscore, rank (plus
+        games_played for files that report it), in config order. Empty if
+        the date is not stored.
+    """
+    day = load_manifest(store_dir).get(date_str, {})
+    frames = []
+    for provider_name, files in day.items():
+        if providers and provider_name not in providers:
+            continue
+        for entry in files.values():
+            for stat_name, rel_path in entry['stats'].items():
+                if stats and stat_name not in stats:
+                    continue
+                frames.append(read_frame(os.path.join(store_dir, rel_path)))
+
+    if not frames:
+        return pd.DataFrame(columns=['Date', 'team', 'stat', 'value', 'zscore', 'rank'])
+
+    snapshot = pd.concat(frames, ignore_index=True)
+    snapshot.insert(0, 'Date', date_str)
+    return snapshot
+
+def main():
+    """
+    Command-line entry point: ingest a date range, or show a stored day.
+    """
+    parser = argparse.ArgumentParser(description="Ingest historical provider snapshots into the snapshot store")
+    parser.add_argument('--start', type=str, default=None, help="First date to ingest (YYYYMMDD). Defaults to the earliest file found.")
+    parser.add_argument('--end', type=str, default=None, help="Last date to ingest (YYYYMMDD). Defaults to today.")
+    parser.add_argument('--data-dir', type=str, default=None, help="Directory to scan. Defaults to history.data_dir in config_v2.yaml.")
+    parser.add_argument('--force', action='store_true', help="Re-ingest every file, even if its stored copy matches the current file and config.")
+    parser.add_argument('--show', type=str, default=None, help="Print the stored z-scores for one date (YYYYMMDD) instead of ingesting.")
+    args = parser.parse_args()
+
+    config_path = os.path.join(os.path.dirname(__file__), 'config_v2.yaml')
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+    except FileNotFoundError:
+        print(f"ERROR: Configuration file not found at {config_path}")
+        sys.exit(1)
+
+    store_dir = get_history_settings(config)['store_dir']
+
+    if args.show:
+        snapshot = load_snapshot(args.show, store_dir)
+        if snapshot.empty:
+            print(f"No snapshot stored for {args.show}. Stored dates: {list_snapshot_dates(store_dir)}")
+            return
+        print(snapshot.to_string(index=False))
+        return
+
+    end_date = args.end or datetime.now().strftime('%Y%m%d')
+    ingest_history(config, args.start, end_date, data_dir=args.data_dir, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import fnmatch
+import hashlib
+import pandas as pd
+
+CACHE_FILENAME = 'team_names.json'
+
+# fnmatch.fnmatch compares os.path.normcase'd names, so patterns ignore case
+# where normcase folds it (Windows) and are case-sensitive elsewhere
+_CASE_FLAGS = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+
+# Compiled matchers and loaded name caches, keyed on the rules signature
+_compiled_rules = {}
+_name_caches = {}
+
+def rules_signature(team_name_mappings):
+    """
+    Returns a stable hash of the mapping rules, used to key compiled
+    matchers and to invalidate the persistent name cache when rules change.
+    """
+    payload = json.dumps([[r['pattern'], r['replacement']] for r in team_name_mappings or []])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def compile_team_name_rules(team_name_mappings):
+    """
+    Compiles every fnmatch pattern once into a single alternation regex.
+
+    Alternatives are tried in rule order, so the first matching rule wins,
+    exactly as in the original per-rule fnmatch loop. Case is handled as
+    fnmatch.fnmatch does: ignored on Windows, significant elsewhere.
+
+    Args:
+        team_name_mappings (list): Rules with 'pattern' and 'replacement' keys.
+
+    Returns:
+        tuple: (compiled regex or None, list of rules by group name)
+    """
+    signature = rules_signature(team_name_mappings)
+    if signature in _compiled_rules:
+        return _compiled_rules[signature]
+
+    rules = list(team_name_mappings or [])
+    if rules:
+        # Outer named groups identify the rule; fnmatch.translate only adds
+        # uniquely numbered inner groups, so the names cannot collide.
+        parts = [f"(?P<rule{i}>{fnmatch.translate(rule['pattern'])})" for i, rule in enumerate(rules)]
+        matcher = re.compile('|'.join(parts), _CASE_FLAGS)
+    else:
+        matcher = None
+
+    _compiled_rules[signature] = (matcher, rules)
+    return _compiled_rules[signature]
+
+def _cache_path(cache_settings):
+    if not cache_settings or not cache_settings.get('enabled', True):
+        return None
+    return os.path.join(cache_settings['dir'], CACHE_FILENAME)
+
+def _load_name_cache(signature, cache_settings):
+    """
+    Returns the raw-name -> [canonical, pattern] cache for this rule set.
+    """
+    if signature in _name_caches:
+        return _name_caches[signature]
+
+    names = {}
+    path = _cache_path(cache_settings)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('rules_signature') == signature:
+                names = stored.get('names', {})
+        except (OSError, ValueError) as e:
+            print(f"  -> WARNING: Ignoring unreadable team name cache: {e}")
+
+    _name_caches[signature] = names
+    return names
+
+def _save_name_cache(signature, names, cache_settings):
+    path = _cache_path(cache_settings)
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'rules_signature': signature, 'names': names}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  -> WARNING: Could not write team name cache: {e}")
+
+def resolve_team_name(raw_name, matcher, rules):
+    """
+    Canonicalizes a single raw name: first matching mapping rule, then
+    unidecode and whitespace stripping.
+
+    Returns:
+        tuple: (canonical name, matched pattern or None)
+    """
+    from unidecode import unidecode as ud
+
+    name = str(raw_name)
+    pattern = None
+    match = matcher.fullmatch(name) if matcher is not None else None
+    if match:
+        # The first outer group that participated is the first rule that matched
+        for i, rule in enumerate(rules):
+            if match.group(f"rule{i}") is not None:
+                name = rule['replacement']
+                pattern = rule['pattern']
+                break
+    return ud(str(name)).strip(), pattern
+
+def canonicalize_teams(teams, team_name_mappings, cache_settings=None):
+    """
+    Canonicalizes a whole 'Team' column in one vectorized pass.
+
+    Only distinct raw names not yet in the persistent cache are resolved;
+    the column itself is then rewritten with a single map.
+
+    Args:
+        teams (pd.Series): Raw team names.
+        team_name_mappings (list): Pattern-based mapping rules from the config.
+        cache_settings (dict): Cache settings, or None for an in-memory cache only.
+
+    Returns:
+        tuple: (canonical pd.Series, {raw name: (canonical, pattern)} for names a rule mapped)
+    """
+    signature = rules_signature(team_name_mappings)
+    matcher, rules = compile_team_name_rules(team_name_mappings)
+    names = _load_name_cache(signature, cache_settings)
+
+    unique_names = [name for name in pd.unique(teams) if pd.notnull(name)]
+    new_entries = False
+    for raw_name in unique_names:
+        key = str(raw_name)
+        if key not in names:
+            names[key] = list(resolve_team_name(raw_name, matcher, rules))
+            new_entries = True
+    if new_entries:
+        _save_name_cache(signature, names, cache_settings)
+
+    lookup = {raw_name: names[str(raw_name)][0] for raw_name in unique_names}
+    mapped = {str(raw_name): tuple(names[str(raw_name)]) for raw_name in unique_names if names[str(raw_name)][1]}
+    return teams.map(lookup), mapped
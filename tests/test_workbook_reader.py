@@ -0,0 +1,61 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workbook_reader import read_workbook_columns, read_provider_workbook
+
+openpyxl = pytest.importorskip('openpyxl')
+
+HEADER = ['Team', 'GP', 'CF%', 'SH%', 'Notes']
+ROWS = [
+    ['Anaheim Ducks', 10, 48.5, 'N/A', 'x'],
+    ['Boston Bruins', 11, None, 9.1, None],
+    ['Buffalo Sabres', 'NA', 51.0, '', 'y'],
+    [None, None, None, None, None],
+    ['Calgary Flames', 12, '#N/A', 8.4, 'null'],
+    ['Carolina Hurricanes', 9, 50.25, 'n/a', 'z'],
+]
+
+def _write_workbook(path, rows, header_rows=0):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for _ in range(header_rows):
+        sheet.append(['Report'])
+    sheet.append(HEADER)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+def test_projected_reader_matches_read_excel_na_handling(tmp_path):
+    path = str(tmp_path / 'stats.xlsx')
+    _write_workbook(path, ROWS)
+
+    projected = read_workbook_columns(path, 0, ['GP', 'CF%', 'SH%', 'Notes'])
+    expected = pd.read_excel(path, header=0)[HEADER]
+
+    pd.testing.assert_frame_equal(projected, expected)
+    assert projected['SH%'].dtype == np.float64
+
+def test_projected_reader_honours_header_row(tmp_path):
+    path = str(tmp_path / 'stats.xlsx')
+    _write_workbook(path, ROWS, header_rows=1)
+
+    projected = read_workbook_columns(path, 1, ['CF%', 'SH%'])
+    expected = pd.read_excel(path, header=1)[['Team', 'CF%', 'SH%']]
+
+    pd.testing.assert_frame_equal(projected, expected)
+
+def test_provider_workbook_coerces_non_numeric_stats(tmp_path):
+    path = str(tmp_path / 'stats.xlsx')
+    _write_workbook(path, [['Anaheim Ducks', 10, '51.0*', 'N/A', 'x'], ['Boston Bruins', 11, 49.0, 9.1, 'y']])
+    file_info = {'stats': [{'name': 'CF%'}, {'name': 'SH%'}], 'games_played_column': 'GP'}
+
+    df = read_provider_workbook(path, file_info, reader_settings={'projected': True, 'memory_budget_mb': None})
+
+    assert list(df.columns) == ['Team', 'CF%', 'SH%', 'GP']
+    assert df['CF%'].dtype == np.float64 and np.isnan(df['CF%'][0]) and df['CF%'][1] == 49.0
+    assert df['SH%'].dtype == np.float64 and np.isnan(df['SH%'][0])
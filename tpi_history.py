@@ -0,0 +1,162 @@
+import os
+import sys
+import argparse
+import numpy as np
+from zscore_matrix import BUCKET_NAMES, build_weight_matrix, weighted_bucket_average
+
+TPI_HISTORY_COLUMNS = ['Date', 'Rank', 'team', 'TPI', 'offensive_creation', 'defensive_resistance', 'pace_drivers']
+
+def _history_zscores(config, dates, store_dir, teams, stats):
+    """
+    Stored z-scores of every date as one days x teams x stats array, with
+    recency weighting and shrinkage applied as build_z_overall would.
+    """
+    from recency_zscores import snapshot_values, recency_enabled, recency_history, get_recency_settings
+    from shrinkage import get_shrinkage_settings, prior_strengths, shrink_zscores
+
+    zscores = np.stack([snapshot_values(d, store_dir, teams, stats, column='zscore') for d in dates])
+
+    if recency_enabled(config):
+        # Rolling / EWM stats take their recency z-scores for the same date
+        recent_stats = [s for s, cfg in get_recency_settings(config).items() if cfg['mode'] != 'season' and s in stats]
+        recent = recency_history(config, dates[0], dates[-1], store_dir)
+        recent = recent[recent['stat'].isin(recent_stats)]
+        day = np.searchsorted(np.asarray(dates), recent['Date'].to_numpy(dtype=str))
+        row = np.searchsorted(np.asarray(teams), recent['team'].to_numpy(dtype=str))
+        col = recent['stat'].map({s: j for j, s in enumerate(stats)}).to_numpy(dtype=np.intp)
+        zscores[day, row, col] = recent['zscore'].to_numpy(dtype=float)
+
+    shrinkage_settings = get_shrinkage_settings(config)
+    if shrinkage_settings['enabled']:
+        games_played = np.stack([snapshot_values(d, store_dir, teams, stats, column='games_played') for d in dates])
+        if shrinkage_settings['default_games_played'] is not None:
+            games_played = np.where(np.isnan(games_played), float(shrinkage_settings['default_games_played']), games_played)
+        zscores = shrink_zscores(zscores, games_played, prior_strengths(config, stats))
+    return zscores
+
+def tpi_history(config, start_date=None, end_date=None, store_dir=None):
+    """
+    Point-in-time TPI rankings for every stored snapshot in a date range.
+
+    All dates are stacked into one days x teams x stats array and reduced to
+    bucket averages and TPI in a single vectorized pass, using the same
+    weights and rounding as create_tpi_rankings.
+
+    Args:
+        config (dict): The configuration dictionary.
+        start_date (str): First snapshot date (YYYYMMDD), or None.
+        end_date (str): Last snapshot date (YYYYMMDD), or None.
+        store_dir (str): Snapshot store. Defaults to history.store_dir.
+
+    Returns:
+        pd.DataFrame: Date (YYYYMMDD), Rank, team, TPI, offensive_creation,
+        defensive_resistance, pace_drivers; ranked within each date. Teams
+        with nothing stored on a date are left out of that date.
+    """
+    import pandas as pd
+    from snapshot_store import get_history_settings, list_snapshot_dates
+    from weight_scenarios import config_bucket_weights
+
+    store_dir = store_dir or get_history_settings(config)['store_dir']
+    dates = [d for d in list_snapshot_dates(store_dir)
+             if (not start_date or d >= start_date) and (not end_date or d <= end_date)]
+    if not dates:
+        return pd.DataFrame(columns=TPI_HISTORY_COLUMNS)
+
+    teams = sorted(config.get('canonical_teams', []))
+    stats = [s['name'] for p in config.get('providers', []) for f in p.get('files', []) for s in f.get('stats', [])]
+    zscores = _history_zscores(config, dates, store_dir, teams, stats)
+    n_days, n_teams, n_stats = zscores.shape
+
+    weights, membership = build_weight_matrix(stats, config)
+    buckets = weighted_bucket_average(zscores.reshape(n_days * n_teams, n_stats), weights, membership)
+    oc, dr, pace = (buckets[:, BUCKET_NAMES.index(b)] for b in ('offensive_creation', 'defensive_resistance', 'pace_drivers'))
+    bucket_weights = config_bucket_weights(config)
+    tpi = oc * bucket_weights[0] + dr * bucket_weights[1] + pace * bucket_weights[2]
+
+    history = pd.DataFrame({
+        'Date': np.repeat(np.asarray(dates, dtype=object), n_teams),
+        'team': np.tile(np.asarray(teams, dtype=object), n_days),
+        'TPI': tpi,
+        'offensive_creation': oc,
+        'defensive_resistance': dr,
+        'pace_drivers': pace
+    })
+    history = history[(~np.isnan(zscores)).any(axis=2).ravel()]
+    history = history.sort_values(['Date', 'TPI'], ascending=[True, False], kind='stable').reset_index(drop=True)
+    history.insert(1, 'Rank', history.groupby('Date').cumcount() + 1)
+    for col in ['TPI', 'offensive_creation', 'defensive_resistance', 'pace_drivers']:
+        history[col] = history[col].round(4)
+    print(f"  -> TPI history: {len(history)} team ratings over {len(dates)} snapshots ({dates[0]} - {dates[-1]}).")
+    return history[TPI_HISTORY_COLUMNS]
+
+def asof_tpi_join(schedule, history, columns=('defensive_resistance', 'pace_drivers')):
+    """
+    Attaches to every game both teams' TPI from the latest snapshot on or
+    before the game date.
+
+    A sorted merge (pd.merge_asof by team) over game and snapshot dates, so
+    each side of the schedule is joined in one pass.
+
+    Args:
+        schedule (pd.DataFrame): Games with Date (YYYY-MM-DD), Visitor and Home.
+        history (pd.DataFrame): Output of tpi_history.
+        columns (tuple): TPI columns to attach.
+
+    Returns:
+        pd.DataFrame: The schedule in its original order with home_<col>,
+        away_<col>, home_tpi_date and away_tpi_date (NaN/NaT where no
+        snapshot precedes the game).
+    """
+    import pandas as pd
+
+    games = schedule.reset_index(drop=True)
+    games['_order'] = np.arange(len(games))
+    games['_game_date'] = pd.to_datetime(games['Date'], errors='coerce')
+    undated = games[games['_game_date'].isna()]
+    games = games[games['_game_date'].notna()].sort_values('_game_date', kind='stable')
+
+    snapshots = history[['Date', 'team'] + list(columns)].copy()
+    snapshots['_snapshot_date'] = pd.to_datetime(snapshots['Date'].astype(str), format='%Y%m%d')
+    snapshots = snapshots.drop(columns='Date').sort_values('_snapshot_date', kind='stable')
+
+    for side, team_column in (('home', 'Home'), ('away', 'Visitor')):
+        right = snapshots.rename(columns={'team': team_column, '_snapshot_date': f'{side}_tpi_date',
+                                          **{c: f'{side}_{c}' for c in columns}})
+        games = pd.merge_asof(games, right, left_on='_game_date', right_on=f'{side}_tpi_date',
+                              by=team_column, direction='backward')
+
+    joined = pd.concat([games, undated], ignore_index=True).sort_values('_order', kind='stable')
+    return joined.drop(columns=['_order', '_game_date']).reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-time TPI for every stored snapshot, and GOI with each game joined to the TPI valid on game day")
+    parser.add_argument('--start', type=str, default=None, help="First snapshot date (YYYYMMDD).")
+    parser.add_argument('--end', type=str, default=None, help="Last snapshot date (YYYYMMDD).")
+    parser.add_argument('--out', type=str, default='tpi_history.csv', help="Output CSV for the TPI history.")
+    parser.add_argument('--goi', type=str, nargs='?', const='goi_rankings_asof.csv', default=None,
+                        help="Also write as-of GOI for every game in schedule.csv to this CSV.")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+    from calculate_goi import calculate_goi_asof, get_goi_settings, get_schedule_adjustments
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    history = tpi_history(config, args.start, args.end)
+    history.to_csv(args.out, index=False)
+    print(f"Wrote {len(history)} rows to {args.out}")
+
+    if args.goi:
+        schedule_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedule.csv')
+        schedule = pd.read_csv(schedule_path)
+        goi_df = calculate_goi_asof(schedule, history, get_goi_settings(config),
+                                    get_schedule_adjustments(config, schedule, schedule_path))
+        goi_df.to_csv(args.goi, index=False)
+        print(f"Wrote {len(goi_df)} games to {args.goi}")
+
+if __name__ == "__main__":
+    main()
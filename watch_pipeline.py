@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+import pandas as pd
+from data_cache import get_cache_settings, write_csv_atomic
+from workbook_reader import get_reader_settings
+from snapshot_store import SNAPSHOT_FILENAME_RE
+from calc_zscores_v2 import (
+    load_config, ingest_file, build_z_overall, create_team_totals,
+    create_tpi_rankings, TPI_OUTPUT_FILES
+)
+from calculate_goi import calculate_goi, get_goi_settings, get_schedule_adjustments
+from goi_store import get_goi_store_dir, write_goi_store
+from matchup_matrix import get_matchup_matrix
+
+DEFAULT_POLL_SECONDS = 5
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def find_latest_files(config, data_dir, as_of_date):
+    """
+    Picks the newest <YYYYMMDD>_<filename_template> file on or before
+    as_of_date for every configured provider file.
+
+    Args:
+        config (dict): The configuration dictionary.
+        data_dir (str): Directory holding the data files.
+        as_of_date (str): Latest date to consider (YYYYMMDD).
+
+    Returns:
+        dict: {filename_template: file metadata object}; templates with no file are missing.
+    """
+    templates = {}
+    for provider in config.get('providers', []):
+        for file_info in provider.get('files', []):
+            if file_info.get('filename_template'):
+                templates[file_info['filename_template']] = (provider.get('name'), file_info)
+
+    latest = {}
+    for filename in os.listdir(data_dir):
+        match = SNAPSHOT_FILENAME_RE.match(filename)
+        if not match or match.group(2) not in templates or match.group(1) > as_of_date:
+            continue
+        template = match.group(2)
+        if template not in latest or match.group(1) > latest[template][0]:
+            latest[template] = (match.group(1), filename)
+
+    files = {}
+    for template, (provider_name, file_info) in templates.items():
+        if template in latest:
+            files[template] = {
+                'provider_name': provider_name,
+                'file_path': os.path.join(data_dir, latest[template][1]),
+                'file_info': file_info
+            }
+    return files
+
+class PipelineWatcher:
+    """
+    Keeps parsed provider files, the schedule and the latest outputs warm in
+    memory, and recomputes only what a changed file affects.
+    """
+
+    def __init__(self, config, data_dir=None, output_dir=None):
+        self.config = config
+        self.data_dir = data_dir or os.path.dirname(os.path.abspath(__file__))
+        self.output_dir = output_dir or self.data_dir
+        self.canonical_teams = set(config.get('canonical_teams', []))
+        self.team_name_mappings = config.get('team_name_mappings', [])
+        self.cache_settings = get_cache_settings(config)
+        self.reader_settings = get_reader_settings(config)
+        self.template_order = [
+            f['filename_template'] for p in config.get('providers', []) for f in p.get('files', [])
+            if f.get('filename_template')
+        ]
+
+        # filename_template -> (file path, signature, StatMatrix)
+        self.file_state = {}
+        self.schedule = None
+        self.schedule_signature = None
+        self.tpi_rankings = None
+
+    def _refresh_files(self):
+        """
+        Re-ingests provider files that are new or changed since the last poll.
+
+        Returns:
+            list: The templates whose stats changed.
+        """
+        today_str = datetime.now().strftime('%Y%m%d')
+        changed = []
+        for template, file_to_process in find_latest_files(self.config, self.data_dir, today_str).items():
+            path = file_to_process['file_path']
+            try:
+                signature = _file_signature(path)
+            except OSError:
+                continue  # File vanished between listing and stat
+
+            previous = self.file_state.get(template)
+            if previous and previous[0] == path and previous[1] == signature:
+                continue
+
+            print(f"\n[{datetime.now():%H:%M:%S}] Detected {'new' if not previous else 'updated'} file: {os.path.basename(path)}")
+            stat_matrix = ingest_file(file_to_process, self.canonical_teams, self.team_name_mappings,
+                                      self.cache_settings, self.reader_settings)
+            if stat_matrix is None or not stat_matrix.stats:
+                print(f"  -> WARNING: {os.path.basename(path)} failed to process; keeping previous stats.")
+                continue
+            self.file_state[template] = (path, signature, stat_matrix)
+            changed.append(template)
+        return changed
+
+    def _refresh_schedule(self):
+        """
+        Reloads schedule.csv if it changed. Returns True if it did.
+        """
+        schedule_path = os.path.join(self.data_dir, 'schedule.csv')
+        if not os.path.exists(schedule_path):
+            return False
+        signature = _file_signature(schedule_path)
+        if signature == self.schedule_signature:
+            return False
+        self.schedule = pd.read_csv(schedule_path)
+        self.schedule_signature = signature
+        print(f"\n[{datetime.now():%H:%M:%S}] Loaded schedule: {len(self.schedule)} games")
+        return True
+
+    def _publish(self, name, df):
+        path = os.path.join(self.output_dir, name)
+        write_csv_atomic(df, path)
+        print(f"  -> Published {name} ({len(df)} rows)")
+
+    def poll(self):
+        """
+        Runs one watch cycle: recompute TPI if any provider file changed and
+        GOI if TPI or the schedule changed, then atomically publish outputs.
+
+        Returns:
+            bool: True if any output was published.
+        """
+        changed_files = self._refresh_files()
+        schedule_changed = self._refresh_schedule()
+
+        if changed_files:
+            missing = [t for t in self.template_order if t not in self.file_state]
+            if missing:
+                print(f"  -> Waiting for first drop of: {missing}")
+            else:
+                # Stat matrices of unchanged files are reused as-is
+                stat_matrices = [self.file_state[template][2] for template in self.template_order]
+                # Recency history runs up to the newest provider file's date, not the clock
+                date_str = max(SNAPSHOT_FILENAME_RE.match(os.path.basename(self.file_state[template][0])).group(1)
+                               for template in self.template_order)
+                z_overall_df = build_z_overall(stat_matrices, self.config, date_str)
+                team_totals = create_team_totals(z_overall_df, self.config)
+                self.tpi_rankings = create_tpi_rankings(z_overall_df, self.config)
+
+                self._publish(TPI_OUTPUT_FILES['zOverall'], z_overall_df)
+                self._publish(TPI_OUTPUT_FILES['team_total_zscores'], team_totals)
+                self._publish(TPI_OUTPUT_FILES['tpi_rankings'], self.tpi_rankings)
+
+        tpi_changed = bool(changed_files) and self.tpi_rankings is not None
+        if (tpi_changed or schedule_changed) and self.tpi_rankings is not None and self.schedule is not None:
+            goi_settings = get_goi_settings(self.config)
+            matrix = get_matchup_matrix(self.config, self.tpi_rankings, goi_settings)
+            goi_df = calculate_goi(self.tpi_rankings, self.schedule, goi_settings, matrix,
+                                   get_schedule_adjustments(self.config, self.schedule))
+            self._publish('goi_rankings.csv', goi_df)
+            write_goi_store(goi_df, get_goi_store_dir(self.config))
+            return True
+
+        return tpi_changed
+
+    def run(self, poll_seconds=DEFAULT_POLL_SECONDS):
+        """
+        Polls the data directory until interrupted.
+        """
+        print(f"--- Watching {self.data_dir} every {poll_seconds}s (Ctrl+C to stop) ---")
+        while True:
+            started = time.perf_counter()
+            if self.poll():
+                print(f"  -> Outputs updated in {time.perf_counter() - started:.2f}s")
+            time.sleep(poll_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch the data directory and recompute TPI and GOI as provider files land")
+    parser.add_argument('--interval', type=float, default=None, help="Seconds between polls. Defaults to watch.poll_seconds in config_v2.yaml.")
+    parser.add_argument('--data-dir', type=str, default=None, help="Directory to watch. Defaults to the script directory.")
+    parser.add_argument('--once', action='store_true', help="Run a single cycle and exit.")
+    args = parser.parse_args()
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    watcher = PipelineWatcher(config, data_dir=args.data_dir)
+    if args.once:
+        watcher.poll()
+        return
+
+    interval = args.interval or (config.get('watch', {}) or {}).get('poll_seconds', DEFAULT_POLL_SECONDS)
+    try:
+        watcher.run(interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+if __name__ == "__main__":
+    main()
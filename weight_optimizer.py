@@ -0,0 +1,449 @@
+import os
+import sys
+import copy
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from zscore_matrix import BUCKET_NAMES, build_weight_matrix
+from weight_scenarios import random_weight_scenarios
+
+DEFAULT_OPTIMIZER_SETTINGS = {
+    'candidates': 20000,
+    'folds': 5,
+    'chunk_size': 500,
+    'spread': 0.5,
+    'seed': 0,
+    'workers': 0,
+    'objective': 'combined'
+}
+
+# team_goals: each team's GOI vs the goals it scored
+# game_total: Total_Opportunity vs goals scored by both teams
+# goal_diff:  home TPI - away TPI vs home goal differential
+OBJECTIVES = ('team_goals', 'game_total', 'goal_diff')
+
+CHECKPOINT_FILENAME = 'weight_optimizer_checkpoint.npz'
+CHECKPOINT_SECONDS = 30
+
+def get_optimizer_settings(config):
+    """
+    Returns the 'optimizer' block of the config merged over the defaults.
+    """
+    settings = dict(DEFAULT_OPTIMIZER_SETTINGS)
+    settings.update((config or {}).get('optimizer', {}) or {})
+    if settings['objective'] not in OBJECTIVES + ('combined',):
+        raise ValueError(f"Unknown optimizer objective '{settings['objective']}'. Use one of {OBJECTIVES + ('combined',)}.")
+    if not settings['workers'] or settings['workers'] < 0:
+        settings['workers'] = os.cpu_count() or 1
+    return settings
+
+def load_game_outcomes(schedule):
+    """
+    Completed games from schedule.csv ('G' = visitor goals, 'G.1' = home goals).
+
+    Returns:
+        pd.DataFrame: Date (YYYYMMDD), Home, Away, home_goals, away_goals.
+    """
+    import pandas as pd
+
+    played = schedule.dropna(subset=['G', 'G.1'])
+    return pd.DataFrame({
+        'Date': pd.to_datetime(played['Date']).dt.strftime('%Y%m%d'),
+        'Home': played['Home'],
+        'Away': played['Visitor'],
+        'home_goals': played['G.1'].astype(float),
+        'away_goals': played['G'].astype(float)
+    }).reset_index(drop=True)
+
+def build_backtest(config, schedule, store_dir=None, folds=DEFAULT_OPTIMIZER_SETTINGS['folds']):
+    """
+    Pairs every completed game with both teams' stored z-scores as of the
+    game date (the latest snapshot on or before it), with recency weighting
+    and shrinkage applied as in tpi_history.
+
+    Snapshot dates are split into folds + 1 contiguous blocks; a game belongs
+    to the block of its snapshot.
+
+    Returns:
+        dict: stats, dates, home_z / away_z (games x stats, NaN as 0),
+        home_goals, away_goals, home_adjustment / away_adjustment (schedule
+        context GOI adjustments, 0 when disabled), block (per game) and
+        n_blocks.
+    """
+    from calculate_goi import get_schedule_adjustments
+    from snapshot_store import get_history_settings, list_snapshot_dates
+    from tpi_history import _history_zscores
+
+    store_dir = store_dir or get_history_settings(config)['store_dir']
+    dates = list_snapshot_dates(store_dir)
+    if len(dates) < 2:
+        raise ValueError(f"Need at least two stored snapshots for walk-forward validation; found {len(dates)}.")
+
+    teams = sorted(config.get('canonical_teams', []))
+    stats = [s['name'] for p in config.get('providers', []) for f in p.get('files', []) for s in f.get('stats', [])]
+    zscores = np.nan_to_num(_history_zscores(config, dates, store_dir, teams, stats), nan=0.0)
+
+    games = load_game_outcomes(schedule)
+    # Rest context needs the whole schedule; keep the completed games' rows
+    played = schedule[['G', 'G.1']].notna().all(axis=1).to_numpy()
+    adjustments = get_schedule_adjustments(config, schedule) or (np.zeros(len(schedule)), np.zeros(len(schedule)))
+    home_adjustment, away_adjustment = adjustments[0][played], adjustments[1][played]
+    row_of = {team: i for i, team in enumerate(teams)}
+    home_rows = games['Home'].map(row_of)
+    away_rows = games['Away'].map(row_of)
+    day = np.searchsorted(np.asarray(dates), games['Date'].to_numpy(dtype=str), side='right') - 1
+    keep = (day >= 0) & home_rows.notna().to_numpy() & away_rows.notna().to_numpy()
+    if not keep.any():
+        raise ValueError("No completed games fall on or after the first stored snapshot.")
+
+    day = day[keep]
+    home_rows = home_rows[keep].astype(int).to_numpy()
+    away_rows = away_rows[keep].astype(int).to_numpy()
+    n_blocks = min(folds + 1, len(dates))
+    block_of_day = np.zeros(len(dates), dtype=np.intp)
+    for b, days in enumerate(np.array_split(np.arange(len(dates)), n_blocks)):
+        block_of_day[days] = b
+
+    print(f"  -> Backtest: {int(keep.sum())} games over {len(dates)} snapshots ({dates[0]} - {dates[-1]}), {n_blocks} blocks.")
+    return {
+        'stats': stats,
+        'dates': dates,
+        'home_z': zscores[day, home_rows],
+        'away_z': zscores[day, away_rows],
+        'home_goals': games['home_goals'].to_numpy()[keep],
+        'away_goals': games['away_goals'].to_numpy()[keep],
+        'home_adjustment': home_adjustment[keep],
+        'away_adjustment': away_adjustment[keep],
+        'block': block_of_day[day],
+        'n_blocks': n_blocks
+    }
+
+def generate_candidates(config, stats, n_candidates, spread=0.5, seed=None):
+    """
+    Random candidates around the configured weights: stat and bucket weights
+    as in weight_scenarios.random_weight_scenarios, plus a GOI offense share
+    drawn uniformly with the configured offense + pace total kept.
+
+    Returns:
+        tuple: (stat_weights, bucket_weights, offense_weights, pace_weights).
+        Candidate 0 is the configured baseline.
+    """
+    from calculate_goi import get_goi_settings
+
+    stat_weights, bucket_weights = random_weight_scenarios(config, stats, n_candidates, spread, seed)
+    goi_settings = get_goi_settings(config)
+    blend_total = goi_settings['offense_weight'] + goi_settings['pace_weight']
+    # Separate stream so the blend does not shift the weight draws
+    offense_share = np.random.default_rng(None if seed is None else seed + 1).uniform(0.0, 1.0, n_candidates)
+    offense_weights = offense_share * blend_total
+    offense_weights[0] = goi_settings['offense_weight']
+    return stat_weights, bucket_weights, offense_weights, blend_total - offense_weights
+
+def _moments(pred, actual, onehot):
+    """
+    Per-block sufficient statistics for a Pearson correlation:
+    (n, sum x, sum y, sum xx, sum yy, sum xy), shape candidates x blocks x 6.
+    """
+    n = np.broadcast_to(onehot.sum(axis=0), (pred.shape[0], onehot.shape[1]))
+    sy = np.broadcast_to(actual @ onehot, n.shape)
+    syy = np.broadcast_to((actual * actual) @ onehot, n.shape)
+    return np.stack([n, pred @ onehot, sy, (pred * pred) @ onehot, syy, (pred * actual) @ onehot], axis=-1)
+
+def score_candidates(backtest, membership, stat_weights, bucket_weights, offense_weights, pace_weights):
+    """
+    Predictions of a chunk of candidates for every backtest game, reduced
+    to per-block correlation moments.
+
+    Bucket averages are linear in the z-scores, so a chunk is one einsum per
+    side: games x stats against candidates x stats x buckets.
+
+    Returns:
+        np.ndarray: candidates x objectives x blocks x 6 moments.
+    """
+    member = membership.astype(float)
+    totals = stat_weights @ member
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inverse = np.where(totals != 0, 1.0 / totals, 0.0)
+    normalized = stat_weights[:, :, np.newaxis] * member[np.newaxis] * inverse[:, np.newaxis, :]
+
+    home = np.einsum('gs,csb->cgb', backtest['home_z'], normalized)
+    away = np.einsum('gs,csb->cgb', backtest['away_z'], normalized)
+    dr, pace = BUCKET_NAMES.index('defensive_resistance'), BUCKET_NAMES.index('pace_drivers')
+
+    # Same formulas as calculate_goi (schedule adjustments included), for every candidate at once
+    game_pace = (home[..., pace] + away[..., pace]) / 2
+    home_goi = offense_weights[:, np.newaxis] * (away[..., dr] - home[..., dr]) + pace_weights[:, np.newaxis] * game_pace
+    away_goi = offense_weights[:, np.newaxis] * (home[..., dr] - away[..., dr]) + pace_weights[:, np.newaxis] * game_pace
+    home_goi = home_goi + backtest['home_adjustment']
+    away_goi = away_goi + backtest['away_adjustment']
+    tpi_diff = np.einsum('cgb,cb->cg', home - away, bucket_weights)
+
+    onehot = np.eye(backtest['n_blocks'])[backtest['block']]
+    home_goals, away_goals = backtest['home_goals'], backtest['away_goals']
+    return np.stack([
+        _moments(np.hstack([home_goi, away_goi]), np.concatenate([home_goals, away_goals]), np.vstack([onehot, onehot])),
+        _moments(home_goi + away_goi, home_goals + away_goals, onehot),
+        _moments(tpi_diff, home_goals - away_goals, onehot)
+    ], axis=1)
+
+def _correlation(moments):
+    n, sx, sy, sxx, syy, sxy = np.moveaxis(moments, -1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+    return np.where((var_x > 0) & (var_y > 0), corr, np.nan)
+
+def walk_forward_scores(moments, objective='combined'):
+    """
+    Expanding-window walk-forward validation: fold f trains on blocks 0..f
+    and validates on block f + 1.
+
+    Args:
+        moments (np.ndarray): candidates x objectives x blocks x 6.
+        objective (str): One of OBJECTIVES, or 'combined' for their mean.
+
+    Returns:
+        dict: train / validation correlations (candidates x folds), each
+        candidate's mean validation score, the candidate picked on each
+        fold's training window and the walk-forward estimate (mean validation
+        score of those picks).
+    """
+    cumulative = np.cumsum(moments, axis=2)
+    train = _correlation(cumulative[:, :, :-1])
+    validation = _correlation(moments[:, :, 1:])
+    if objective == 'combined':
+        train, validation = np.nanmean(train, axis=1), np.nanmean(validation, axis=1)
+    else:
+        k = OBJECTIVES.index(objective)
+        train, validation = train[:, k], validation[:, k]
+
+    picks = np.nanargmax(np.where(np.isnan(train), -np.inf, train), axis=0)
+    folds = np.arange(train.shape[1])
+    return {
+        'train': train,
+        'validation': validation,
+        'score': np.nanmean(validation, axis=1),
+        'picks': picks,
+        'walk_forward': float(np.nanmean(validation[picks, folds]))
+    }
+
+_WORKER_STATE = {}
+
+def _init_worker(backtest, membership):
+    _WORKER_STATE['backtest'] = backtest
+    _WORKER_STATE['membership'] = membership
+
+def _score_chunk(args):
+    chunk_id, stat_weights, bucket_weights, offense_weights, pace_weights = args
+    return chunk_id, score_candidates(_WORKER_STATE['backtest'], _WORKER_STATE['membership'],
+                                      stat_weights, bucket_weights, offense_weights, pace_weights)
+
+def _search_signature(backtest, candidates, settings):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([backtest['stats'], backtest['dates'], settings['folds'], settings['chunk_size']]).encode('utf-8'))
+    for array in (backtest['home_z'], backtest['away_z'], backtest['home_goals'], backtest['away_goals'],
+                  backtest['home_adjustment'], backtest['away_adjustment']) + tuple(candidates):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+def _save_checkpoint(path, signature, moments, done):
+    tmp_path = f"{path}.tmp{os.getpid()}.npz"
+    np.savez(tmp_path, signature=np.array(signature), moments=moments, done=done)
+    os.replace(tmp_path, path)
+
+def _load_checkpoint(path, signature, moments, done):
+    try:
+        with np.load(path) as saved:
+            if str(saved['signature']) != signature or saved['moments'].shape != moments.shape:
+                return False
+            moments[...] = saved['moments']
+            done[...] = saved['done']
+    except (OSError, ValueError, KeyError):
+        return False
+    return True
+
+def optimize_weights(config, schedule, store_dir=None, checkpoint_path=None, resume=True, **overrides):
+    """
+    Walk-forward random search over stat weights, bucket_weights and the
+    GOI offense / pace blend.
+
+    Candidate chunks are spread over a process pool. Finished chunks are
+    checkpointed, so an interrupted search resumes where it stopped when
+    re-run with the same snapshots, schedule and settings.
+
+    Args:
+        config (dict): The configuration dictionary.
+        schedule (pd.DataFrame): Schedule with results ('G', 'G.1').
+        store_dir (str): Snapshot store. Defaults to history.store_dir.
+        checkpoint_path (str): Defaults to the cache directory.
+        resume (bool): Pick up finished chunks from the checkpoint.
+        **overrides: Any key of the 'optimizer' config block.
+
+    Returns:
+        dict: The weights of the candidate that scores best on the last
+        training window, the walk-forward estimate and the baseline's mean
+        validation score (both out of sample), the held-out block scores of
+        the pick and the baseline, and beats_baseline (walk-forward estimate
+        above the baseline).
+    """
+    from data_cache import get_cache_settings
+
+    settings = get_optimizer_settings(config)
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+
+    print("\n--- Walk-Forward Weight Search ---")
+    backtest = build_backtest(config, schedule, store_dir, settings['folds'])
+    stats = backtest['stats']
+    _, membership = build_weight_matrix(stats, config)
+    candidates = generate_candidates(config, stats, int(settings['candidates']), settings['spread'], settings['seed'])
+    n_candidates = len(candidates[0])
+    chunk_size = max(1, int(settings['chunk_size']))
+    n_chunks = -(-n_candidates // chunk_size)
+
+    moments = np.zeros((n_candidates, len(OBJECTIVES), backtest['n_blocks'], 6))
+    done = np.zeros(n_chunks, dtype=bool)
+    checkpoint_path = checkpoint_path or os.path.join(get_cache_settings(config)['dir'], CHECKPOINT_FILENAME)
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+    signature = _search_signature(backtest, candidates, settings)
+    if resume and _load_checkpoint(checkpoint_path, signature, moments, done):
+        print(f"  -> Resuming from checkpoint: {int(done.sum())}/{n_chunks} chunks already scored.")
+
+    def chunk_args(chunk_id):
+        window = slice(chunk_id * chunk_size, min((chunk_id + 1) * chunk_size, n_candidates))
+        return (chunk_id,) + tuple(c[window] for c in candidates)
+
+    def record(chunk_id, chunk_moments):
+        moments[chunk_id * chunk_size:chunk_id * chunk_size + len(chunk_moments)] = chunk_moments
+        done[chunk_id] = True
+
+    pending = [c for c in range(n_chunks) if not done[c]]
+    workers = max(1, min(int(settings['workers']), len(pending)))
+    print(f"  -> Scoring {n_candidates} candidates in {n_chunks} chunks with {workers} worker process(es)...")
+    started = last_saved = time.perf_counter()
+    if workers == 1:
+        _init_worker(backtest, membership)
+        results = (_score_chunk(chunk_args(c)) for c in pending)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backtest, membership))
+        results = (future.result() for future in as_completed([executor.submit(_score_chunk, chunk_args(c)) for c in pending]))
+    try:
+        for finished, (chunk_id, chunk_moments) in enumerate(results, 1):
+            record(chunk_id, chunk_moments)
+            if time.perf_counter() - last_saved >= CHECKPOINT_SECONDS:
+                _save_checkpoint(checkpoint_path, signature, moments, done)
+                last_saved = time.perf_counter()
+                print(f"  -> {int(done.sum())}/{n_chunks} chunks scored ({time.perf_counter() - started:.0f}s).")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        _save_checkpoint(checkpoint_path, signature, moments, done)
+
+    scores = walk_forward_scores(moments, settings['objective'])
+    # Pick on the last training window (every block but the held-out tail), so
+    # the tail score is out of sample; averaging validation over all folds and
+    # taking the max would select on the data it reports
+    best = int(scores['picks'][-1])
+    holdout = scores['validation'][:, -1]
+    baseline_score = float(scores['score'][0])
+    beats_baseline = bool(scores['walk_forward'] > baseline_score)
+    stat_weights, bucket_weights, offense_weights, pace_weights = candidates
+    print(f"  -> Done in {time.perf_counter() - started:.1f}s. Objective: {settings['objective']}.")
+    print(f"  -> Walk-forward estimate (pick on train, score on next block): {scores['walk_forward']:.4f}; "
+          f"baseline: {baseline_score:.4f}.")
+    print(f"  -> Picked candidate {best} on blocks 0-{backtest['n_blocks'] - 2}; held-out block: "
+          f"{holdout[best]:.4f} (baseline {holdout[0]:.4f}).")
+    if not beats_baseline:
+        print("  -> WARNING: The search does not beat the configured weights out of sample. Keep the current weights.")
+    return {
+        'stats': stats,
+        'stat_weights': stat_weights[best],
+        'bucket_weights': bucket_weights[best],
+        'offense_weight': float(offense_weights[best]),
+        'pace_weight': float(pace_weights[best]),
+        'walk_forward': scores['walk_forward'],
+        'baseline_score': baseline_score,
+        'holdout_score': float(holdout[best]),
+        'baseline_holdout_score': float(holdout[0]),
+        'beats_baseline': beats_baseline,
+        'candidate': best
+    }
+
+def weight_block(config, result, decimals=4):
+    """
+    The optimized weights as config_v2.yaml blocks: bucket_weights, goi and
+    providers (a copy of the configured providers with new stat weights).
+    """
+    weight_of = dict(zip(result['stats'], result['stat_weights']))
+    providers = copy.deepcopy(config.get('providers', []))
+    for provider in providers:
+        for file_info in provider.get('files', []):
+            for stat in file_info.get('stats', []):
+                if stat['name'] in weight_of:
+                    stat['weight'] = round(float(weight_of[stat['name']]), decimals)
+    return {
+        'bucket_weights': {b: round(float(w), decimals) for b, w in zip(BUCKET_NAMES, result['bucket_weights'])},
+        'goi': {
+            'offense_weight': round(result['offense_weight'], decimals),
+            'pace_weight': round(result['pace_weight'], decimals)
+        },
+        'providers': providers
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit stat weights, bucket_weights and the GOI blend against historical results")
+    parser.add_argument('--candidates', type=int, default=None, help="Number of random candidates (optimizer.candidates).")
+    parser.add_argument('--folds', type=int, default=None, help="Walk-forward folds (optimizer.folds).")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes; 0 = one per core (optimizer.workers).")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed (optimizer.seed).")
+    parser.add_argument('--objective', type=str, default=None, choices=OBJECTIVES + ('combined',), help="What to score candidates on (optimizer.objective).")
+    parser.add_argument('--schedule', type=str, default=None, help="Schedule with results. Defaults to schedule.csv next to this script.")
+    parser.add_argument('--fresh', action='store_true', help="Ignore any checkpoint and start over.")
+    parser.add_argument('--out', type=str, default='optimized_weights.yaml', help="Where to write the weight block.")
+    parser.add_argument('--force', action='store_true', help="Write the weight block even if it does not beat the configured weights.")
+    args = parser.parse_args()
+
+    import yaml
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    schedule_path = args.schedule or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedule.csv')
+    try:
+        schedule = pd.read_csv(schedule_path)
+    except FileNotFoundError:
+        print(f"ERROR: Schedule file not found at {schedule_path}")
+        sys.exit(1)
+
+    try:
+        result = optimize_weights(config, schedule, resume=not args.fresh, candidates=args.candidates, folds=args.folds,
+                                  workers=args.workers, seed=args.seed, objective=args.objective)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    if not result['beats_baseline'] and not args.force:
+        print(f"\nNot writing {args.out}: walk-forward estimate {result['walk_forward']:.4f} does not beat "
+              f"the configured weights ({result['baseline_score']:.4f}). Use --force to write it anyway.")
+        return
+
+    with open(args.out, 'w') as f:
+        f.write(f"# Walk-forward weight search: walk-forward estimate {result['walk_forward']:.4f} "
+                f"(baseline {result['baseline_score']:.4f}); held-out block {result['holdout_score']:.4f} "
+                f"(baseline {result['baseline_holdout_score']:.4f}).\n")
+        if not result['beats_baseline']:
+            f.write("# WARNING: does not beat the configured weights out of sample.\n")
+        f.write("# Paste these blocks over the matching ones in config_v2.yaml.\n")
+        yaml.safe_dump(weight_block(config, result), f, sort_keys=False, allow_unicode=True)
+    print(f"\nWrote weight block to {args.out}")
+
+if __name__ == "__main__":
+    main()
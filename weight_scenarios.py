@@ -0,0 +1,201 @@
+import sys
+import argparse
+import numpy as np
+from zscore_matrix import BUCKET_NAMES, build_weight_matrix
+
+DEFAULT_MEMORY_BUDGET_MB = 64
+
+def config_bucket_weights(config, bucket_names=BUCKET_NAMES):
+    """
+    The configured bucket_weights as a vector in bucket_names order.
+    """
+    defaults = {'offensive_creation': 0.4, 'defensive_resistance': 0.3, 'pace_drivers': 0.3}
+    bucket_weights = config.get('bucket_weights', defaults)
+    return np.array([float(bucket_weights.get(b, defaults.get(b, 0.0))) for b in bucket_names])
+
+def effective_stat_weights(stat_weights, bucket_weights, membership):
+    """
+    Folds bucket averaging and bucket weights into one weight per stat.
+
+    TPI = sum_b B[b] * sum_{i in b} z_i * w_i / sum_{i in b} w_i, so each
+    scenario is a single vector v with v_i = B[bucket(i)] * w_i / W[bucket(i)]
+    and TPI = Z @ v.
+
+    Args:
+        stat_weights (np.ndarray): scenarios x stats weights.
+        bucket_weights (np.ndarray): scenarios x buckets weights.
+        membership (np.ndarray): stats x buckets bucket membership.
+
+    Returns:
+        np.ndarray: scenarios x stats effective weights. A bucket whose stat
+        weights sum to 0 contributes nothing.
+    """
+    member = membership.astype(float)
+    bucket_totals = stat_weights @ member
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.where(bucket_totals != 0, bucket_weights / bucket_totals, 0.0)
+    return stat_weights * (scale @ member.T)
+
+def _as_scenarios(weights, default):
+    """
+    Returns weights (or the default vector) as a scenarios x len(default) array.
+    """
+    weights = np.atleast_2d(np.asarray(default if weights is None else weights, dtype=float))
+    if weights.shape[1] != len(default):
+        raise ValueError(f"Expected {len(default)} weights per scenario, got {weights.shape[1]}.")
+    return weights
+
+def iter_weight_scenarios(stat_matrix, config, stat_weights=None, bucket_weights=None,
+                          memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, bucket_names=BUCKET_NAMES):
+    """
+    Scores candidate weight vectors in chunks sized to a memory budget.
+
+    Args:
+        stat_matrix (StatMatrix): Per-stat z-scores (after recency/shrinkage).
+        config (dict): The configuration dictionary (bucket membership and
+            the baseline weights).
+        stat_weights (np.ndarray): scenarios x stats weights, in
+            stat_matrix.stats order. None uses the configured weights.
+        bucket_weights (np.ndarray): scenarios x buckets weights, in
+            bucket_names order. None uses the configured bucket_weights.
+        memory_budget_mb (float): Cap on the working arrays of one chunk.
+
+    Yields:
+        tuple: (start, tpi, ranks) where tpi and ranks are teams x chunk
+        arrays for scenarios start .. start + chunk - 1. Ranks are 1 = best,
+        ties broken by team name as in tpi_rankings.csv.
+    """
+    base_weights, membership = build_weight_matrix(stat_matrix.stats, config, bucket_names)
+    base_stat_weights = base_weights.sum(axis=1)
+    stat_weights = _as_scenarios(stat_weights, base_stat_weights)
+    bucket_weights = _as_scenarios(bucket_weights, config_bucket_weights(config, bucket_names))
+    n_scenarios = max(len(stat_weights), len(bucket_weights))
+    if min(len(stat_weights), len(bucket_weights)) not in (1, n_scenarios):
+        raise ValueError("stat_weights and bucket_weights have different scenario counts.")
+    # A single vector on either side is shared by every scenario
+    stat_weights = np.broadcast_to(stat_weights, (n_scenarios, stat_weights.shape[1]))
+    bucket_weights = np.broadcast_to(bucket_weights, (n_scenarios, bucket_weights.shape[1]))
+
+    # Missing z-scores count as 0, as in the bucket averages
+    zscores = np.nan_to_num(stat_matrix.zscores, nan=0.0)
+    n_teams, n_stats = zscores.shape
+
+    # Per scenario: its weight vector, TPI and rank columns, plus the sort scratch
+    bytes_per_scenario = 8 * (2 * n_stats + 4 * n_teams)
+    chunk = max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_scenario))
+    team_positions = np.arange(1, n_teams + 1, dtype=float)[:, np.newaxis]
+
+    for start in range(0, n_scenarios, chunk):
+        stop = min(start + chunk, n_scenarios)
+        weights = effective_stat_weights(stat_weights[start:stop], bucket_weights[start:stop], membership)
+        tpi = zscores @ weights.T
+        order = np.argsort(-tpi, axis=0, kind='stable')
+        ranks = np.empty_like(tpi)
+        np.put_along_axis(ranks, order, team_positions, axis=0)
+        yield start, tpi, ranks
+
+def evaluate_weight_scenarios(stat_matrix, config, stat_weights=None, bucket_weights=None,
+                              memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, bucket_names=BUCKET_NAMES):
+    """
+    TPI and ranks for every candidate weight vector at once.
+
+    See iter_weight_scenarios for the arguments; use it directly to stream
+    results when teams x scenarios does not fit in memory.
+
+    Returns:
+        tuple: (tpi, ranks), each a teams x scenarios array with rows in
+        stat_matrix.teams order.
+    """
+    tpi_chunks, rank_chunks = [], []
+    for _, tpi, ranks in iter_weight_scenarios(stat_matrix, config, stat_weights, bucket_weights,
+                                               memory_budget_mb, bucket_names):
+        tpi_chunks.append(tpi)
+        rank_chunks.append(ranks)
+    return np.hstack(tpi_chunks), np.hstack(rank_chunks)
+
+def stat_matrix_from_z_overall(z_overall_df):
+    """
+    Rebuilds the per-stat z-score matrix from a zOverall DataFrame (bucket
+    rows are dropped), so scenarios can be scored from zOverall.csv alone.
+    """
+    from zscore_matrix import StatMatrix
+
+    stat_rows = z_overall_df[~z_overall_df['stat'].str.endswith('_avg')]
+    stats = list(dict.fromkeys(stat_rows['stat']))
+    wide = stat_rows.pivot_table(index='team', columns='stat', values='zscore', aggfunc='first')[stats]
+    values = stat_rows.pivot_table(index='team', columns='stat', values='value', aggfunc='first')[stats]
+    zscores = np.asfortranarray(wide.to_numpy(dtype=float))
+    all_rows = np.arange(len(wide), dtype=np.intp)
+    return StatMatrix(wide.index.tolist(), stats, np.asfortranarray(values.to_numpy(dtype=float)), zscores,
+                      np.full(zscores.shape, np.nan, order='F'), [all_rows] * len(stats))
+
+def random_weight_scenarios(config, stats, n_scenarios, spread=0.5, seed=None, bucket_names=BUCKET_NAMES):
+    """
+    Random candidates around the configured weights: each stat weight is
+    scaled by a log-normal factor and bucket weights are drawn from a
+    Dirichlet centred on the configured split.
+
+    Returns:
+        tuple: (stat_weights, bucket_weights) as scenarios x stats and
+        scenarios x buckets arrays. Scenario 0 is the configured baseline.
+    """
+    rng = np.random.default_rng(seed)
+    base_weights, _ = build_weight_matrix(stats, config, bucket_names)
+    base_stat_weights = base_weights.sum(axis=1)
+    base_bucket_weights = config_bucket_weights(config, bucket_names)
+
+    stat_weights = base_stat_weights * rng.lognormal(0.0, spread, size=(n_scenarios, len(stats)))
+    concentration = np.maximum(base_bucket_weights / base_bucket_weights.sum(), 1e-3) / (spread ** 2)
+    bucket_weights = rng.dirichlet(concentration, size=n_scenarios) * base_bucket_weights.sum()
+    stat_weights[0], bucket_weights[0] = base_stat_weights, base_bucket_weights
+    return stat_weights, bucket_weights
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many candidate weight vectors against today's zOverall.csv")
+    parser.add_argument('--scenarios', type=str, default=None, help="CSV with one candidate per row; columns are bucket names and/or stat names (missing columns keep the configured weight).")
+    parser.add_argument('--random', type=int, default=0, help="Score N random candidates around the configured weights instead.")
+    parser.add_argument('--spread', type=float, default=0.5, help="Log-normal sigma for --random.")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for --random.")
+    parser.add_argument('--z-overall', type=str, default='zOverall.csv', help="zOverall CSV to score.")
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_BUDGET_MB, help="Memory budget per chunk.")
+    parser.add_argument('--out', type=str, default='weight_scenarios.csv', help="Output CSV (scenario, team, TPI, Rank).")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from calc_zscores_v2 import load_config
+
+    config = load_config()
+    if config is None:
+        sys.exit(1)
+
+    stat_matrix = stat_matrix_from_z_overall(pd.read_csv(args.z_overall))
+    base_weights, _ = build_weight_matrix(stat_matrix.stats, config)
+    if args.scenarios:
+        candidates = pd.read_csv(args.scenarios)
+        stat_weights = np.tile(base_weights.sum(axis=1), (len(candidates), 1))
+        bucket_weights = np.tile(config_bucket_weights(config), (len(candidates), 1))
+        for j, stat_name in enumerate(stat_matrix.stats):
+            if stat_name in candidates.columns:
+                stat_weights[:, j] = candidates[stat_name].to_numpy(dtype=float)
+        for b, bucket_name in enumerate(BUCKET_NAMES):
+            if bucket_name in candidates.columns:
+                bucket_weights[:, b] = candidates[bucket_name].to_numpy(dtype=float)
+    elif args.random:
+        stat_weights, bucket_weights = random_weight_scenarios(config, stat_matrix.stats, args.random, args.spread, args.seed)
+    else:
+        print("Nothing to score: pass --scenarios or --random.")
+        return
+
+    tpi, ranks = evaluate_weight_scenarios(stat_matrix, config, stat_weights, bucket_weights, args.memory_mb)
+    n_teams, n_scenarios = tpi.shape
+    results = pd.DataFrame({
+        'scenario': np.tile(np.arange(n_scenarios), n_teams),
+        'team': np.repeat(np.asarray(stat_matrix.teams, dtype=object), n_scenarios),
+        'TPI': tpi.ravel(order='C'),
+        'Rank': ranks.ravel(order='C').astype(int)
+    }).sort_values(['scenario', 'Rank'], kind='stable')
+    results.to_csv(args.out, index=False)
+    print(f"Scored {n_scenarios} scenarios for {n_teams} teams -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import pandas as pd
+from data_cache import load_cached_frame, read_excel_cached
+
+DEFAULT_MEMORY_BUDGET_MB = 64
+
+# Rough per-cell cost of a materialized value (pointer + boxed scalar)
+BYTES_PER_CELL = 32
+
+def get_reader_settings(config):
+    """
+    Reads workbook reader settings from the 'ingestion' block of the config.
+
+    Args:
+        config (dict): The loaded configuration dictionary.
+
+    Returns:
+        dict: {'projected': bool, 'memory_budget_mb': float}
+    """
+    ingestion = (config or {}).get('ingestion', {}) or {}
+    return {
+        'projected': ingestion.get('projected_reader', True),
+        'memory_budget_mb': ingestion.get('memory_budget_mb', DEFAULT_MEMORY_BUDGET_MB)
+    }
+
+def resolve_required_columns(file_info):
+    """
+    Returns the columns to load for a file: its configured stats, plus its
+    games-played column if one is configured.
+    """
+    columns = [stat['name'] for stat in file_info.get('stats', [])]
+    if file_info.get('games_played_column'):
+        columns.append(file_info['games_played_column'])
+    return columns
+
+def _dedupe_header(raw_header):
+    """
+    Names header cells the way pd.read_excel does: blank cells become
+    'Unnamed: <i>' and repeated names get '.1', '.2', ... suffixes.
+    """
+    header = []
+    seen = {}
+    for i, value in enumerate(raw_header):
+        name = f"Unnamed: {i}" if value is None or value == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+# pandas' default na_values: pd.read_excel turns these strings into NaN
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+def _convert_cell(value):
+    # pd.read_excel stores integral floats as ints and reads NA strings as
+    # missing; match it so outputs are unchanged
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in NA_STRINGS:
+        return None
+    return value
+
+def read_workbook_columns(file_path, header_row, columns, team_column='Team', sheet_index=0, memory_budget_mb=None):
+    """
+    Streams a worksheet in read-only mode and materializes only the needed columns.
+
+    Args:
+        file_path (str): Path to the workbook.
+        header_row (int): Zero-based header row, as for pd.read_excel.
+        columns (list): Stat column names to keep.
+        team_column (str or int): Header name or position of the team column.
+            It is always returned as 'Team'.
+        sheet_index (int): Worksheet position.
+        memory_budget_mb (float): Upper bound on the estimated size of the
+            materialized cells, or None for no limit.
+
+    Returns:
+        pd.DataFrame: 'Team' plus every requested column present in the sheet.
+        df.attrs['available_columns'] lists the full sheet header.
+
+    Raises:
+        MemoryError: If the projected data would exceed memory_budget_mb.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[sheet_index].iter_rows(values_only=True)
+        for _ in range(header_row):
+            next(rows, None)
+        header = _dedupe_header(next(rows, ()))
+
+        if isinstance(team_column, int):
+            team_index = team_column if team_column < len(header) else None
+        else:
+            team_index = header.index(team_column) if team_column in header else None
+
+        projection = [] if team_index is None else [('Team', team_index)]
+        projection += [(name, header.index(name)) for name in columns if name in header]
+
+        budget_bytes = None if memory_budget_mb is None else float(memory_budget_mb) * 1024 * 1024
+        bytes_per_row = BYTES_PER_CELL * max(len(projection), 1)
+        data = {name: [] for name, _ in projection}
+        row_count = 0
+
+        # Fully blank rows become all-NaN rows, except trailing ones, which
+        # pd.read_excel trims; hold them back until a non-blank row follows
+        pending_blank = 0
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                pending_blank += 1
+                continue
+            for sheet_row in [None] * pending_blank + [row]:
+                row_count += 1
+                if budget_bytes is not None and row_count * bytes_per_row > budget_bytes:
+                    raise MemoryError(
+                        f"{os.path.basename(file_path)} exceeds the {memory_budget_mb} MB reader budget "
+                        f"after {row_count} rows"
+                    )
+                for name, index in projection:
+                    value = sheet_row[index] if sheet_row is not None and index < len(sheet_row) else None
+                    data[name].append(_convert_cell(value))
+            pending_blank = 0
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame(data)
+    df.attrs['available_columns'] = [str(name) for name in header]
+    return df
+
+def read_provider_workbook(file_path, file_info, team_column='Team', cache_settings=None, reader_settings=None):
+    """
+    Loads the 'Team' column and configured stat columns for one provider file.
+
+    With the projected reader (the default) only the needed columns are
+    streamed from the sheet. Otherwise the full sheet is parsed with
+    pd.read_excel. Both paths go through the workbook cache.
+
+    Args:
+        file_path (str): Path to the workbook.
+        file_info (dict): The file's configuration block.
+        team_column (str or int): Header name or position of the team column.
+        cache_settings (dict): Workbook cache settings, or None to bypass the cache.
+        reader_settings (dict): Settings from get_reader_settings.
+
+    Returns:
+        pd.DataFrame: The loaded sheet with the team column named 'Team'.
+    """
+    reader_settings = reader_settings or get_reader_settings({})
+    header_row = file_info.get('header_row', 0)
+
+    if not reader_settings.get('projected', True):
+        df = read_excel_cached(file_path, sheet_name=0, header=header_row, cache_settings=cache_settings)
+        if isinstance(team_column, int) and len(df.columns) > team_column:
+            df.rename(columns={df.columns[team_column]: 'Team'}, inplace=True)
+        return df
+
+    columns = resolve_required_columns(file_info)
+    memory_budget_mb = file_info.get('memory_budget_mb', reader_settings.get('memory_budget_mb'))
+    df = load_cached_frame(
+        file_path,
+        {'sheet': 0, 'header': header_row, 'columns': columns, 'team_column': team_column, 'na_values': 'pandas'},
+        lambda: read_workbook_columns(file_path, header_row, columns, team_column, memory_budget_mb=memory_budget_mb),
+        cache_settings
+    )
+    print(f"  -> Projected reader loaded {len(df.columns)} of {len(df.attrs.get('available_columns', df.columns))} columns.")
+
+    # Stat cells that are not numbers (stray text, footnote markers) become NaN
+    # instead of failing the z-score step
+    for name in columns:
+        if name in df.columns and df[name].dtype == object:
+            df[name] = pd.to_numeric(df[name], errors='coerce')
+    return df
@@ -0,0 +1,363 @@
+import warnings
+import numpy as np
+
+BUCKET_NAMES = ['offensive_creation', 'defensive_resistance', 'pace_drivers']
+
+class StatMatrix:
+    """
+    Per-team stat values, z-scores and ranks as contiguous 2D arrays.
+
+    Rows are teams (sorted by name) and columns are stats (config order).
+    Arrays are column-major so every stat is one contiguous vector; NumPy
+    then reduces each column exactly like a 1D call, which keeps results
+    bit-identical to per-stat scipy.stats.zscore.
+
+    Attributes:
+        teams (list): Team names, one per row.
+        stats (list): Stat names, one per column.
+        values (np.ndarray): Raw stat values (n_teams x n_stats), NaN where missing.
+        zscores (np.ndarray): Sign-adjusted z-scores, same shape.
+        ranks (np.ndarray): 'min' ranks of zscores, 1 = best, NaN where missing.
+        source_rows (list): For each stat, the row indices in the order teams
+            appeared in the source file. Only used to lay out the long export.
+        games_played (np.ndarray): Games behind each value (n_teams x n_stats),
+            NaN where unknown; None if no source reported games played.
+    """
+
+    def __init__(self, teams, stats, values, zscores, ranks, source_rows, games_played=None):
+        self.teams = list(teams)
+        self.stats = list(stats)
+        self.values = values
+        self.zscores = zscores
+        self.ranks = ranks
+        self.source_rows = list(source_rows)
+        self.games_played = games_played
+
+    def __repr__(self):
+        return f"StatMatrix({len(self.teams)} teams x {len(self.stats)} stats)"
+
+def _zero_spread_to_nan(zscores, center, spread):
+    zero_spread = np.broadcast_to(spread <= np.abs(np.finfo(zscores.dtype).eps * center), zscores.shape)
+    zscores[zero_spread] = np.nan
+    return zscores
+
+def compute_zscores(values, axis=0):
+    """
+    NaN-aware z-scores along the team axis (population std, ddof=0).
+
+    Matches scipy.stats.zscore(..., nan_policy='omit'), including returning
+    NaN for a column with zero variance.
+    """
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns
+        mean = np.nanmean(values, axis=axis, keepdims=True)
+        std = np.nanstd(values, axis=axis, keepdims=True)
+        zscores = (values - mean) / std
+    return _zero_spread_to_nan(zscores, mean, std)
+
+ZSCORE_METHODS = ('standard', 'mad', 'winsorized', 'trimmed')
+DEFAULT_TRIM = 0.1
+
+# Scales the median absolute deviation to match the std of a normal distribution
+MAD_SCALE = 1.4826
+
+def _mad_zscores(values):
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(values, axis=0, keepdims=True)
+        mad = np.nanmedian(np.abs(values - median), axis=0, keepdims=True) * MAD_SCALE
+        zscores = (values - median) / mad
+    return _zero_spread_to_nan(zscores, median, mad)
+
+def _tail_positions(values, trim):
+    """
+    Per column: each value's position in sorted order and the number of
+    values to cut from each tail (floor(trim * non-missing count)).
+    """
+    order = np.argsort(values, axis=0, kind='stable')  # NaN sorts last
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(values.shape[0])[:, np.newaxis], axis=0)
+    n_valid = np.sum(~np.isnan(values), axis=0, keepdims=True)
+    cut = np.floor(trim * n_valid).astype(np.intp)
+    return order, positions, n_valid, cut
+
+def _winsorized_zscores(values, trim):
+    order, _, n_valid, cut = _tail_positions(values, trim)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    low = np.take_along_axis(sorted_values, np.minimum(cut, values.shape[0] - 1), axis=0)
+    high = np.take_along_axis(sorted_values, np.maximum(n_valid - 1 - cut, 0), axis=0)
+    return compute_zscores(np.asfortranarray(np.clip(values, low, high)))
+
+def _trimmed_zscores(values, trim):
+    _, positions, n_valid, cut = _tail_positions(values, trim)
+    kept = np.where((positions >= cut) & (positions < n_valid - cut), values, np.nan)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(kept, axis=0, keepdims=True)
+        std = np.nanstd(kept, axis=0, keepdims=True)
+        zscores = (values - mean) / std
+    return _zero_spread_to_nan(zscores, mean, std)
+
+def compute_method_zscores(values, stats_config):
+    """
+    Z-scores per column using each stat's configured 'method':
+
+    - standard: (x - mean) / std, as compute_zscores.
+    - mad: (x - median) / (1.4826 * median absolute deviation).
+    - winsorized: the `trim` share of teams in each tail is clipped to the
+      nearest kept value, then standard z-scores are taken.
+    - trimmed: mean and std come from the teams left after cutting the
+      `trim` share from each tail; every team is scored against them.
+
+    Columns sharing a method and trim are computed together in one
+    vectorized call.
+
+    Args:
+        values (np.ndarray): teams x stats values (column-major).
+        stats_config (list): One stat configuration dictionary per column.
+
+    Returns:
+        np.ndarray: teams x stats z-scores (before sign reversal).
+    """
+    groups = {}
+    for j, stat_cfg in enumerate(stats_config):
+        method = stat_cfg.get('method', 'standard')
+        if method not in ZSCORE_METHODS:
+            raise ValueError(f"Stat '{stat_cfg['name']}' has unknown z-score method '{method}'. Use one of {ZSCORE_METHODS}.")
+        trim = float(stat_cfg.get('trim', DEFAULT_TRIM)) if method in ('winsorized', 'trimmed') else None
+        groups.setdefault((method, trim), []).append(j)
+
+    if list(groups) == [('standard', None)]:
+        return compute_zscores(values)
+
+    zscores = np.full(values.shape, np.nan, order='F')
+    for (method, trim), cols in groups.items():
+        block = np.asfortranarray(values[:, cols])
+        if method == 'standard':
+            zscores[:, cols] = compute_zscores(block)
+        elif method == 'mad':
+            zscores[:, cols] = _mad_zscores(block)
+        elif method == 'winsorized':
+            zscores[:, cols] = _winsorized_zscores(block, trim)
+        else:
+            zscores[:, cols] = _trimmed_zscores(block, trim)
+    return zscores
+
+def rank_descending(zscores):
+    """
+    'min' ranks along the team axis, highest z-score = 1, NaN stays NaN.
+
+    Same result as pandas rank(method='min', ascending=False) per column.
+    """
+    # Rank = 1 + number of teams with a strictly greater z-score
+    greater = (zscores[np.newaxis, :, ...] > zscores[:, np.newaxis, ...]).sum(axis=1)
+    ranks = (greater + 1).astype(float)
+    ranks[np.isnan(zscores)] = np.nan
+    return np.asfortranarray(ranks)
+
+def build_stat_matrix(df, stats_config, team_column='Team', games_played_column=None):
+    """
+    Builds a StatMatrix from a wide per-team DataFrame.
+
+    Args:
+        df (pd.DataFrame): One row per team, with a team column and stat columns.
+        stats_config (list): Stat configuration dictionaries (name, reverse_sign,
+            method, ...).
+        team_column (str): Name of the team column.
+        games_played_column (str): Column with each team's games played. If
+            present in df, it applies to every stat in the file.
+
+    Returns:
+        StatMatrix: Stats missing from df are skipped with a warning.
+    """
+    present = []
+    for stat_cfg in stats_config:
+        if stat_cfg['name'] in df.columns:
+            present.append(stat_cfg)
+        else:
+            print(f"  -> WARNING: Stat '{stat_cfg['name']}' not found in DataFrame. Skipping.")
+
+    file_teams = df[team_column].tolist()
+    teams = sorted(set(file_teams))
+    if len(teams) != len(file_teams):
+        raise ValueError(f"Duplicate teams in '{team_column}'; each team needs exactly one row.")
+    row_of = {team: i for i, team in enumerate(teams)}
+    file_rows = np.array([row_of[team] for team in file_teams], dtype=np.intp)
+
+    # Reduce in file row order: float sums depend on order, and this keeps
+    # z-scores identical to a per-column scipy.stats.zscore on the file
+    file_values = np.asfortranarray(df[[s['name'] for s in present]].to_numpy(dtype=float, na_value=np.nan))
+
+    # Flip stats where lower is better so a higher z-score is always better
+    signs = np.array([-1.0 if s.get('reverse_sign', False) else 1.0 for s in present])
+    file_zscores = compute_method_zscores(file_values, present) * signs
+
+    values = np.full((len(teams), len(present)), np.nan, order='F')
+    zscores = np.full((len(teams), len(present)), np.nan, order='F')
+    values[file_rows, :] = file_values
+    zscores[file_rows, :] = file_zscores
+    for stat_cfg in present:
+        if stat_cfg.get('reverse_sign', False):
+            print(f"    - Reversed sign for '{stat_cfg['name']}'.")
+
+    games_played = None
+    if games_played_column and games_played_column in df.columns:
+        file_games = df[games_played_column].to_numpy(dtype=float, na_value=np.nan)
+        games_played = np.full((len(teams), len(present)), np.nan, order='F')
+        games_played[file_rows, :] = file_games[:, np.newaxis]
+
+    return StatMatrix(
+        teams, [s['name'] for s in present], values, zscores, rank_descending(zscores),
+        [file_rows] * len(present), games_played
+    )
+
+def concat_stat_matrices(matrices):
+    """
+    Joins StatMatrix blocks (e.g. one per provider file) column-wise over the
+    union of their teams. Teams missing from a block get NaN for its stats.
+    """
+    teams = sorted(set().union(*(m.teams for m in matrices))) if matrices else []
+    row_of = {team: i for i, team in enumerate(teams)}
+    n_stats = sum(len(m.stats) for m in matrices)
+
+    values = np.full((len(teams), n_stats), np.nan, order='F')
+    zscores = np.full((len(teams), n_stats), np.nan, order='F')
+    ranks = np.full((len(teams), n_stats), np.nan, order='F')
+    has_games = any(m.games_played is not None for m in matrices)
+    games_played = np.full((len(teams), n_stats), np.nan, order='F') if has_games else None
+    stats, source_rows = [], []
+    col = 0
+    for m in matrices:
+        rows = np.array([row_of[team] for team in m.teams], dtype=np.intp)
+        width = len(m.stats)
+        values[rows, col:col + width] = m.values
+        zscores[rows, col:col + width] = m.zscores
+        ranks[rows, col:col + width] = m.ranks
+        if m.games_played is not None:
+            games_played[rows, col:col + width] = m.games_played
+        stats.extend(m.stats)
+        source_rows.extend(rows[r] for r in m.source_rows)
+        col += width
+    return StatMatrix(teams, stats, values, zscores, ranks, source_rows, games_played)
+
+def build_weight_matrix(stats, config, bucket_names=BUCKET_NAMES):
+    """
+    Maps stats to buckets from the provider stat configs.
+
+    Returns:
+        tuple: (weights, membership). weights[i, b] is stat i's weight in
+        bucket b; membership[i, b] is True if stat i belongs to bucket b
+        (a stat can belong to a bucket with weight 0).
+    """
+    stat_cfgs = {}
+    for provider in config.get('providers', []):
+        for file_info in provider.get('files', []):
+            for stat in file_info.get('stats', []):
+                stat_cfgs[stat['name']] = stat
+
+    weights = np.zeros((len(stats), len(bucket_names)))
+    membership = np.zeros((len(stats), len(bucket_names)), dtype=bool)
+    for i, stat_name in enumerate(stats):
+        stat_cfg = stat_cfgs.get(stat_name, {})
+        bucket = stat_cfg.get('bucket', 'unknown')
+        if bucket in bucket_names:
+            b = bucket_names.index(bucket)
+            weights[i, b] = stat_cfg.get('weight', 1.0)
+            membership[i, b] = True
+    return weights, membership
+
+def _kahan_add(total, compensation, term, use):
+    """
+    One step of Kahan summation, applied only where use is True.
+    """
+    y = term - compensation
+    t = total + y
+    return np.where(use, t, total), np.where(use, (t - total) - y, compensation)
+
+def weighted_bucket_average(zscores, weights, membership):
+    """
+    Weighted average z-score per team and bucket: sum(z * w) / sum(w) over
+    each bucket's stats, with NaN z-scores contributing 0 (their weight
+    still counts).
+
+    Sums are accumulated stat by stat with Kahan compensation, matching
+    pandas groupby().sum() bit for bit.
+
+    Args:
+        zscores (np.ndarray): n_teams x n_stats z-scores.
+        weights (np.ndarray): n_stats x n_buckets weight matrix.
+        membership (np.ndarray): n_stats x n_buckets bucket membership.
+
+    Returns:
+        np.ndarray: n_teams x n_buckets averages (NaN for an empty bucket).
+    """
+    n_teams, n_buckets = zscores.shape[0], weights.shape[1]
+    total = np.zeros((n_teams, n_buckets))
+    compensation = np.zeros((n_teams, n_buckets))
+    weight_total = np.zeros(n_buckets)
+    weight_compensation = np.zeros(n_buckets)
+    for i in range(weights.shape[0]):
+        if not membership[i].any():
+            continue
+        term = zscores[:, i:i + 1] * weights[i]
+        total, compensation = _kahan_add(total, compensation, term, ~np.isnan(term) & membership[i])
+        weight_total, weight_compensation = _kahan_add(weight_total, weight_compensation, weights[i], membership[i])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / weight_total
+
+def compute_bucket_matrix(matrix, config, bucket_names=BUCKET_NAMES):
+    """
+    Bucket averages as a StatMatrix with one '<bucket>_avg' column per
+    non-empty bucket; its 'value' is the bucket z-score itself.
+    """
+    weights, membership = build_weight_matrix(matrix.stats, config, bucket_names)
+    averages = weighted_bucket_average(matrix.zscores, weights, membership)
+
+    kept = []
+    for b, bucket_name in enumerate(bucket_names):
+        if not membership[:, b].any():
+            print(f"  -> WARNING: No stats found for bucket '{bucket_name}'. Skipping.")
+            continue
+        print(f"  -> Calculated {bucket_name}: {len(matrix.teams)} teams.")
+        kept.append(b)
+
+    zscores = np.asfortranarray(averages[:, kept])
+    all_rows = np.arange(len(matrix.teams), dtype=np.intp)
+    return StatMatrix(
+        matrix.teams, [f"{bucket_names[b]}_avg" for b in kept], zscores.copy(order='F'), zscores,
+        rank_descending(zscores), [all_rows] * len(kept)
+    )
+
+def stat_matrix_to_long(matrix):
+    """
+    Exports a StatMatrix to the long team/stat/value/zscore/rank layout,
+    stat by stat, with teams in source-file order. A games_played column is
+    added when the matrix carries games played.
+    """
+    import pandas as pd
+
+    rows = [matrix.source_rows[j] for j in range(len(matrix.stats))]
+    row_index = np.concatenate(rows) if rows else np.array([], dtype=np.intp)
+    col_index = np.repeat(np.arange(len(matrix.stats)), [len(r) for r in rows])
+    teams = np.asarray(matrix.teams, dtype=object)
+
+    long_df = pd.DataFrame({
+        'team': teams[row_index] if len(teams) else np.array([], dtype=object),
+        'stat': np.asarray(matrix.stats, dtype=object)[col_index] if matrix.stats else np.array([], dtype=object),
+        'value': matrix.values[row_index, col_index],
+        'zscore': matrix.zscores[row_index, col_index],
+        'rank': matrix.ranks[row_index, col_index]
+    })
+    if matrix.games_played is not None:
+        long_df['games_played'] = matrix.games_played[row_index, col_index]
+    return long_df
+
+def stat_matrix_to_frames(matrix):
+    """
+    Exports one long DataFrame per stat (the per-stat layout used by the
+    snapshot store).
+    """
+    long_df = stat_matrix_to_long(matrix)
+    bounds = np.cumsum([0] + [len(r) for r in matrix.source_rows])
+    return [long_df.iloc[bounds[j]:bounds[j + 1]].reset_index(drop=True) for j in range(len(matrix.stats))]